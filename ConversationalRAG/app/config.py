@@ -1,37 +1,132 @@
 import os
+from typing import Optional
 from dotenv import load_dotenv
 import redis
-from pinecone import Pinecone
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_pinecone import PineconeVectorStore
-from sqlalchemy import create_engine
+import redis.asyncio as aioredis
+from sqlalchemy.engine import Engine
+
+from common import db, registry
+from common.lexical_index import LexicalIndex
+from common.vector_backends import VectorBackend
 
 load_dotenv()
 
+INDEX_NAME = "langchainvector"
+
 # Redis setup
-def get_redis_client():
+# One pooled client per process and response mode, shared by every request.
+_redis_clients = {}
+_async_redis_clients = {}
+
+def _get_redis_url() -> str:
     REDIS_URL = os.getenv("REDIS_URL")
     if not REDIS_URL:
         raise ValueError("REDIS_URL environment variable not set.")
-    return redis.Redis.from_url(REDIS_URL, decode_responses=True)
-
-# Pinecone setup
-def get_vectorstore():
-    PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
-    INDEX_NAME = "langchainvector"
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-    pc = Pinecone(api_key=PINECONE_API_KEY)
-    vectorstore = PineconeVectorStore(index_name=INDEX_NAME, embedding=embeddings)
-    return vectorstore
-
-
-#database setup
-def get_engine():
-    DATABASE_URL = os.getenv("DATABASE_URL")
-    if not DATABASE_URL:
-        raise ValueError("DATABASE_URL environment variable not set.")
-    engine = create_engine(DATABASE_URL, pool_pre_ping=True)
-    return engine
+    return REDIS_URL
+
+def get_redis_max_connections() -> int:
+    return int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+
+def get_redis_client(decode_responses: bool = True) -> redis.Redis:
+    client = _redis_clients.get(decode_responses)
+    if client is None:
+        client = redis.Redis.from_url(
+            _get_redis_url(),
+            decode_responses=decode_responses,
+            max_connections=get_redis_max_connections(),
+        )
+        _redis_clients[decode_responses] = client
+    return client
+
+def get_async_redis_client(decode_responses: bool = True) -> aioredis.Redis:
+    client = _async_redis_clients.get(decode_responses)
+    if client is None:
+        client = aioredis.Redis.from_url(
+            _get_redis_url(),
+            decode_responses=decode_responses,
+            max_connections=get_redis_max_connections(),
+        )
+        _async_redis_clients[decode_responses] = client
+    return client
+
+# Vector store setup
+# Retrieval only reads: namespaces nothing was ingested into come back as None
+def get_vectorstore(namespace: str = registry.DEFAULT_NAMESPACE) -> Optional[VectorBackend]:
+    return registry.get_vectorstore(INDEX_NAME, namespace, create=False)
+
+def get_lexical_index(namespace: str = registry.DEFAULT_NAMESPACE) -> Optional[LexicalIndex]:
+    return registry.get_lexical_index(INDEX_NAME, namespace, create=False)
+
+
+#database setup; both sub-apps share one engine and pool
+def get_engine() -> Engine:
+    return db.get_engine()
+
+# Query embedding batching
+def get_query_batch_max_wait_ms() -> float:
+    return float(os.getenv("QUERY_BATCH_MAX_WAIT_MS", "5"))
+
+def get_query_batch_max_size() -> int:
+    return int(os.getenv("QUERY_BATCH_MAX_SIZE", "32"))
+
+# Query embedding cache
+def get_query_cache_size() -> int:
+    return int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+
+def get_query_cache_ttl_seconds() -> int:
+    return int(os.getenv("QUERY_CACHE_TTL_SECONDS", "86400"))
+
+# Semantic response cache
+def is_response_cache_enabled() -> bool:
+    return os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+
+def get_response_cache_size() -> int:
+    return int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+
+def get_response_cache_ttl_seconds() -> int:
+    return int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+
+def get_response_cache_threshold() -> float:
+    return float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.95"))
+
+# Hybrid (BM25 + vector) retrieval
+def get_retrieval_candidates() -> int:
+    return int(os.getenv("RETRIEVAL_CANDIDATES", "20"))
+
+def get_rrf_k() -> int:
+    return int(os.getenv("RRF_K", "60"))
+
+def is_lexical_fast_path_enabled() -> bool:
+    return os.getenv("LEXICAL_FAST_PATH_ENABLED", "false").lower() in ("1", "true", "yes")
+
+def get_lexical_fast_path_min_score() -> float:
+    return float(os.getenv("LEXICAL_FAST_PATH_MIN_SCORE", "8.0"))
+
+def get_lexical_fast_path_margin() -> float:
+    return float(os.getenv("LEXICAL_FAST_PATH_MARGIN", "1.5"))
+
+# Context assembly
+def get_context_token_budget() -> int:
+    return int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))
+
+def get_context_dedup_threshold() -> float:
+    return float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.8"))
+
+# Chat history window
+def get_history_token_budget() -> int:
+    return int(os.getenv("HISTORY_TOKEN_BUDGET", "1500"))
+
+def get_history_verbatim_turns() -> int:
+    return int(os.getenv("HISTORY_VERBATIM_TURNS", "6"))
+
+def get_history_fold_batch() -> int:
+    return int(os.getenv("HISTORY_FOLD_BATCH", "4"))
+
+def get_history_summary_max_tokens() -> int:
+    return int(os.getenv("HISTORY_SUMMARY_MAX_TOKENS", "300"))
+
+def get_history_max_messages() -> int:
+    return int(os.getenv("HISTORY_MAX_MESSAGES", "100"))
 
 # Google API
 def get_google_api_key():
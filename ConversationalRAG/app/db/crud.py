@@ -1,10 +1,14 @@
 import logging
+from typing import TYPE_CHECKING
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 
 from .models import Interview
 from .schemas import InterviewCreate
 
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
 
 logger = logging.getLogger(__name__)
 
@@ -33,3 +37,30 @@ def save_booking_to_db(db: Session, booking: InterviewCreate) -> Interview:
         db.rollback()
         logger.error("Failed to save booking: %s", str(e), exc_info=True)
         raise
+
+
+async def save_booking_to_db_async(db: "AsyncSession", booking: InterviewCreate) -> Interview:
+    """
+    Async variant of `save_booking_to_db`, for callers on the event loop.
+
+    Args:
+        db (AsyncSession): SQLAlchemy async database session.
+        booking (InterviewCreate): Booking data validated by Pydantic schema.
+
+    Returns:
+        Interview: The newly created Interview record.
+
+    Raises:
+        SQLAlchemyError: If the database operation fails.
+    """
+    try:
+        new_booking = Interview(**booking.model_dump())
+        db.add(new_booking)
+        await db.commit()
+        await db.refresh(new_booking)
+        logger.info("New booking saved successfully: %s", new_booking.id)
+        return new_booking
+    except SQLAlchemyError as e:
+        await db.rollback()
+        logger.error("Failed to save booking: %s", str(e), exc_info=True)
+        raise
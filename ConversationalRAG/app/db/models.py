@@ -1,4 +1,5 @@
 import logging
+import threading
 from datetime import date, time
 from sqlalchemy import (
     Column,
@@ -9,16 +10,18 @@ from sqlalchemy import (
     TIMESTAMP,
     text,
 )
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 from ..config import get_engine
 
 # logger
 logger = logging.getLogger(__name__)
 
-# Database setup
-engine = get_engine()
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+# Database setup; SessionLocal is bound by init_db() at application startup.
+SessionLocal = sessionmaker(autoflush=False, autocommit=False)
 Base = declarative_base()
+_engine = None
+_engine_lock = threading.Lock()
 
 
 class Interview(Base):
@@ -36,7 +39,22 @@ class Interview(Base):
         nullable=False, 
         server_default=text("CURRENT_TIMESTAMP")
     )
-    
 
-Base.metadata.create_all(bind=engine)
-logger.info("Interview table created or already exists.")
+
+def init_db() -> Engine:
+    """
+    Create the engine and the interview table once per process and bind SessionLocal to it.
+
+    Returns:
+        Engine: The booking database engine.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                engine = get_engine()
+                Base.metadata.create_all(bind=engine)
+                SessionLocal.configure(bind=engine)
+                _engine = engine
+                logger.info("Interview table created or already exists.")
+    return _engine
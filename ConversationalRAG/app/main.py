@@ -1,26 +1,96 @@
+import json
+import logging
+import time
 from fastapi import APIRouter, HTTPException
-from .services.agent import chat_with_agent
-from typing import Dict
+from fastapi.responses import StreamingResponse
+from common import metrics
+from common.registry import DEFAULT_NAMESPACE, validate_namespace
+from .services.agent import chat_with_agent, stream_chat_with_agent
+from typing import Any, AsyncIterator, Dict, Optional
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+
+def _check_namespace(namespace: str) -> str:
+    try:
+        return validate_namespace(namespace)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.post("/agent")
-def converse_with_agent(user_query: str, session_id: str)-> Dict[str, str]:
+async def converse_with_agent(
+    user_query: str,
+    session_id: str,
+    namespace: str = DEFAULT_NAMESPACE,
+    filename: Optional[str] = None,
+)-> Dict[str, str]:
     """
     Endpoint to handle user-agent conversation.
 
     Args:
-        Contains user query and session ID.
+        Contains user query and session ID, and optionally the namespace to
+        answer from and a filename restricting retrieval to one document.
 
     Returns:
         dict: Response generated by the conversational agent.
     """
+    namespace = _check_namespace(namespace)
     try:
-        response = chat_with_agent(user_query, session_id)
+        response = await chat_with_agent(user_query, session_id, namespace, filename)
         return {"response": response}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing query: {e}")
 
-   
 
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/agent/stream")
+async def stream_with_agent(
+    user_query: str,
+    session_id: str,
+    namespace: str = DEFAULT_NAMESPACE,
+    filename: Optional[str] = None,
+) -> StreamingResponse:
+    """
+    Streaming variant of `/agent` that sends the response as Server-Sent Events.
+
+    Emits a `token` event per response fragment, then a `done` event carrying
+    the time to first token, or an `error` event if the turn fails.
+
+    Args:
+        Contains user query and session ID, and optionally the namespace and
+        filename, as for `/agent`.
+
+    Returns:
+        StreamingResponse: A `text/event-stream` of the agent response.
+    """
+    namespace = _check_namespace(namespace)
+
+    async def event_stream() -> AsyncIterator[str]:
+        started = time.perf_counter()
+        ttft_ms = None
+        try:
+            async for token in stream_chat_with_agent(user_query, session_id, namespace, filename):
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - started) * 1000
+                    metrics.observe("stream_first_token", ttft_ms / 1000)
+                    logger.info("Time to first token for session %s: %.1f ms", session_id, ttft_ms)
+                yield _sse_event("token", {"token": token})
+        except Exception as e:
+            logger.error("Streaming agent response failed: %s", e)
+            yield _sse_event("error", {"detail": f"Error processing query: {e}"})
+            return
+        metrics.observe("stream_turn", time.perf_counter() - started)
+        yield _sse_event("done", {"ttft_ms": ttft_ms})
 
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,13 +1,18 @@
+import asyncio
 import logging
 import re
+import time
 from datetime import datetime
-from typing import Any, Dict
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
 
+from common import metrics
+from common.registry import DEFAULT_NAMESPACE
 from .retrieval import retrieve_context
-from .chat_history import get_chat_history, save_to_history
-from .generation import generate_llm_response
-from .booking import handle_booking
-from ..config import get_redis_client
+from .chat_history import format_message, get_chat_history, save_to_history, schedule_compaction
+from .generation import generate_llm_response, stream_llm_response
+from .booking import book_interview
+from .booking_state import advance_booking
+from .response_cache import lookup_response, remember_response
 
 logger = logging.getLogger(__name__)
 REQUIRED_BOOKING_FIELDS = ["name", "email", "date", "time"]
@@ -37,83 +42,97 @@ def is_valid_time(time_str: str) -> bool:
 
 
 
+BOOKING_INTENT_KEYWORDS = ["book interview", "schedule interview", "set interview"]
+BOOKING_START_RESPONSE = "Sure! Let's book your interview. What's your full name?"
+
+# progress -> (field collected, next progress ("" = final), validator, reply when valid, reply when invalid)
+BOOKING_STEPS: Dict[str, Tuple[str, str, Optional[Callable[[str], bool]], str, str]] = {
+    "name": ("name", "email", None, "Got it. Could you provide your email address?", ""),
+    "email": (
+        "email", "date", is_valid_email,
+        "Thanks! What date would you like for the interview? (Format: YYYY-MM-DD)",
+        "Hmm, that doesn’t look like a valid email. Please provide a valid email address (e.g., john@example.com).",
+    ),
+    "date": (
+        "date", "time", is_valid_date,
+        "Perfect. What time works best for you? (Format: HH:MM in 24-hour time)",
+        "That date doesn’t look right. Please provide a valid date in YYYY-MM-DD format.",
+    ),
+    "time": ("time", "", is_valid_time, "", "Please provide a valid time in 24-hour format (e.g., 14:30)."),
+}
+
+
 # BOOKING AND CHAT ORCHESTRATION
-def chat_with_agent(user_query: str, session_id: str)-> str:
+@metrics.instrumented("booking_turn")
+async def handle_booking_turn(user_query: str, session_id: str) -> Optional[str]:
     """
-    Main orchestrator handling both chat and booking interactions.
+    Advance the booking flow for a session if the query belongs to it.
     - Detects booking intent
     - Collects booking details progressively via Redis
-    - Falls back to RAG chat if no booking is in progress
-    """
-    
-    user_query = user_query.lower()
-    redis_client = get_redis_client()
 
-    booking_state_key = f"booking_state:{session_id}"
-    booking_data = redis_client.hgetall(booking_state_key)
+    Validation runs here; reading the state, applying the transition and
+    appending the reply to history happen atomically in one Redis script call.
 
-    if any(keyword in user_query for keyword in ["book interview", "schedule interview", "set interview"]):
-        redis_client.delete(booking_state_key)
-        redis_client.hset(booking_state_key, mapping={"progress": "name"})
-        response = "Sure! Let's book your interview. What's your full name?"
-        save_to_history(session_id, "assistant", response)
+    Returns:
+        Optional[str]: The assistant response for a booking turn, or None when
+        no booking is in progress and the query should go to RAG chat.
+    """
+    transitions = {
+        progress: {
+            "valid": validator is None or validator(user_query),
+            "field": field,
+            "next": next_progress,
+            "ok": format_message("assistant", ok_response),
+            "invalid": format_message("assistant", invalid_response),
+        }
+        for progress, (field, next_progress, validator, ok_response, invalid_response) in BOOKING_STEPS.items()
+    }
+    transition = await advance_booking(
+        session_id,
+        user_query,
+        start=any(keyword in user_query for keyword in BOOKING_INTENT_KEYWORDS),
+        start_entry=format_message("assistant", BOOKING_START_RESPONSE),
+        transitions=transitions,
+    )
+
+    if transition.outcome == "none":
+        return None
+
+    if transition.outcome == "complete":
+        # All details collected — finalize booking off the event loop
+        data = transition.data
+        response = await book_interview(
+            name=data["name"],
+            email=data["email"],
+            date=data["date"],
+            time=data["time"],
+        )
+        await save_to_history(session_id, "assistant", response)
         return response
 
-    if booking_data:
-        progress = booking_data.get("progress")
-
-        if progress == "name":
-            redis_client.hset(booking_state_key, mapping={"name": user_query, "progress": "email"})
-            response = "Got it. Could you provide your email address?"
-            save_to_history(session_id, "assistant", response)
-            return response
-
-        elif progress == "email":
-            if not is_valid_email(user_query):
-                response = "Hmm, that doesn’t look like a valid email. Please provide a valid email address (e.g., john@example.com)."
-                save_to_history(session_id, "assistant", response)
-                return response
-
-            redis_client.hset(booking_state_key, mapping={"email": user_query, "progress": "date"})
-            response = "Thanks! What date would you like for the interview? (Format: YYYY-MM-DD)"
-            save_to_history(session_id, "assistant", response)
-            return response
-
-        elif progress == "date":
-            if not is_valid_date(user_query):
-                response = "That date doesn’t look right. Please provide a valid date in YYYY-MM-DD format."
-                save_to_history(session_id, "assistant", response)
-                return response
-
-            redis_client.hset(booking_state_key, mapping={"date": user_query, "progress": "time"})
-            response = "Perfect. What time works best for you? (Format: HH:MM in 24-hour time)"
-            save_to_history(session_id, "assistant", response)
-            return response
-
-        elif progress == "time":
-            if not is_valid_time(user_query):
-                response = "Please provide a valid time in 24-hour format (e.g., 14:30)."
-                save_to_history(session_id, "assistant", response)
-                return response
-
-            # All details collected — finalize booking
-            redis_client.hset(booking_state_key, mapping={"time": user_query})
-            data = redis_client.hgetall(booking_state_key)
-
-            response = handle_booking(
-                name=data["name"],
-                email=data["email"],
-                date=data["date"],
-                time=data["time"]
-            )
-
-            redis_client.delete(booking_state_key)
-            save_to_history(session_id, "assistant", response)
-            return response
+    schedule_compaction(session_id, transition.history_length)
+    if transition.outcome == "started":
+        return BOOKING_START_RESPONSE
+    _, _, _, ok_response, invalid_response = BOOKING_STEPS[transition.progress]
+    return ok_response if transition.outcome == "advanced" else invalid_response
 
-    # Normal RAG Chat (no booking intent)
-    context = retrieve_context(user_query)
-    chat_history = get_chat_history(session_id)
+
+@metrics.instrumented("build_rag_prompt")
+async def build_rag_prompt(
+    user_query: str, session_id: str, namespace: str = DEFAULT_NAMESPACE, filename: Optional[str] = None
+) -> Tuple[str, str]:
+    """Fetch context and history for a chat turn and assemble the LLM prompt.
+
+    Context is retrieved from `namespace`, restricted to `filename` when given.
+
+    Returns:
+        Tuple[str, str]: The prompt and the retrieved context it was built from.
+    """
+    # History and context are independent, fetch them together
+    context, chat_history = await asyncio.gather(
+        retrieve_context(user_query, namespace=namespace, filename=filename),
+        get_chat_history(session_id),
+    )
 
     prompt = f"""
     You are a helpful assistant. Answer questions using the provided context and conversation history. Keep responses clear, accurate, and relevant.
@@ -127,8 +146,73 @@ def chat_with_agent(user_query: str, session_id: str)-> str:
     User: {user_query}
     Assistant:
     """
+    return prompt, context
+
+
+@metrics.instrumented("chat_turn")
+async def chat_with_agent(
+    user_query: str, session_id: str, namespace: str = DEFAULT_NAMESPACE, filename: Optional[str] = None
+)-> str:
+    """
+    Main orchestrator handling both chat and booking interactions.
+    - Routes booking turns through the booking flow
+    - Falls back to RAG chat if no booking is in progress, answering from
+      the given namespace and, optionally, a single document
+    """
+    user_query = user_query.lower()
+    response = await handle_booking_turn(user_query, session_id)
+    if response is not None:
+        return response
 
-    response = generate_llm_response(prompt)
-    save_to_history(session_id, "user", user_query)
-    save_to_history(session_id, "assistant", response)
+    # Normal RAG Chat (no booking intent)
+    prompt, context = await build_rag_prompt(user_query, session_id, namespace, filename)
+    response, cache_key = await lookup_response(user_query, context)
+    if response is None:
+        started = time.perf_counter()
+        response = await generate_llm_response(prompt)
+        remember_response(cache_key, response, time.perf_counter() - started)
+    await save_to_history(session_id, "user", user_query)
+    await save_to_history(session_id, "assistant", response)
     return response
+
+
+async def stream_chat_with_agent(
+    user_query: str, session_id: str, namespace: str = DEFAULT_NAMESPACE, filename: Optional[str] = None
+) -> AsyncIterator[str]:
+    """
+    Streaming variant of `chat_with_agent` yielding response tokens as they arrive.
+
+    Booking turns yield their full response at once. For RAG chat the turn is
+    written to history exactly once, when the stream finishes or is cancelled,
+    with whatever part of the response was produced.
+    """
+    user_query = user_query.lower()
+    response = await handle_booking_turn(user_query, session_id)
+    if response is not None:
+        yield response
+        return
+
+    prompt, context = await build_rag_prompt(user_query, session_id, namespace, filename)
+    tokens: List[str] = []
+    try:
+        response, cache_key = await lookup_response(user_query, context)
+        if response is not None:
+            tokens.append(response)
+            yield response
+            return
+
+        started = time.perf_counter()
+        async for token in stream_llm_response(prompt):
+            tokens.append(token)
+            yield token
+        # Only complete answers are cached, never a stream cut short by the client
+        remember_response(cache_key, "".join(tokens), time.perf_counter() - started)
+    finally:
+        # Shield the write so a client disconnect cannot cancel it half-way
+        await asyncio.shield(_save_turn(session_id, user_query, "".join(tokens)))
+
+
+async def _save_turn(session_id: str, user_query: str, response: str) -> None:
+    await save_to_history(session_id, "user", user_query)
+    if response:
+        await save_to_history(session_id, "assistant", response)
@@ -1,7 +1,20 @@
+import asyncio
 import datetime
+from common.db import get_async_sessionmaker, is_async_db_enabled
 from ..db.schemas import InterviewCreate
 from ..db.models import SessionLocal
-from ..db.crud import save_booking_to_db
+from ..db.crud import save_booking_to_db, save_booking_to_db_async
+
+def _booking_data(name: str, email: str, date: str, time: str) -> InterviewCreate:
+    return InterviewCreate(
+        name=name,
+        email=email,
+        date=datetime.date.fromisoformat(date),
+        time=datetime.time.fromisoformat(time)
+    )
+
+def _confirmation(booking) -> str:
+    return f"Interview booked successfully for {booking.name} on {booking.date} at {booking.time}."
 
 def handle_booking(name: str, email: str, date: str, time: str)-> str:
     """
@@ -9,17 +22,34 @@ def handle_booking(name: str, email: str, date: str, time: str)-> str:
     
     """
     try:
-        booking_data = InterviewCreate(
-            name=name,
-            email=email,
-            date=datetime.date.fromisoformat(date),
-            time=datetime.time.fromisoformat(time)
-        )
+        booking_data = _booking_data(name, email, date, time)
+        # The session is closed even when the insert fails
+        with SessionLocal() as db:
+            booking = save_booking_to_db(db, booking_data)
+        return _confirmation(booking)
+    except Exception as e:
+        return f"Invalid booking input: {e}"
 
-        db = SessionLocal()
-        booking = save_booking_to_db(db, booking_data)
-        db.close()
+async def handle_booking_async(name: str, email: str, date: str, time: str) -> str:
+    """
+    Create and save booking entry in DB through the async engine.
 
-        return f"Interview booked successfully for {booking.name} on {booking.date} at {booking.time}."
+    """
+    try:
+        booking_data = _booking_data(name, email, date, time)
+        async with get_async_sessionmaker()() as db:
+            booking = await save_booking_to_db_async(db, booking_data)
+        return _confirmation(booking)
     except Exception as e:
         return f"Invalid booking input: {e}"
+
+async def book_interview(name: str, email: str, date: str, time: str) -> str:
+    """
+    Save a completed booking without blocking the event loop.
+
+    With DB_ASYNC_ENABLED the async engine is used; otherwise the sync
+    session runs in a worker thread.
+    """
+    if is_async_db_enabled():
+        return await handle_booking_async(name, email, date, time)
+    return await asyncio.to_thread(handle_booking, name, email, date, time)
@@ -0,0 +1,99 @@
+import json
+from typing import Any, Dict, List, NamedTuple
+
+from common import metrics
+from ..config import get_async_redis_client
+
+# Runs the whole booking step server-side in one atomic round trip:
+# read the progress, pick the transition, write the field and append the reply to history.
+#
+# KEYS[1] booking state hash, KEYS[2] chat history list
+# ARGV[1] user query, ARGV[2] "1" to (re)start a booking, ARGV[3] history entry for a start,
+# ARGV[4] JSON of transitions keyed by progress:
+#   {"valid": bool, "field": str, "next": str ("" = final), "ok": str, "invalid": str}
+_BOOKING_SCRIPT = """
+local state_key, history_key = KEYS[1], KEYS[2]
+if ARGV[2] == '1' then
+    redis.call('DEL', state_key)
+    redis.call('HSET', state_key, 'progress', 'name')
+    return {'started', redis.call('RPUSH', history_key, ARGV[3]), 'name'}
+end
+
+local progress = redis.call('HGET', state_key, 'progress')
+if not progress then
+    return {'none', 0, ''}
+end
+local step = cjson.decode(ARGV[4])[progress]
+if not step then
+    return {'none', 0, progress}
+end
+
+if not step['valid'] then
+    return {'invalid', redis.call('RPUSH', history_key, step['invalid']), progress}
+end
+
+redis.call('HSET', state_key, step['field'], ARGV[1])
+if step['next'] == '' then
+    local data = redis.call('HGETALL', state_key)
+    redis.call('DEL', state_key)
+    return {'complete', 0, progress, unpack(data)}
+end
+redis.call('HSET', state_key, 'progress', step['next'])
+return {'advanced', redis.call('RPUSH', history_key, step['ok']), progress}
+"""
+
+_scripts: Dict[int, Any] = {}
+
+
+class BookingTransition(NamedTuple):
+    """Outcome of one booking step.
+
+    outcome is 'none' (no booking in progress), 'started', 'invalid', 'advanced'
+    or 'complete'. history_length is the chat list length after the reply was
+    appended (0 when nothing was appended). progress is the step the message
+    was applied to, and data holds the collected fields of a completed booking.
+    """
+    outcome: str
+    history_length: int
+    progress: str
+    data: Dict[str, str]
+
+
+def _get_script():
+    redis_client = get_async_redis_client()
+    script = _scripts.get(id(redis_client))
+    if script is None:
+        script = redis_client.register_script(_BOOKING_SCRIPT)
+        _scripts[id(redis_client)] = script
+    return script
+
+
+@metrics.instrumented("advance_booking")
+async def advance_booking(
+    session_id: str,
+    user_query: str,
+    start: bool,
+    start_entry: str,
+    transitions: Dict[str, Dict[str, Any]],
+) -> BookingTransition:
+    """
+    Apply one booking step atomically in Redis.
+
+    Args:
+        session_id (str): Unique session identifier; also the chat history key.
+        user_query (str): The user's message for this turn.
+        start (bool): Whether the message (re)starts a booking.
+        start_entry (str): History entry appended when a booking starts.
+        transitions (Dict[str, Dict[str, Any]]): Transition per progress value,
+            with validation already evaluated against `user_query`.
+
+    Returns:
+        BookingTransition: What the step did.
+    """
+    result: List[Any] = await _get_script()(
+        keys=[f"booking_state:{session_id}", session_id],
+        args=[user_query, "1" if start else "0", start_entry, json.dumps(transitions)],
+    )
+    outcome, history_length, progress, fields = result[0], int(result[1]), result[2], result[3:]
+    data = dict(zip(fields[::2], fields[1::2]))
+    return BookingTransition(outcome, history_length, progress, data)
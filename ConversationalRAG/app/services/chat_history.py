@@ -1,10 +1,79 @@
-from ..config import get_redis_client
+import asyncio
+import logging
+from typing import Any, Dict, List, Set
 
+from common import metrics
+from common.tokens import count_tokens, truncate_tokens
+from ..config import (
+    get_async_redis_client,
+    get_history_fold_batch,
+    get_history_max_messages,
+    get_history_summary_max_tokens,
+    get_history_token_budget,
+    get_history_verbatim_turns,
+)
+from .generation import generate_llm_response
 
-redis_client = get_redis_client()
+logger = logging.getLogger(__name__)
 
-def get_chat_history(session_id: str) -> str:
-    """Retrieve the full chat history for a given session from Redis.
+# Keep references to in-flight compactions so they are not garbage collected mid-run.
+_compactions: Set[asyncio.Task] = set()
+
+# Stores a new summary and drops the folded messages only if neither the summary
+# nor the head of the list changed while the summary was being generated, so a
+# compaction that outlived its lock cannot fold the same messages twice.
+#
+# KEYS[1] chat history list, KEYS[2] summary
+# ARGV[1] new summary, ARGV[2] summary the new one was built from ("" for none),
+# ARGV[3..] the folded messages, oldest first
+_FOLD_SCRIPT = """
+local history_key, summary_key = KEYS[1], KEYS[2]
+if (redis.call('GET', summary_key) or '') ~= ARGV[2] then
+    return 0
+end
+local count = #ARGV - 2
+local head = redis.call('LRANGE', history_key, 0, count - 1)
+if #head ~= count then
+    return 0
+end
+for i = 1, count do
+    if head[i] ~= ARGV[i + 2] then
+        return 0
+    end
+end
+redis.call('SET', summary_key, ARGV[1])
+redis.call('LTRIM', history_key, count, -1)
+return 1
+"""
+
+_scripts: Dict[int, Any] = {}
+
+
+def summary_key(session_id: str) -> str:
+    """Redis key of the rolling summary stored next to a session's message list."""
+    return f"{session_id}:summary"
+
+
+def _verbatim_messages() -> int:
+    # One turn is a user message plus the assistant reply.
+    return 2 * get_history_verbatim_turns()
+
+
+def _get_fold_script():
+    redis_client = get_async_redis_client()
+    script = _scripts.get(id(redis_client))
+    if script is None:
+        script = redis_client.register_script(_FOLD_SCRIPT)
+        _scripts[id(redis_client)] = script
+    return script
+
+
+@metrics.instrumented("get_chat_history")
+async def get_chat_history(session_id: str) -> str:
+    """Assemble the chat history for a session within the configured token budget.
+
+    The rolling summary of older turns comes first, followed by as many of the
+    most recent messages not yet folded into it as fit in HISTORY_TOKEN_BUDGET.
 
     Args:
         session_id (str): Unique session identifier.
@@ -12,20 +81,122 @@ def get_chat_history(session_id: str) -> str:
     Returns:
         str: The chat history joined as newline-separated messages.
     """
+    redis_client = get_async_redis_client()
     if not redis_client:
         return "redis client not available"
-    messages = redis_client.lrange(session_id, 0, -1)
-    return "\n".join(messages) if messages else ""
 
-def save_to_history(session_id: str, role: str, message: str) -> None:
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.get(summary_key(session_id))
+        # Compaction keeps the list short, and messages waiting to be folded are not in the summary yet.
+        pipe.lrange(session_id, 0, -1)
+        summary, messages = await pipe.execute()
+
+    budget = get_history_token_budget()
+    lines: List[str] = []
+    if summary:
+        summary = truncate_tokens(summary, min(get_history_summary_max_tokens(), budget))
+        lines.append(f"Summary of earlier conversation: {summary}")
+        budget -= count_tokens(lines[0])
+
+    recent: List[str] = []
+    for message in reversed(messages or []):
+        cost = count_tokens(message)
+        if cost > budget:
+            break
+        budget -= cost
+        recent.append(message)
+    lines.extend(reversed(recent))
+    return "\n".join(lines)
+
+@metrics.instrumented("save_to_history")
+async def save_to_history(session_id: str, role: str, message: str) -> None:
     """
     Append a new chat message to the Redis chat history.
 
+    Once the list grows past the verbatim window plus HISTORY_FOLD_BATCH, the
+    oldest messages are folded into the rolling summary in the background.
+
     Args:
         session_id (str): Unique session identifier.
         role (str): Role of the speaker ('user' or 'assistant').
         message (str): Message text.
     """
+    redis_client = get_async_redis_client()
     if redis_client is None:
         return
-    redis_client.rpush(session_id, f"{role.title()}: {message}")
+    length = await redis_client.rpush(session_id, format_message(role, message))
+    schedule_compaction(session_id, length)
+
+
+def format_message(role: str, message: str) -> str:
+    """Format a chat message the way it is stored in the history list."""
+    return f"{role.title()}: {message}"
+
+
+def schedule_compaction(session_id: str, length: int) -> None:
+    """
+    Start a background compaction if the history list has outgrown its window.
+
+    Args:
+        session_id (str): Unique session identifier.
+        length (int): Length of the history list after the latest append.
+    """
+    if length > _verbatim_messages() + get_history_fold_batch():
+        task = asyncio.create_task(compact_history(session_id))
+        _compactions.add(task)
+        task.add_done_callback(_compactions.discard)
+
+
+@metrics.instrumented("compact_history")
+async def compact_history(session_id: str) -> None:
+    """
+    Fold everything older than the verbatim window into the session summary.
+
+    If the summary cannot be generated, the list is still capped at
+    HISTORY_MAX_MESSAGES by dropping its oldest messages.
+
+    Args:
+        session_id (str): Unique session identifier.
+    """
+    redis_client = get_async_redis_client()
+    lock_key = f"{session_id}:summary_lock"
+    # One compaction per session at a time; the lock expires if a worker dies mid-way.
+    if not await redis_client.set(lock_key, "1", nx=True, ex=60):
+        return
+    try:
+        length = await redis_client.llen(session_id)
+        fold_count = length - _verbatim_messages()
+        if fold_count <= 0:
+            return
+        older = await redis_client.lrange(session_id, 0, fold_count - 1)
+        previous = await redis_client.get(summary_key(session_id))
+
+        prompt = f"""
+        Summarize the conversation below for an assistant that will continue it.
+        Keep names, facts, decisions and open questions. Use at most {get_history_summary_max_tokens()} tokens.
+
+        Existing summary:
+        {previous or "(none)"}
+
+        New messages:
+        {chr(10).join(older)}
+
+        Updated summary:
+        """
+        summary = truncate_tokens(await generate_llm_response(prompt), get_history_summary_max_tokens())
+
+        # Drop exactly the folded messages; anything appended meanwhile is kept.
+        folded = await _get_fold_script()(
+            keys=[session_id, summary_key(session_id)],
+            args=[summary, previous or "", *older],
+        )
+        if not folded:
+            logger.info("History of session %s changed during compaction; summary discarded", session_id)
+    except Exception as e:
+        logger.warning("History compaction for session %s failed: %s", session_id, e)
+        try:
+            await redis_client.ltrim(session_id, -get_history_max_messages(), -1)
+        except Exception as trim_error:
+            logger.warning("Capping the history of session %s failed: %s", session_id, trim_error)
+    finally:
+        await redis_client.delete(lock_key)
@@ -0,0 +1,143 @@
+import logging
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from langchain_core.documents import Document
+
+from common import metrics
+from common.lexical_index import tokenize
+from common.tokens import count_tokens, truncate_tokens
+from ..config import get_context_dedup_threshold, get_context_token_budget
+
+logger = logging.getLogger(__name__)
+
+# Words per shingle when comparing chunks for near-duplicates.
+SHINGLE_SIZE = 4
+PASSAGE_SEPARATOR = "\n\n"
+
+
+class AssembledContext(NamedTuple):
+    """Context sent to the LLM, with what assembly saved compared to joining the top chunks verbatim."""
+    text: str
+    passages: int
+    duplicates: int
+    merged: int
+    tokens_in: int
+    tokens_out: int
+
+    @property
+    def tokens_saved(self) -> int:
+        # Token counts of separately encoded pieces are estimates; never report a negative saving.
+        return max(0, self.tokens_in - self.tokens_out)
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[int]:
+    """Hashes of the overlapping `size`-word windows of a text, lowercased and without punctuation."""
+    words = tokenize(text)
+    if len(words) <= size:
+        return {hash(tuple(words))} if words else set()
+    return {hash(tuple(words[i:i + size])) for i in range(len(words) - size + 1)}
+
+
+def is_near_duplicate(a: Set[int], b: Set[int], threshold: float) -> bool:
+    """
+    Whether two shingle sets overlap by at least `threshold` of the smaller one.
+
+    Measured against the smaller set, so a chunk repeated inside a longer one
+    counts as a duplicate too.
+    """
+    if not a or not b:
+        return a == b
+    return len(a & b) >= threshold * min(len(a), len(b))
+
+
+def _position(doc: Document) -> Optional[Tuple[str, int]]:
+    filename, chunk_index = doc.metadata.get("filename"), doc.metadata.get("chunk_index")
+    if filename is None or chunk_index is None:
+        return None
+    return str(filename), int(chunk_index)
+
+
+def _merge_neighbours(docs: List[Document]) -> Tuple[List[str], int]:
+    """
+    Join chunks that follow each other in the same file into one passage.
+
+    Passages keep the rank of their best chunk; chunks inside a passage are
+    in file order.
+
+    Returns:
+        Tuple[List[str], int]: Passage texts, best first, and the number of chunks merged away.
+    """
+    runs: List[List[Tuple[int, Document]]] = []
+    run_of: Dict[Tuple[str, int], List[Tuple[int, Document]]] = {}
+    for rank, doc in sorted(enumerate(docs), key=lambda item: _position(item[1]) or ("", -1)):
+        position = _position(doc)
+        run = run_of.get((position[0], position[1] - 1)) if position else None
+        if run is None:
+            run = []
+            runs.append(run)
+        run.append((rank, doc))
+        if position:
+            run_of[position] = run
+    runs.sort(key=lambda run: min(rank for rank, _ in run))
+    passages = ["\n".join(doc.page_content for _, doc in run) for run in runs]
+    return passages, len(docs) - len(runs)
+
+
+def assemble_context(docs: List[Document], top_k: int) -> AssembledContext:
+    """
+    Build the retrieval context from ranked chunks within CONTEXT_TOKEN_BUDGET.
+
+    Walks the chunks best first, skipping near-duplicates of chunks already
+    taken (word shingle overlap of at least CONTEXT_DEDUP_THRESHOLD) until
+    `top_k` distinct chunks are found, so a duplicate frees its slot for the
+    next candidate. Chunks adjacent in the same file are
+    then merged into one passage, and passages are added best first until
+    the token budget is spent, the last one truncated to fit.
+
+    Args:
+        docs (List[Document]): Retrieved chunks, best first.
+        top_k (int): Number of distinct chunks to keep.
+
+    Returns:
+        AssembledContext: The context text and how many tokens assembly saved.
+    """
+    threshold = get_context_dedup_threshold()
+    kept: List[Document] = []
+    kept_shingles: List[Set[int]] = []
+    duplicates = 0
+    for doc in docs:
+        if len(kept) >= top_k:
+            break
+        doc_shingles = shingles(doc.page_content)
+        if any(is_near_duplicate(doc_shingles, other, threshold) for other in kept_shingles):
+            duplicates += 1
+            continue
+        kept.append(doc)
+        kept_shingles.append(doc_shingles)
+
+    passages, merged = _merge_neighbours(kept)
+    budget = get_context_token_budget()
+    selected: List[str] = []
+    tokens_out = 0
+    for passage in passages:
+        cost = count_tokens(passage) + (count_tokens(PASSAGE_SEPARATOR) if selected else 0)
+        if budget and tokens_out + cost > budget:
+            remaining = budget - tokens_out - (cost - count_tokens(passage))
+            if remaining > 0:
+                passage = truncate_tokens(passage, remaining)
+                selected.append(passage)
+                tokens_out = count_tokens(PASSAGE_SEPARATOR.join(selected))
+            break
+        selected.append(passage)
+        tokens_out += cost
+
+    # Baseline: the top chunks joined verbatim, as sent without assembly.
+    tokens_in = count_tokens(PASSAGE_SEPARATOR.join(doc.page_content for doc in docs[:top_k]))
+    result = AssembledContext(PASSAGE_SEPARATOR.join(selected), len(selected), duplicates, merged, tokens_in, tokens_out)
+    metrics.count(metrics.CONTEXT_TOKENS, result.tokens_out, outcome="kept")
+    metrics.count(metrics.CONTEXT_TOKENS, result.tokens_saved, outcome="saved")
+    logger.info(
+        "Assembled context: %d passages, %d tokens (saved %d: %d duplicates, %d chunks merged)",
+        result.passages, result.tokens_out, result.tokens_saved, duplicates, merged,
+    )
+    return result
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+from common import metrics, registry
+from ..config import get_query_batch_max_size, get_query_batch_max_wait_ms
+
+logger = logging.getLogger(__name__)
+
+
+class QueryEmbeddingBatcher:
+    """
+    Collects concurrent query embedding requests and encodes them in one batch.
+
+    A background thread waits for the first pending query, then keeps collecting
+    until either `max_wait_ms` has elapsed or `max_batch_size` queries are queued,
+    and runs a single `embed_documents` call for the whole batch.
+    """
+
+    def __init__(self, embeddings: Embeddings, max_wait_ms: float, max_batch_size: int):
+        self._embeddings = embeddings
+        self._max_wait = max_wait_ms / 1000.0
+        self._max_batch_size = max(1, max_batch_size)
+        self._queue: "queue.Queue[Tuple[str, Future, float]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._queries = 0
+        self._batch_sizes: Dict[int, int] = {}
+        self._queue_delay_total = 0.0
+        self._queue_delay_max = 0.0
+
+    def submit(self, text: str) -> "Future[List[float]]":
+        """Queue a query for embedding and return a future for its vector."""
+        self._ensure_worker()
+        future: "Future[List[float]]" = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        return future
+
+    def embed(self, text: str) -> List[float]:
+        """Embed a query, blocking until its batch has been encoded."""
+        return self.submit(text).result()
+
+    async def aembed(self, text: str) -> List[float]:
+        """Embed a query without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(text))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return batching counters.
+
+        Returns:
+            Dict[str, Any]: Batch and query counts, a batch size histogram and
+            queueing delay totals in milliseconds.
+        """
+        with self._stats_lock:
+            return {
+                "batches": self._batches,
+                "queries": self._queries,
+                "batch_sizes": dict(self._batch_sizes),
+                "queue_delay_ms_total": self._queue_delay_total * 1000.0,
+                "queue_delay_ms_max": self._queue_delay_max * 1000.0,
+            }
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None:
+            return
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name="query-embedding-batcher", daemon=True
+                )
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self._max_wait
+            while len(batch) < self._max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    def _flush(self, batch: List[Tuple[str, Future, float]]) -> None:
+        started = time.perf_counter()
+        delays = [started - enqueued for _, _, enqueued in batch]
+        with self._stats_lock:
+            self._batches += 1
+            self._queries += len(batch)
+            self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+            self._queue_delay_total += sum(delays)
+            self._queue_delay_max = max(self._queue_delay_max, max(delays))
+
+        # Skip queries whose caller has already gone away (e.g. a cancelled request)
+        batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        try:
+            vectors = self._embeddings.embed_documents([text for text, _, _ in batch])
+        except Exception as e:
+            logger.error("Query embedding batch of %d failed: %s", len(batch), e)
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        for (_, future, _), vector in zip(batch, vectors):
+            future.set_result(vector)
+
+
+_batcher: Optional[QueryEmbeddingBatcher] = None
+_batcher_lock = threading.Lock()
+
+
+def get_query_batcher() -> QueryEmbeddingBatcher:
+    """Return the process-wide query embedding batcher."""
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = QueryEmbeddingBatcher(
+                    registry.get_embeddings(),
+                    max_wait_ms=get_query_batch_max_wait_ms(),
+                    max_batch_size=get_query_batch_max_size(),
+                )
+    return _batcher
+
+
+def _collect_stats():
+    # Only report a batcher that exists; scraping must not load the model.
+    if _batcher is not None:
+        yield from metrics.stats_samples("rag_query_batcher", _batcher.stats(), "Query embedding batcher statistic.")
+
+
+metrics.register_collector(_collect_stats)
@@ -1,7 +1,31 @@
+from typing import AsyncIterator, Optional
+
+from common import metrics
+from common.tokens import count_tokens
 from ..config import get_google_api_key
 from langchain_google_genai import GoogleGenerativeAI
 
-def generate_llm_response(prompt: str) -> str:
+_llm: Optional[GoogleGenerativeAI] = None
+
+def get_llm() -> GoogleGenerativeAI:
+    """Return the shared Gemini client, creating it on first use."""
+    global _llm
+    if _llm is None:
+        _llm = GoogleGenerativeAI(
+            model="gemini-2.0-flash",
+            temperature=0.2,
+            google_api_key=get_google_api_key()
+        )
+    return _llm
+
+def _count_tokens(prompt: str, response: str) -> None:
+    # Estimated with the local tokenizer; skipped entirely when metrics are off.
+    if metrics.ENABLED:
+        metrics.count(metrics.TOKENS, count_tokens(prompt), kind="prompt")
+        metrics.count(metrics.TOKENS, count_tokens(response), kind="completion")
+
+@metrics.instrumented("generate_llm_response")
+async def generate_llm_response(prompt: str) -> str:
     """
     Generate a response from Google Gemini LLM.
 
@@ -11,9 +35,23 @@ def generate_llm_response(prompt: str) -> str:
     Returns:
         str: The generated response text.
     """
-    llm = GoogleGenerativeAI(
-        model="gemini-2.0-flash",
-        temperature=0.2,
-        google_api_key=get_google_api_key()
-    )
-    return llm.invoke(prompt)
+    response = await get_llm().ainvoke(prompt)
+    _count_tokens(prompt, response)
+    return response
+
+async def stream_llm_response(prompt: str) -> AsyncIterator[str]:
+    """
+    Stream a response from Google Gemini LLM.
+
+    Args:
+        prompt (str): The input prompt to send to the model.
+
+    Yields:
+        str: Response text fragments in the order the model produces them.
+    """
+    chunks = []
+    with metrics.timed("stream_llm_response"):
+        async for chunk in get_llm().astream(prompt):
+            chunks.append(chunk)
+            yield chunk
+    _count_tokens(prompt, "".join(chunks))
@@ -0,0 +1,169 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import redis
+import redis.asyncio as aioredis
+
+from common import metrics
+from common.registry import get_embedding_model_tag
+from ..config import get_async_redis_client, get_query_cache_size, get_query_cache_ttl_seconds
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase a query and collapse whitespace so trivial variants share a cache entry."""
+    return _WHITESPACE.sub(" ", query).strip().lower()
+
+
+class QueryEmbeddingCache:
+    """
+    Two-tier cache of query embeddings keyed on the normalized query text.
+
+    The first tier is a bounded in-process LRU with per-entry expiry. The second
+    tier stores each vector in Redis as raw float32 bytes with the same TTL, so
+    every worker sharing the Redis instance benefits from the others' misses.
+    """
+
+    def __init__(self, redis_client: Optional[aioredis.Redis], max_entries: int, ttl_seconds: int):
+        self._redis = redis_client
+        self._max_entries = max(1, max_entries)
+        self._ttl = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[List[float], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._model_tag = hashlib.blake2b(get_embedding_model_tag().encode(), digest_size=4).hexdigest()
+
+        self._local_hits = 0
+        self._redis_hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _key(self, normalized: str) -> str:
+        digest = hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest()
+        return f"query_embedding:{self._model_tag}:{digest}"
+
+    async def get(self, query: str) -> Optional[List[float]]:
+        """
+        Look up a query vector in the local tier, then in Redis.
+
+        Args:
+            query (str): Query text; normalized before lookup.
+
+        Returns:
+            Optional[List[float]]: The cached vector, or None on a miss.
+        """
+        key = self._key(normalize_query(query))
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                vector, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._local_hits += 1
+                    metrics.count(metrics.CACHE_EVENTS, cache="query_embedding", result="local_hit")
+                    return vector
+                del self._entries[key]
+
+        payload = None
+        if self._redis is not None:
+            try:
+                payload = await self._redis.get(key)
+            except redis.RedisError as e:
+                logger.warning("Query cache Redis lookup failed: %s", e)
+
+        if payload is None:
+            with self._lock:
+                self._misses += 1
+            metrics.count(metrics.CACHE_EVENTS, cache="query_embedding", result="miss")
+            return None
+
+        vector = np.frombuffer(payload, dtype=np.float32).tolist()
+        with self._lock:
+            self._redis_hits += 1
+            self._store_local(key, vector, now)
+        metrics.count(metrics.CACHE_EVENTS, cache="query_embedding", result="redis_hit")
+        return vector
+
+    async def put(self, query: str, vector: List[float]) -> None:
+        """
+        Store a query vector in both tiers.
+
+        Args:
+            query (str): Query text; normalized before storing.
+            vector (List[float]): Embedding of the normalized query.
+        """
+        key = self._key(normalize_query(query))
+        with self._lock:
+            self._store_local(key, vector, time.monotonic())
+        if self._redis is not None:
+            try:
+                await self._redis.set(key, np.asarray(vector, dtype=np.float32).tobytes(), ex=self._ttl)
+            except redis.RedisError as e:
+                logger.warning("Query cache Redis write failed: %s", e)
+
+    def _store_local(self, key: str, vector: List[float], now: float) -> None:
+        self._entries[key] = (vector, now + self._ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return hit/miss counters for both tiers.
+
+        Returns:
+            Dict[str, Any]: Hits per tier, misses, evictions, current size and hit rate.
+        """
+        with self._lock:
+            lookups = self._local_hits + self._redis_hits + self._misses
+            return {
+                "local_hits": self._local_hits,
+                "redis_hits": self._redis_hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "local_entries": len(self._entries),
+                "hit_rate": (self._local_hits + self._redis_hits) / lookups if lookups else 0.0,
+            }
+
+
+_cache: Optional[QueryEmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_query_cache() -> QueryEmbeddingCache:
+    """Return the process-wide query embedding cache."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    # Vectors are stored as raw bytes, so this client must not decode responses.
+                    redis_client = get_async_redis_client(decode_responses=False)
+                except ValueError as e:
+                    logger.warning("Query cache running without Redis tier: %s", e)
+                    redis_client = None
+                _cache = QueryEmbeddingCache(
+                    redis_client,
+                    max_entries=get_query_cache_size(),
+                    ttl_seconds=get_query_cache_ttl_seconds(),
+                )
+    return _cache
+
+
+def _collect_stats():
+    if _cache is not None:
+        yield from metrics.stats_samples("rag_query_cache", _cache.stats(), "Query embedding cache statistic.")
+
+
+metrics.register_collector(_collect_stats)
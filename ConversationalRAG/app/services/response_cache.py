@@ -0,0 +1,250 @@
+import hashlib
+import logging
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import redis
+
+from common import metrics
+from common.corpus import CORPUS_GENERATION_KEY
+from common.registry import EMBEDDING_DIMENSION
+from ..config import (
+    get_async_redis_client,
+    get_response_cache_size,
+    get_response_cache_threshold,
+    get_response_cache_ttl_seconds,
+    is_response_cache_enabled,
+)
+from .query_cache import get_query_cache, normalize_query
+from .retrieval import RETRIEVAL_ERROR_PREFIX
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCacheKey(NamedTuple):
+    """What a cached answer depends on: the query, the retrieved context and the corpus version.
+
+    embedding is None when retrieval answered from the lexical fast path
+    without embedding the query; such keys only match the same normalized query.
+    """
+    embedding: Optional[np.ndarray]
+    query: str
+    context_fingerprint: str
+    generation: int
+
+
+class _Entry(NamedTuple):
+    slot: int
+    query: str
+    context_fingerprint: str
+    generation: int
+    response: str
+    expires_at: float
+    llm_seconds: float
+
+
+def context_fingerprint(context: str) -> str:
+    """Return a short stable hash of the retrieved context."""
+    return hashlib.blake2b(context.encode("utf-8"), digest_size=16).hexdigest()
+
+
+async def get_corpus_generation() -> int:
+    """Read the corpus generation bumped by document uploads; 0 if never bumped or unreadable."""
+    try:
+        value = await get_async_redis_client().get(CORPUS_GENERATION_KEY)
+    except redis.RedisError as e:
+        logger.warning("Failed to read corpus generation: %s", e)
+        return 0
+    return int(value) if value else 0
+
+
+class SemanticResponseCache:
+    """
+    Bounded cache of LLM answers looked up by query-embedding similarity.
+
+    A lookup hits when a stored query is the same normalized text or its
+    cosine similarity is at least `threshold`, its retrieved context
+    fingerprint is identical and it was answered in the current corpus
+    generation. Entries expire after `ttl_seconds`; when full, the oldest
+    entry is evicted. Vectors live in a preallocated matrix so a lookup is one
+    matrix-vector product.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int, threshold: float, dimension: int = EMBEDDING_DIMENSION):
+        self._max_entries = max(1, max_entries)
+        self._ttl = ttl_seconds
+        self._threshold = threshold
+        self._vectors = np.zeros((self._max_entries, dimension), dtype=np.float32)
+        # Slots holding an entry with a query vector
+        self._live = np.zeros(self._max_entries, dtype=bool)
+        self._entries: Dict[int, _Entry] = {}
+        # (normalized query, context fingerprint) -> slot, for exact repeats
+        self._slots_by_query: Dict[Tuple[str, str], int] = {}
+        self._free_slots: List[int] = list(range(self._max_entries - 1, -1, -1))
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._seconds_saved = 0.0
+
+    async def make_key(self, user_query: str, context: str) -> ResponseCacheKey:
+        """
+        Build the lookup key for a chat turn from its query and retrieved context.
+
+        The query is never embedded here: the vector retrieval computed is read
+        back from the query embedding cache, and a query answered from the
+        lexical fast path is keyed by its normalized text alone.
+        """
+        embedding = await get_query_cache().get(user_query)
+        if embedding is not None:
+            embedding = np.asarray(embedding, dtype=np.float32)
+            norm = np.linalg.norm(embedding)
+            if norm:
+                embedding = embedding / norm
+        return ResponseCacheKey(
+            embedding, normalize_query(user_query), context_fingerprint(context), await get_corpus_generation()
+        )
+
+    def lookup(self, key: ResponseCacheKey) -> Optional[str]:
+        """
+        Return a cached answer for a near-duplicate question, if any.
+
+        Args:
+            key (ResponseCacheKey): Key built by `make_key`.
+
+        Returns:
+            Optional[str]: The cached response, or None on a miss.
+        """
+        now = time.monotonic()
+        with self._lock:
+            slot = self._slots_by_query.get((key.query, key.context_fingerprint))
+            candidates = [] if slot is None else [slot]
+            if key.embedding is not None:
+                similarities = np.where(self._live, self._vectors @ key.embedding, -np.inf)
+                for slot in np.argsort(-similarities):
+                    if similarities[slot] < self._threshold:
+                        break
+                    candidates.append(int(slot))
+            for slot in candidates:
+                entry = self._entries.get(slot)
+                if entry is None:
+                    # Evicted as expired earlier in this lookup
+                    continue
+                if entry.expires_at <= now:
+                    self._evict(entry.slot)
+                    continue
+                if entry.context_fingerprint == key.context_fingerprint and entry.generation == key.generation:
+                    self._hits += 1
+                    self._seconds_saved += entry.llm_seconds
+                    metrics.count(metrics.CACHE_EVENTS, cache="response", result="hit")
+                    return entry.response
+            self._misses += 1
+        metrics.count(metrics.CACHE_EVENTS, cache="response", result="miss")
+        return None
+
+    def store(self, key: ResponseCacheKey, response: str, llm_seconds: float) -> None:
+        """
+        Cache an answer under its key.
+
+        Args:
+            key (ResponseCacheKey): Key built by `make_key`.
+            response (str): The LLM answer.
+            llm_seconds (float): How long the LLM call took, credited as saved time on each hit.
+        """
+        with self._lock:
+            previous = self._slots_by_query.get((key.query, key.context_fingerprint))
+            if previous is not None:
+                # Answered again, e.g. in a new corpus generation
+                self._evict(previous)
+            if not self._free_slots:
+                oldest = min(self._entries.values(), key=lambda entry: entry.expires_at)
+                self._evict(oldest.slot)
+            slot = self._free_slots.pop()
+            if key.embedding is not None:
+                self._vectors[slot] = key.embedding
+                self._live[slot] = True
+            self._entries[slot] = _Entry(
+                slot, key.query, key.context_fingerprint, key.generation, response,
+                time.monotonic() + self._ttl, llm_seconds,
+            )
+            self._slots_by_query[(key.query, key.context_fingerprint)] = slot
+
+    def _evict(self, slot: int) -> None:
+        entry = self._entries.pop(slot)
+        del self._slots_by_query[(entry.query, entry.context_fingerprint)]
+        self._live[slot] = False
+        self._free_slots.append(slot)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return cache effectiveness counters.
+
+        Returns:
+            Dict[str, Any]: Hits, misses, hit rate, entry count and LLM seconds saved.
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "llm_seconds_saved": self._seconds_saved,
+            }
+
+
+_cache: Optional[SemanticResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[SemanticResponseCache]:
+    """Return the process-wide response cache, or None when RESPONSE_CACHE_ENABLED is off."""
+    global _cache
+    if not is_response_cache_enabled():
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SemanticResponseCache(
+                    max_entries=get_response_cache_size(),
+                    ttl_seconds=get_response_cache_ttl_seconds(),
+                    threshold=get_response_cache_threshold(),
+                )
+    return _cache
+
+
+@metrics.instrumented("response_cache_lookup")
+async def lookup_response(user_query: str, context: str) -> Tuple[Optional[str], Optional[ResponseCacheKey]]:
+    """
+    Check the response cache for a chat turn.
+
+    Args:
+        user_query (str): The user's question.
+        context (str): Context retrieved for the question.
+
+    Returns:
+        Tuple[Optional[str], Optional[ResponseCacheKey]]: The cached answer (or None)
+        and the key to store a fresh answer under (None when caching is off or
+        retrieval failed).
+    """
+    cache = get_response_cache()
+    if cache is None or context.startswith(RETRIEVAL_ERROR_PREFIX):
+        return None, None
+    key = await cache.make_key(user_query, context)
+    return cache.lookup(key), key
+
+
+def remember_response(key: Optional[ResponseCacheKey], response: str, llm_seconds: float) -> None:
+    """Store a freshly generated answer if `lookup_response` handed out a key."""
+    if key is not None:
+        get_response_cache().store(key, response, llm_seconds)
+
+
+def _collect_stats():
+    if _cache is not None:
+        yield from metrics.stats_samples("rag_response_cache", _cache.stats(), "Semantic response cache statistic.")
+
+
+metrics.register_collector(_collect_stats)
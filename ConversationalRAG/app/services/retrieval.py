@@ -1,26 +1,137 @@
-from ..config import get_vectorstore
+import asyncio
+from typing import Dict, List, Optional, Tuple
 
+from langchain_core.documents import Document
 
-def retrieve_context(query: str, top_k: int = 3) -> str:
+from common import metrics
+from common.lexical_index import tokenize
+from common.registry import DEFAULT_NAMESPACE
+from ..config import (
+    get_lexical_fast_path_margin,
+    get_lexical_fast_path_min_score,
+    get_lexical_index,
+    get_retrieval_candidates,
+    get_rrf_k,
+    get_vectorstore,
+    is_lexical_fast_path_enabled,
+)
+from .context_assembly import assemble_context
+from .embedding_batcher import get_query_batcher
+from .query_cache import get_query_cache, normalize_query
+
+RETRIEVAL_ERROR_PREFIX = "Error retrieving context"
+
+
+@metrics.instrumented("embed_query")
+async def embed_query(query: str) -> List[float]:
+    """
+    Embed a query, serving repeats from the query embedding cache.
+
+    Args:
+        query (str): The search query text.
+
+    Returns:
+        List[float]: Embedding of the normalized query.
+    """
+    cache = get_query_cache()
+    embedding = await cache.get(query)
+    if embedding is None:
+        # Embed through the shared batcher so concurrent requests share one forward pass
+        embedding = await get_query_batcher().aembed(normalize_query(query))
+        await cache.put(query, embedding)
+    return embedding
+
+
+def reciprocal_rank_fusion(result_lists: List[List[Document]], k: int) -> List[Document]:
+    """
+    Merge ranked result lists with reciprocal rank fusion.
+
+    Each document scores the sum of 1 / (k + rank) over the lists it appears
+    in; documents are matched by id, or by text when they have none.
+
+    Args:
+        result_lists (List[List[Document]]): Ranked results, best first.
+        k (int): Rank offset damping the weight of the top ranks.
+
+    Returns:
+        List[Document]: Fused results, best first.
+    """
+    scores: Dict[str, float] = {}
+    docs: Dict[str, Document] = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results, start=1):
+            key = doc.id or doc.page_content
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            docs.setdefault(key, doc)
+    return [docs[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+def is_confident_lexical_match(query: str, results: List[Tuple[Document, float]]) -> bool:
     """
-    Retrieve the most relevant context documents from the vector store.
+    Decide whether BM25 results are good enough to skip the vector search.
+
+    The top chunk must contain every query term, score at least
+    LEXICAL_FAST_PATH_MIN_SCORE and beat the runner-up by LEXICAL_FAST_PATH_MARGIN.
+    """
+    if not results:
+        return False
+    top_doc, top_score = results[0]
+    if top_score < get_lexical_fast_path_min_score():
+        return False
+    if len(results) > 1 and top_score < get_lexical_fast_path_margin() * results[1][1]:
+        return False
+    return set(tokenize(query)) <= set(tokenize(top_doc.page_content))
+
+
+@metrics.instrumented("retrieve_context")
+async def retrieve_context(
+    query: str, top_k: int = 3, namespace: str = DEFAULT_NAMESPACE, filename: Optional[str] = None
+) -> str:
+    """
+    Retrieve the most relevant context documents with hybrid BM25 and vector search.
+
+    Lexical and vector candidates are merged with reciprocal rank fusion.
+    With LEXICAL_FAST_PATH_ENABLED, a confident lexical match is answered
+    from the BM25 results alone, skipping the query embedding and vector search.
+    The ranked chunks are then deduplicated, merged with their neighbours and
+    fitted to the token budget, see `assemble_context`.
 
     Args:
         query (str): The search query text.
         top_k (int, optional): Number of top similar documents to return. Defaults to 3.
+        namespace (str, optional): Partition of the index to search; "" for the default one.
+        filename (Optional[str], optional): Only search the chunks of this document.
 
     Returns:
         str: Concatenated content of retrieved documents, or an error message.
     """
-    vectorstore = get_vectorstore()
+    vectorstore = get_vectorstore(namespace)
     if vectorstore is None:
-        return "Vector store not available"
+        # Nothing was ever ingested into this namespace
+        return "No relevant context found."
 
+    # Applied inside both searches, so a filtered query still gets its full candidate count
+    filter = {"filename": filename} if filename else None
     try:
-        docs = vectorstore.similarity_search(query, k=top_k)
+        candidates = max(top_k, get_retrieval_candidates())
+        lexical_index = get_lexical_index(namespace)
+        lexical = []
+        if lexical_index:
+            with metrics.timed("lexical_search"):
+                lexical = await asyncio.to_thread(lexical_index.search, query, candidates, filter)
+
+        if is_lexical_fast_path_enabled() and is_confident_lexical_match(query, lexical):
+            docs = [doc for doc, _ in lexical]
+        else:
+            embedding = await embed_query(query)
+            with metrics.timed("vector_search"):
+                dense = [doc for doc, _ in await vectorstore.asearch(
+                    embedding, k=candidates if lexical else top_k, filter=filter
+                )]
+            docs = reciprocal_rank_fusion([dense, [doc for doc, _ in lexical]], get_rrf_k())
         if not docs:
             return "No relevant context found."
-        return "\n\n".join([d.page_content for d in docs])
+        with metrics.timed("assemble_context"):
+            return assemble_context(docs, top_k).text
     except Exception as e:
-        return f"Error retrieving context: {e}"
-    
+        return f"{RETRIEVAL_ERROR_PREFIX}: {e}"
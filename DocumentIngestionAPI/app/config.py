@@ -1,14 +1,18 @@
 import os
+from typing import TYPE_CHECKING
 from dotenv import load_dotenv
-from pinecone import Pinecone
-from langchain_huggingface import HuggingFaceEmbeddings
-from sqlalchemy import create_engine
+from langchain_core.embeddings import Embeddings
+from sqlalchemy.engine import Engine
+
+from common import db, registry
+
+if TYPE_CHECKING:
+    from pinecone import Pinecone
 
 load_dotenv()
 
-def get_embeddings():
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-    return embeddings
+def get_embeddings() -> Embeddings:
+    return registry.get_embeddings()
 
 def get_index_name():
     INDEX_NAME = os.getenv("INDEX_NAME")
@@ -17,21 +21,62 @@ def get_index_name():
     return  INDEX_NAME
 
 # Pinecone setup
-def get_pineconeClient():
-    PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
-    if not PINECONE_API_KEY:
-        raise ValueError("PINECONE API KEY environment variable not set.")
-    pc = Pinecone(api_key=PINECONE_API_KEY)
-    return pc
-
-
-#database setup
-def get_engine():
-    DATABASE_URL = os.getenv("DATABASE_URL")
-    if not DATABASE_URL:
-        raise ValueError("DATABASE_URL environment variable not set.")
-    engine = create_engine(DATABASE_URL, pool_pre_ping=True)
-    return engine
+def get_pineconeClient() -> "Pinecone":
+    return registry.get_pinecone_client()
+
+
+# Ingestion batching
+def get_ingest_batch_size() -> int:
+    return int(os.getenv("INGEST_BATCH_SIZE", "64"))
+
+def get_metadata_insert_batch_size() -> int:
+    return int(os.getenv("METADATA_INSERT_BATCH_SIZE", "1000"))
+
+# How semantic chunks get their vectors: "mean" derives them from the sentence
+# embeddings computed while chunking, "reembed" embeds every chunk again.
+def get_semantic_chunk_vector_mode() -> str:
+    return os.getenv("SEMANTIC_CHUNK_VECTOR_MODE", "mean").lower()
+
+
+# Batch (multi-file) ingestion
+def get_batch_queue_size() -> int:
+    return int(os.getenv("BATCH_QUEUE_SIZE", "4"))
+
+def get_batch_max_files() -> int:
+    return int(os.getenv("BATCH_MAX_FILES", "500"))
+
+def get_batch_max_member_bytes() -> int:
+    return int(os.getenv("BATCH_MAX_MEMBER_BYTES", str(50 * 1024 * 1024)))
+
+def get_batch_max_archive_bytes() -> int:
+    return int(os.getenv("BATCH_MAX_ARCHIVE_BYTES", str(500 * 1024 * 1024)))
+
+
+# Parallel PDF extraction
+def get_pdf_extract_workers() -> int:
+    return int(os.getenv("PDF_EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+
+def get_pdf_parallel_min_pages() -> int:
+    return int(os.getenv("PDF_PARALLEL_MIN_PAGES", "64"))
+
+def get_pdf_pages_per_task() -> int:
+    return int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+
+
+# Background ingestion jobs
+def get_job_storage_dir() -> str:
+    return os.getenv("JOB_STORAGE_DIR", ".ingestion_jobs")
+
+def get_ingest_job_workers() -> int:
+    return int(os.getenv("INGEST_JOB_WORKERS", "2"))
+
+def get_job_stale_seconds() -> int:
+    return int(os.getenv("JOB_STALE_SECONDS", "300"))
+
+
+#database setup; both sub-apps share one engine and pool
+def get_engine() -> Engine:
+    return db.get_engine()
 
 
 
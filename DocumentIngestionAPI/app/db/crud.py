@@ -1,27 +1,38 @@
+from datetime import datetime
+from sqlalchemy import and_, delete, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from .models import ChunkMetadata
-from typing import List, Dict
+from common import metrics
+from ..config import get_metadata_insert_batch_size
+from .models import ChunkEmbedding, ChunkMetadata, IngestionJob
+from typing import TYPE_CHECKING, Any, Iterable, List, Dict, Optional, Tuple
 import logging
 
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
 logger = logging.getLogger(__name__)
 
+# Ids per DELETE statement, to stay well below bind parameter limits.
+CHUNK_DELETE_BATCH_SIZE = 500
+
+@metrics.instrumented("insert_chunks")
 def insert_chunks(db: Session, metadata_list: List[Dict[str, any]])-> None:
     """
     Insert multiple chunk metadata rows at once.
 
+    Rows are written with executemany-style multi-row INSERT statements of up to
+    METADATA_INSERT_BATCH_SIZE rows each, bypassing per-object ORM bookkeeping,
+    and committed together.
+
     Args:
         db (Session): SQLAlchemy database session.
         metadata_list (List[Dict[str, any]]): List of metadata dicts for chunks.
     """
+    batch_size = max(1, get_metadata_insert_batch_size())
     try:
-        for meta in metadata_list:
-            row = ChunkMetadata(
-                chunk_index=meta["chunk_index"],
-                chunk_strategy=meta["chunk_strategy"],
-                chunk_filename=meta["chunk_filename"],
-                created_at=meta["created_at"]
-            )
-            db.add(row)
+        for start in range(0, len(metadata_list), batch_size):
+            db.execute(insert(ChunkMetadata), metadata_list[start:start + batch_size])
         db.commit()
         logger.info(f"Inserted {len(metadata_list)} chunk metadata rows successfully.")
     except Exception as e:
@@ -30,3 +41,235 @@ def insert_chunks(db: Session, metadata_list: List[Dict[str, any]])-> None:
         raise
 
 
+def get_file_chunks(db: Session, filename: str, namespace: str = "") -> List[Tuple[int, Optional[str], int, str]]:
+    """
+    Return the chunks currently recorded for a file.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        filename (str): Name of the uploaded file.
+        namespace (str): Namespace the file was ingested into.
+
+    Returns:
+        List[Tuple[int, Optional[str], int, str]]: (row id, vector id, chunk index, strategy)
+        per chunk; the vector id is None for rows ingested before vector ids were recorded.
+    """
+    return [
+        (row_id, vector_id, chunk_index, strategy)
+        for row_id, vector_id, chunk_index, strategy in db.execute(
+            select(ChunkMetadata.id, ChunkMetadata.vector_id, ChunkMetadata.chunk_index, ChunkMetadata.chunk_strategy)
+            .where(ChunkMetadata.chunk_filename == filename, ChunkMetadata.namespace == namespace)
+        )
+    ]
+
+
+def delete_chunks(db: Session, row_ids: List[int]) -> None:
+    """
+    Delete chunk metadata rows by id.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        row_ids (List[int]): Ids of the rows to delete.
+    """
+    for start in range(0, len(row_ids), CHUNK_DELETE_BATCH_SIZE):
+        db.execute(delete(ChunkMetadata).where(ChunkMetadata.id.in_(row_ids[start:start + CHUNK_DELETE_BATCH_SIZE])))
+    db.commit()
+    logger.info("Deleted %d chunk metadata rows.", len(row_ids))
+
+
+def get_cached_embeddings(db: Session, model: str, content_hashes: Iterable[str]) -> Dict[str, bytes]:
+    """
+    Look up cached chunk embeddings.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        model (str): Name of the embedding model the vectors were produced by.
+        content_hashes (Iterable[str]): Hashes of the chunk texts.
+
+    Returns:
+        Dict[str, bytes]: Raw float32 vector bytes keyed by content hash, for the hashes found.
+    """
+    hashes = list(set(content_hashes))
+    if not hashes:
+        return {}
+    return dict(db.execute(
+        select(ChunkEmbedding.content_hash, ChunkEmbedding.embedding)
+        .where(ChunkEmbedding.model == model, ChunkEmbedding.content_hash.in_(hashes))
+    ).all())
+
+
+def save_cached_embeddings(db: Session, model: str, embeddings: Dict[str, bytes]) -> None:
+    """
+    Store chunk embeddings in the cache, ignoring hashes that are already present.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        model (str): Name of the embedding model the vectors were produced by.
+        embeddings (Dict[str, bytes]): Raw float32 vector bytes keyed by content hash.
+    """
+    if not embeddings:
+        return
+    # Another upload may have cached the same text meanwhile; skip those rows instead of failing.
+    present = get_cached_embeddings(db, model, embeddings)
+    now = datetime.now()
+    db.add_all(
+        ChunkEmbedding(content_hash=content_hash, model=model, embedding=embedding, created_at=now)
+        for content_hash, embedding in embeddings.items()
+        if content_hash not in present
+    )
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        logger.warning("Concurrent embedding cache write for model %s; skipping.", model)
+
+
+def create_job(
+    db: Session, job_id: str, filename: str, file_type: str, strategy: str, file_path: str, namespace: str = ""
+) -> IngestionJob:
+    """
+    Record a new queued ingestion job.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        job_id (str): Unique job identifier.
+        filename (str): Name of the uploaded file.
+        file_type (str): MIME type of the file.
+        strategy (str): Chunking strategy.
+        file_path (str): Where the uploaded file was persisted.
+        namespace (str): Namespace to ingest the file into.
+
+    Returns:
+        IngestionJob: The created job.
+    """
+    job = _new_job(job_id, filename, file_type, strategy, file_path, namespace)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    logger.info("Queued ingestion job %s for %s", job_id, filename)
+    return job
+
+
+async def create_job_async(
+    db: "AsyncSession", job_id: str, filename: str, file_type: str, strategy: str, file_path: str, namespace: str = ""
+) -> IngestionJob:
+    """Async variant of `create_job`, for request handlers on the event loop."""
+    job = _new_job(job_id, filename, file_type, strategy, file_path, namespace)
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    logger.info("Queued ingestion job %s for %s", job_id, filename)
+    return job
+
+
+def _new_job(
+    job_id: str, filename: str, file_type: str, strategy: str, file_path: str, namespace: str
+) -> IngestionJob:
+    return IngestionJob(
+        id=job_id,
+        filename=filename,
+        file_type=file_type,
+        strategy=strategy,
+        namespace=namespace,
+        file_path=file_path,
+        status="queued",
+        stage="queued",
+    )
+
+
+def get_job(db: Session, job_id: str) -> Optional[IngestionJob]:
+    """Return an ingestion job by id, or None if it does not exist."""
+    return db.get(IngestionJob, job_id)
+
+
+async def get_job_async(db: "AsyncSession", job_id: str) -> Optional[IngestionJob]:
+    """Async variant of `get_job`."""
+    return await db.get(IngestionJob, job_id)
+
+
+def claim_job(db: Session, job_id: str, stale_before: datetime) -> bool:
+    """
+    Atomically mark a job as running if it is queued or its previous run went stale.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        job_id (str): Unique job identifier.
+        stale_before (datetime): Running jobs not updated since this time count as abandoned.
+
+    Returns:
+        bool: True if this caller now owns the job.
+    """
+    now = datetime.now()
+    result = db.execute(
+        update(IngestionJob)
+        .where(
+            IngestionJob.id == job_id,
+            or_(
+                IngestionJob.status == "queued",
+                and_(IngestionJob.status == "running", IngestionJob.updated_at < stale_before),
+            ),
+        )
+        .values(
+            status="running",
+            stage="queued",
+            attempts=IngestionJob.attempts + 1,
+            chunks_processed=0,
+            error=None,
+            started_at=now,
+            updated_at=now,
+        )
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def update_job(db: Session, job_id: str, **values: Any) -> None:
+    """
+    Update fields of an ingestion job and refresh its heartbeat.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        job_id (str): Unique job identifier.
+        **values: Column values to set.
+    """
+    db.execute(
+        update(IngestionJob)
+        .where(IngestionJob.id == job_id)
+        .values(**values, updated_at=datetime.now())
+    )
+    db.commit()
+
+
+def has_active_job(db: Session, filename: str, namespace: str = "") -> bool:
+    """Whether a queued or running ingestion job targets the file."""
+    return db.scalar(
+        select(IngestionJob.id)
+        .where(
+            IngestionJob.filename == filename,
+            IngestionJob.namespace == namespace,
+            IngestionJob.status.in_(("queued", "running")),
+        )
+        .limit(1)
+    ) is not None
+
+
+def list_resumable_job_ids(db: Session, stale_before: datetime) -> List[str]:
+    """
+    Return ids of jobs left queued or whose running worker stopped heartbeating.
+
+    Jobs queued recently are left to the process that accepted them, which
+    submits them to its own pool right away.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        stale_before (datetime): Jobs queued before, or running and not updated
+            since this time count as abandoned.
+    """
+    return list(db.scalars(
+        select(IngestionJob.id)
+        .where(or_(
+            and_(IngestionJob.status == "queued", IngestionJob.created_at < stale_before),
+            and_(IngestionJob.status == "running", IngestionJob.updated_at < stale_before),
+        ))
+        .order_by(IngestionJob.created_at)
+    ))
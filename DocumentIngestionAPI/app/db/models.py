@@ -7,32 +7,102 @@ from sqlalchemy import (
     Integer,
     String,
     DateTime,   
+    Index,
+    Text,
+    JSON,
+    LargeBinary,
 )
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
 import logging
+import threading
 
 # logger
 logger = logging.getLogger(__name__)
 
-engine = get_engine()
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Bound to the engine by init_db() at application startup, so importing the models has no side effects.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
 Base = declarative_base()
+_engine = None
+_engine_lock = threading.Lock()
 
 class ChunkMetadata(Base):
     """SQLAlchemy model for storing metadata of text chunks."""
 
     __tablename__ = "chunk_metadata"
+    # Finds the chunks of one file without scanning the corpus, for re-ingestion and deletion.
+    __table_args__ = (Index("ix_chunk_metadata_namespace_filename", "namespace", "chunk_filename"),)
 
     id: Any = Column(Integer, primary_key=True, autoincrement=True)
     chunk_index: int = Column(Integer, nullable=False)
     chunk_strategy: str = Column(String, nullable=False)
     chunk_filename: str = Column(String, nullable=False)
+    # Index partition the chunk was stored in ("" = default), see common/registry.py.
+    namespace: str = Column(String(64), nullable=False, default="", server_default="")
+    # Deterministic id of the chunk's vector (see services/hashing.py) and hash of its text.
+    vector_id: str = Column(String(32), nullable=True, index=True)
+    content_hash: str = Column(String(32), nullable=True)
     created_at: datetime = Column(DateTime, default=datetime.now, nullable=False)
     
 
-Base.metadata.create_all(bind=engine)
-logger.info("Chunk MetaData table created or already exists.")
-  
+class ChunkEmbedding(Base):
+    """SQLAlchemy model caching the embedding of a chunk text per embedding model."""
+
+    __tablename__ = "chunk_embeddings"
+
+    content_hash: str = Column(String(32), primary_key=True)
+    model: str = Column(String, primary_key=True)
+    # Raw float32 vector bytes
+    embedding: bytes = Column(LargeBinary, nullable=False)
+    created_at: datetime = Column(DateTime, default=datetime.now, nullable=False)
+
+
+class IngestionJob(Base):
+    """SQLAlchemy model tracking a background document ingestion job."""
+
+    __tablename__ = "ingestion_jobs"
+
+    id: str = Column(String(36), primary_key=True)
+    filename: str = Column(String, nullable=False)
+    file_type: str = Column(String, nullable=False)
+    strategy: str = Column(String, nullable=False)
+    namespace: str = Column(String(64), nullable=False, default="", server_default="")
+    file_path: str = Column(String, nullable=False)
+    # queued -> running -> completed | failed
+    status: str = Column(String(16), nullable=False, default="queued", index=True)
+    # Pipeline stage within a running job: queued, extracting, embedding, finalizing, done
+    stage: str = Column(String(16), nullable=False, default="queued")
+    chunks_processed: int = Column(Integer, nullable=False, default=0)
+    attempts: int = Column(Integer, nullable=False, default=0)
+    timings: Any = Column(JSON, nullable=True)
+    result: Any = Column(JSON, nullable=True)
+    error: str = Column(Text, nullable=True)
+    created_at: datetime = Column(DateTime, default=datetime.now, nullable=False)
+    started_at: datetime = Column(DateTime, nullable=True)
+    finished_at: datetime = Column(DateTime, nullable=True)
+    # Bumped on every progress update; a running job that stops heartbeating is resumable.
+    updated_at: datetime = Column(DateTime, default=datetime.now, onupdate=datetime.now, nullable=False)
+
+
+def init_db() -> Engine:
+    """
+    Create the engine and tables once per process and bind SessionLocal to it.
+
+    Called from the application lifespan; later calls return the same engine.
+
+    Returns:
+        Engine: The ingestion database engine.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                engine = get_engine()
+                Base.metadata.create_all(bind=engine)
+                SessionLocal.configure(bind=engine)
+                _engine = engine
+                logger.info("Chunk MetaData and ingestion job tables created or already exist.")
+    return _engine
 
 
@@ -1,9 +1,16 @@
-from typing import Dict, Any
-from fastapi import APIRouter, UploadFile, File, Query, Depends, HTTPException
+from typing import AsyncIterator, Dict, Any, List, Optional
+from fastapi import APIRouter, UploadFile, File, Query, Depends, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
+from common.db import get_async_sessionmaker, is_async_db_enabled
+from common.registry import DEFAULT_NAMESPACE, validate_namespace
+from .db.crud import get_job, get_job_async
 from .db.models import SessionLocal
-from .services.upload import upload_to_db
+from .services.batch_upload import ingest_uploads
+from .services.documents import DocumentBusyError, delete_document
+from .services.jobs import enqueue_upload, enqueue_upload_async, job_status
+from .services.text_extraction import SUPPORTED_FILE_TYPES
 
 router = APIRouter()
 
@@ -14,34 +21,211 @@ def get_db()-> Session:
         yield db
     finally:
         db.close()
-        
-        
-@router.post("/uploadfile/")
+
+
+async def get_db_unless_async() -> AsyncIterator[Optional[Session]]:
+    """
+    Dependency for handlers that open their own async session when DB_ASYNC_ENABLED.
+
+    Yields None in async mode, so no sync session is created and no threadpool
+    hop is spent on it; otherwise a sync session like `get_db`.
+    """
+    if is_async_db_enabled():
+        yield None
+        return
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        # Closing returns the connection to the pool, which may block; keep it off the event loop.
+        await run_in_threadpool(db.close)
+
+
+def check_namespace(namespace: str) -> str:
+    """Validate a namespace query parameter, answering 400 when it is malformed."""
+    try:
+        return validate_namespace(namespace)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/uploadfile/", status_code=202)
 async def upload_file(
     file: UploadFile = File(...), 
     strategy: str = Query("recursive", description="Choose 'recursive' or 'semantic' "),
-    db: Session = Depends(get_db)
+    namespace: str = Query(DEFAULT_NAMESPACE, description="Tenant/namespace to ingest into; empty for the default one"),
+    db: Optional[Session] = Depends(get_db_unless_async)
 )-> Dict[str, Any]:
     """
-    Upload a text or PDF file, extract content, split into chunks, 
-    store embeddings in the vector store, and save metadata in the database.
+    Upload a text or PDF file and queue it for background ingestion.
+
+    The file is persisted and a job is queued; extraction, chunking, embedding
+    and metadata storage run on the ingestion worker pool. Poll
+    `/uploadfile/jobs/{job_id}` for progress and the result.
 
     Args:
         file (UploadFile): File uploaded by the user (.txt or .pdf).
         strategy (str): Chunking strategy ('recursive' or 'semantic').
-        db (Session): SQLAlchemy database session.
+        namespace (str): Partition of the index the file is ingested into.
+        db (Optional[Session]): SQLAlchemy database session; None with DB_ASYNC_ENABLED.
 
     Returns:
-        Dict[str, Any]: Details of the processed chunks including the top 5 chunks.
+        Dict[str, Any]: The id and status of the queued ingestion job.
     """
+    if strategy not in ("recursive", "semantic"):
+        raise HTTPException(status_code=400, detail=f"Unknown chunking strategy: {strategy}")
+    if file.content_type not in SUPPORTED_FILE_TYPES:
+        raise HTTPException(status_code=400, detail="Unsupported file type. Please upload .txt or .pdf")
+    namespace = check_namespace(namespace)
     try:
-        content_bytes = await file.read()
-        file_type = file.content_type
-        filename = file.filename
-        result = upload_to_db(content_bytes, file_type, filename, strategy, db)
+        if is_async_db_enabled():
+            job = await enqueue_upload_async(file.file, file.filename, file.content_type, strategy, namespace)
+        else:
+            # Persisting the spooled upload is blocking file I/O, keep it off the event loop.
+            job = await run_in_threadpool(
+                enqueue_upload, db, file.file, file.filename, file.content_type, strategy, namespace
+            )
         return {
-            "message": "File uploaded, chunks stored, and metadata saved.",
-            **result
+            "message": "File accepted for ingestion.",
+            "job_id": job.id,
+            "status": job.status,
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"File processing failed: {e}")
+
+
+@router.post("/uploadfiles/")
+async def upload_files(
+    files: List[UploadFile] = File(...),
+    strategy: str = Query("recursive", description="Choose 'recursive' or 'semantic' "),
+    namespace: str = Query(DEFAULT_NAMESPACE, description="Tenant/namespace to ingest into; empty for the default one"),
+) -> Dict[str, Any]:
+    """
+    Ingest many text/PDF files, or zip archives of them, in one request.
+
+    Files run through an overlapped extract/embed/store pipeline, see
+    `ingest_batch`; the response is returned once the whole batch is stored.
+
+    Args:
+        files (List[UploadFile]): Uploaded .txt/.pdf files and .zip archives.
+        strategy (str): Chunking strategy ('recursive' or 'semantic').
+        namespace (str): Partition of the index the files are ingested into.
+
+    Returns:
+        Dict[str, Any]: Per-file results and throughput, and aggregate throughput.
+    """
+    if strategy not in ("recursive", "semantic"):
+        raise HTTPException(status_code=400, detail=f"Unknown chunking strategy: {strategy}")
+    namespace = check_namespace(namespace)
+    uploads = [(file.filename, file.content_type, file.file) for file in files]
+    try:
+        return await run_in_threadpool(ingest_uploads, uploads, strategy, namespace)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch processing failed: {e}")
+
+
+@router.get("/uploadfile/jobs/{job_id}")
+async def get_upload_job(job_id: str, db: Optional[Session] = Depends(get_db_unless_async)) -> Dict[str, Any]:
+    """
+    Report the state of an ingestion job.
+
+    Args:
+        job_id (str): Id returned by `/uploadfile/`.
+        db (Optional[Session]): SQLAlchemy database session; None with DB_ASYNC_ENABLED.
+
+    Returns:
+        Dict[str, Any]: Status, pipeline stage, chunks processed, timings, result and error.
+    """
+    if is_async_db_enabled():
+        async with get_async_sessionmaker()() as async_db:
+            job = await get_job_async(async_db, job_id)
+    else:
+        job = await run_in_threadpool(get_job, db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Ingestion job {job_id} not found")
+    return job_status(job)
+
+
+@router.put("/documents/{filename:path}", status_code=202)
+async def replace_document(
+    filename: str,
+    file: UploadFile = File(...),
+    strategy: str = Query("recursive", description="Choose 'recursive' or 'semantic' "),
+    namespace: str = Query(DEFAULT_NAMESPACE, description="Tenant/namespace the document belongs to"),
+    db: Optional[Session] = Depends(get_db_unless_async),
+) -> Dict[str, Any]:
+    """
+    Replace the content of a document, or add it if it does not exist yet.
+
+    The upload is queued under `filename` whatever its own name is. Ingestion
+    is incremental: chunks whose text is unchanged keep their vectors, new
+    ones are embedded, and the vectors and rows of chunks that disappeared
+    are deleted once the new version is stored.
+
+    Args:
+        filename (str): Name the document is stored under.
+        file (UploadFile): New content of the document (.txt or .pdf).
+        strategy (str): Chunking strategy ('recursive' or 'semantic').
+        namespace (str): Partition of the index the document belongs to.
+        db (Optional[Session]): SQLAlchemy database session; None with DB_ASYNC_ENABLED.
+
+    Returns:
+        Dict[str, Any]: The id and status of the queued ingestion job.
+    """
+    if strategy not in ("recursive", "semantic"):
+        raise HTTPException(status_code=400, detail=f"Unknown chunking strategy: {strategy}")
+    if file.content_type not in SUPPORTED_FILE_TYPES:
+        raise HTTPException(status_code=400, detail="Unsupported file type. Please upload .txt or .pdf")
+    namespace = check_namespace(namespace)
+    try:
+        if is_async_db_enabled():
+            job = await enqueue_upload_async(file.file, filename, file.content_type, strategy, namespace)
+        else:
+            job = await run_in_threadpool(
+                enqueue_upload, db, file.file, filename, file.content_type, strategy, namespace
+            )
+        return {
+            "message": "Replacement accepted for ingestion.",
+            "job_id": job.id,
+            "status": job.status,
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"File processing failed: {e}")
+
+
+@router.delete("/documents/{filename:path}")
+async def remove_document(
+    filename: str,
+    response: Response,
+    namespace: str = Query(DEFAULT_NAMESPACE, description="Tenant/namespace the document belongs to"),
+    db: Session = Depends(get_db),
+) -> Dict[str, Any]:
+    """
+    Delete a document's vectors, lexical index entries and metadata rows.
+
+    Answers 409 while the document is being ingested or a job for it is queued,
+    and 207 when chunks without a recorded vector id could not be deleted.
+
+    Args:
+        filename (str): Name the document was ingested under.
+        response (Response): Response whose status code is set for partial deletes.
+        namespace (str): Partition of the index the document belongs to.
+        db (Session): SQLAlchemy database session.
+
+    Returns:
+        Dict[str, Any]: Status and number of chunks and vectors deleted.
+    """
+    namespace = check_namespace(namespace)
+    try:
+        result = await run_in_threadpool(delete_document, db, filename, namespace)
+    except DocumentBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Document deletion failed: {e}")
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Document {filename} not found")
+    if result["status"] == "partial":
+        response.status_code = 207
+    return result
@@ -0,0 +1,346 @@
+import logging
+import mimetypes
+import queue
+import threading
+import time
+import zipfile
+from contextlib import ExitStack
+from typing import Any, BinaryIO, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from common import metrics
+from common.corpus import bump_corpus_generation
+from common.registry import DEFAULT_NAMESPACE
+from .documents import DocumentBusyError, acquire_document, release_document
+from .text_extraction import SUPPORTED_FILE_TYPES
+from .upload import FileIngestion, batched, iter_file_chunks, summarize_page_timings
+from .vectorstore import get_vector_store
+from ..config import (
+    get_batch_max_archive_bytes,
+    get_batch_max_files,
+    get_batch_max_member_bytes,
+    get_batch_queue_size,
+    get_embeddings,
+    get_ingest_batch_size,
+)
+from ..db.crud import has_active_job
+from ..db.models import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+ZIP_CONTENT_TYPES = ("application/zip", "application/x-zip-compressed")
+
+# Marks the end of the stream of items between pipeline stages.
+_DONE = object()
+
+
+class BatchSource(NamedTuple):
+    """A file of a batch upload, opened lazily by the extraction stage."""
+    filename: str
+    file_type: str
+    open: Callable[[], BinaryIO]
+
+
+class _BatchFile:
+    """Progress of one file through the pipeline stages."""
+
+    def __init__(self, source: BatchSource):
+        self.source = source
+        self.ingestion: Optional[FileIngestion] = None
+        self.error: Optional[str] = None
+        self.started = time.perf_counter()
+        self.page_timings: List[float] = []
+        self.result: Dict[str, Any] = {}
+        # Namespace whose document lock the file holds, None when unlocked.
+        self.locked_namespace: Optional[str] = None
+
+    def lock(self, db, namespace: str) -> None:
+        """
+        Take the file's document lock, held from the snapshot of its previous rows until `unlock`.
+
+        Raises:
+            DocumentBusyError: If an ingestion job for the file is queued or
+                running, or the file is being ingested or deleted elsewhere.
+        """
+        filename = self.source.filename
+        if has_active_job(db, filename, namespace):
+            raise DocumentBusyError(f"An ingestion job for {filename} is queued or running")
+        if not acquire_document(filename, namespace, blocking=False):
+            raise DocumentBusyError(f"{filename} is being ingested or deleted")
+        self.locked_namespace = namespace
+
+    def unlock(self) -> None:
+        if self.locked_namespace is not None:
+            release_document(self.source.filename, self.locked_namespace)
+            self.locked_namespace = None
+
+
+def collect_sources(
+    uploads: List[Tuple[str, Optional[str], BinaryIO]], stack: ExitStack
+) -> Tuple[List[BatchSource], List[Dict[str, str]]]:
+    """
+    Expand uploaded files and zip archives into the files to ingest.
+
+    Archive members are named by their path inside the archive and typed by
+    extension. Unsupported files, repeated filenames and members larger than
+    BATCH_MAX_MEMBER_BYTES uncompressed are skipped.
+
+    Args:
+        uploads (List[Tuple[str, Optional[str], BinaryIO]]): Filename, content type
+            and stream of every uploaded file.
+        stack (ExitStack): Keeps opened archives open until the batch is done.
+
+    Returns:
+        Tuple[List[BatchSource], List[Dict[str, str]]]: Files to ingest, and the
+        skipped files with the reason.
+
+    Raises:
+        ValueError: If an archive is invalid, the archives decompress to more than
+            BATCH_MAX_ARCHIVE_BYTES in total, or the batch exceeds BATCH_MAX_FILES files.
+    """
+    sources: List[BatchSource] = []
+    skipped: List[Dict[str, str]] = []
+    seen = set()
+    decompressed = 0
+
+    def add(filename: str, file_type: Optional[str], opener: Callable[[], BinaryIO]) -> None:
+        if file_type not in SUPPORTED_FILE_TYPES:
+            skipped.append({"filename": filename, "reason": "Unsupported file type"})
+        elif filename in seen:
+            skipped.append({"filename": filename, "reason": "Duplicate filename in batch"})
+        else:
+            seen.add(filename)
+            sources.append(BatchSource(filename, file_type, opener))
+
+    for filename, content_type, stream in uploads:
+        if content_type in ZIP_CONTENT_TYPES or filename.lower().endswith(".zip"):
+            try:
+                archive = stack.enter_context(zipfile.ZipFile(stream))
+            except zipfile.BadZipFile as e:
+                raise ValueError(f"Invalid zip archive {filename}: {e}") from e
+            # Sizes are checked before anything is decompressed. zipfile stops reading
+            # a member at its declared size, so a lying header cannot inflate it further.
+            members = []
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                file_type = mimetypes.guess_type(info.filename)[0]
+                if file_type in SUPPORTED_FILE_TYPES:
+                    if info.file_size > get_batch_max_member_bytes():
+                        skipped.append({"filename": info.filename, "reason": "File too large"})
+                        continue
+                    decompressed += info.file_size
+                members.append((info, file_type))
+            if decompressed > get_batch_max_archive_bytes():
+                raise ValueError(
+                    f"Zip archives of the batch decompress to more than {get_batch_max_archive_bytes()} bytes."
+                )
+            for info, file_type in members:
+                add(info.filename, file_type, lambda archive=archive, info=info: archive.open(info))
+        else:
+            add(filename, content_type, lambda stream=stream: stream)
+
+    if len(sources) > get_batch_max_files():
+        raise ValueError(f"A batch may contain at most {get_batch_max_files()} files, got {len(sources)}.")
+    return sources, skipped
+
+
+def ingest_uploads(
+    uploads: List[Tuple[str, Optional[str], BinaryIO]], strategy: str, namespace: str = DEFAULT_NAMESPACE
+) -> Dict[str, Any]:
+    """
+    Ingest uploaded files and zip archives as one batch, see `ingest_batch`.
+
+    Args:
+        uploads (List[Tuple[str, Optional[str], BinaryIO]]): Filename, content type
+            and stream of every uploaded file.
+        strategy (str): Chunking strategy ('recursive' or 'semantic').
+        namespace (str): Partition of the index to ingest into; "" for the default one.
+
+    Returns:
+        Dict[str, Any]: Per-file results and aggregate throughput.
+
+    Raises:
+        ValueError: If an archive is invalid or the batch has too many files.
+    """
+    with ExitStack() as stack:
+        sources, skipped = collect_sources(uploads, stack)
+        return ingest_batch(sources, strategy, skipped, namespace)
+
+
+@metrics.instrumented("ingest_batch")
+def ingest_batch(
+    sources: List[BatchSource],
+    strategy: str,
+    skipped: Optional[List[Dict[str, str]]] = None,
+    namespace: str = DEFAULT_NAMESPACE,
+) -> Dict[str, Any]:
+    """
+    Ingest many files through an overlapped three-stage pipeline.
+
+    One thread extracts and chunks files in order, a second embeds the chunk
+    batches and the calling thread upserts vectors and writes metadata. The
+    stages are connected by queues of at most BATCH_QUEUE_SIZE batches, so
+    extraction of one file overlaps with embedding of the previous one and
+    storage of the one before, while memory stays bounded. Each file is
+    ingested incrementally like a single upload; a failing file is reported
+    and does not stop the others. A file with a queued or running ingestion
+    job, or being ingested or deleted by another request, fails instead of
+    interleaving with it: its document lock is held from the extraction
+    stage until the store stage has finished or rolled it back.
+
+    Args:
+        sources (List[BatchSource]): Files to ingest.
+        strategy (str): Chunking strategy ('recursive' or 'semantic').
+        skipped (Optional[List[Dict[str, str]]]): Files left out of the batch, echoed in the result.
+        namespace (str): Partition of the index to ingest into; "" for the default one.
+
+    Returns:
+        Dict[str, Any]: Per-file results and throughput, aggregate throughput
+        and the busy seconds of every stage.
+    """
+    started = time.perf_counter()
+    embeddings = get_embeddings()
+    get_vector_store(namespace).ensure_index()
+    embed_queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, get_batch_queue_size()))
+    store_queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, get_batch_queue_size()))
+    stage_seconds = {"extract_and_chunk": 0.0, "embed": 0.0, "store": 0.0, "metadata": 0.0}
+
+    # Every file of the batch, so locks still held if the store stage dies are released.
+    batch_files: List[_BatchFile] = []
+
+    def extract_stage() -> None:
+        busy = 0.0
+        try:
+            with SessionLocal() as db:
+                for source in sources:
+                    file = _BatchFile(source)
+                    batch_files.append(file)
+                    resumed = time.perf_counter()
+                    try:
+                        file.lock(db, namespace)
+                        file.ingestion = FileIngestion(db, source.filename, namespace)
+                        with source.open() as stream:
+                            chunks = iter_file_chunks(
+                                strategy, source.filename, source.file_type, stream, file.page_timings, embeddings,
+                            )
+                            for batch in batched(chunks, get_ingest_batch_size()):
+                                busy += time.perf_counter() - resumed
+                                embed_queue.put((file, batch))
+                                resumed = time.perf_counter()
+                    except Exception as e:
+                        file.error = str(e)
+                    busy += time.perf_counter() - resumed
+                    embed_queue.put((file, None))
+        finally:
+            stage_seconds["extract_and_chunk"] = busy
+            embed_queue.put(_DONE)
+
+    def embed_stage() -> None:
+        item = None
+        try:
+            with SessionLocal() as db:
+                while (item := embed_queue.get()) is not _DONE:
+                    file, batch = item
+                    if batch is not None and file.error is None:
+                        try:
+                            batch = file.ingestion.prepare(
+                                db, [doc for doc, _ in batch], [vector for _, vector in batch]
+                            )
+                        except Exception as e:
+                            file.error = str(e)
+                    store_queue.put((file, batch))
+        finally:
+            # Keep draining so the extraction thread never blocks on a full queue.
+            while item is not _DONE:
+                item = embed_queue.get()
+            store_queue.put(_DONE)
+
+    threads = [
+        threading.Thread(target=extract_stage, name="batch-extract", daemon=True),
+        threading.Thread(target=embed_stage, name="batch-embed", daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+
+    files: List[Dict[str, Any]] = []
+    changed = False
+    try:
+        with SessionLocal() as db:
+            while (item := store_queue.get()) is not _DONE:
+                file, prepared = item
+                if prepared is not None:
+                    if file.error is None:
+                        try:
+                            file.ingestion.store(db, prepared)
+                        except Exception as e:
+                            file.error = str(e)
+                    continue
+                # End of the file
+                if file.ingestion is not None:
+                    for stage in ("embed", "store", "metadata"):
+                        stage_seconds[stage] += file.ingestion.timings[f"{stage}_seconds"]
+                if file.error is None and not file.ingestion.chunks:
+                    file.error = "No chunks produced from the file."
+                if file.error is None:
+                    try:
+                        changed = file.ingestion.finish(db) or changed
+                    except Exception as e:
+                        file.error = str(e)
+                if file.error is not None and file.ingestion is not None:
+                    # Leave the previous version of the file intact, without this run's vectors and rows.
+                    file.ingestion.abort(db)
+                file.unlock()
+                files.append(_file_result(file))
+        for thread in threads:
+            thread.join()
+    finally:
+        for file in batch_files:
+            file.unlock()
+
+    if changed:
+        # Changed chunks can change retrieval results, so answers cached for the old corpus go stale
+        bump_corpus_generation()
+
+    total_seconds = time.perf_counter() - started
+    completed = [file for file in files if file["status"] == "completed"]
+    chunks = sum(file["chunks_length"] for file in completed)
+    logger.info(
+        "Batch ingested %d/%d files, %d chunks in %.2fs",
+        len(completed), len(files), chunks, total_seconds,
+    )
+    return {
+        "files": files,
+        "skipped": skipped or [],
+        "files_completed": len(completed),
+        "files_failed": len(files) - len(completed),
+        "chunks_length": chunks,
+        "total_seconds": total_seconds,
+        "files_per_second": len(completed) / total_seconds if total_seconds else 0.0,
+        "chunks_per_second": chunks / total_seconds if total_seconds else 0.0,
+        # Busy time per stage; their sum exceeding total_seconds is the overlap gained.
+        "stage_seconds": stage_seconds,
+    }
+
+
+def _file_result(file: _BatchFile) -> Dict[str, Any]:
+    seconds = time.perf_counter() - file.started
+    if file.error is not None:
+        logger.warning("Batch ingestion of %s failed: %s", file.source.filename, file.error)
+        return {"filename": file.source.filename, "status": "failed", "error": file.error, "seconds": seconds}
+    ingestion = file.ingestion
+    return {
+        "filename": file.source.filename,
+        "status": "completed",
+        "chunks_length": ingestion.chunks,
+        "chunks_embedded": ingestion.counts["embedded"],
+        "chunks_derived": ingestion.counts["derived"],
+        "chunks_from_cache": ingestion.counts["cache_hits"],
+        "chunks_unchanged": ingestion.counts["unchanged"],
+        "chunks_repositioned": ingestion.counts["repositioned"],
+        "chunks_deleted": ingestion.counts["deleted"],
+        # Wall time from the start of extraction to the end of storage, including queueing.
+        "seconds": seconds,
+        "chunks_per_second": ingestion.chunks / seconds if seconds else 0.0,
+        **({"extraction": summarize_page_timings(file.source.filename, file.page_timings)}
+           if file.page_timings else {}),
+    }
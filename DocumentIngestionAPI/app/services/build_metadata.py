@@ -1,8 +1,14 @@
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from langchain_core.documents import Document
 
-def build_metadata(docs_to_index: List[Document], filename: str) -> List[Dict[str, Any]]:
+def build_metadata(
+    docs_to_index: List[Document],
+    filename: str,
+    vector_ids: Optional[List[str]] = None,
+    content_hashes: Optional[List[str]] = None,
+    namespace: str = "",
+) -> List[Dict[str, Any]]:
     """
     Build structured metadata for a list of LangChain Document chunks.
 
@@ -11,19 +17,30 @@ def build_metadata(docs_to_index: List[Document], filename: str) -> List[Dict[st
             List of Document objects representing the text chunks to be indexed.
         filename (str): 
             The original source filename for the document.
+        vector_ids (Optional[List[str]]):
+            Vector id of each chunk, in the same order.
+        content_hashes (Optional[List[str]]):
+            Content hash of each chunk, in the same order.
+        namespace (str):
+            Namespace the chunks are stored in.
 
     Returns:
         List[Dict[str, Any]]: 
             A list of metadata dictionaries containing indexing details.
     """
+    # One timestamp for the whole batch; the chunks are created together anyway.
+    created_at = datetime.now()
     metadata_list: List[Dict[str, Any]] = []
-    for doc in docs_to_index:
+    for position, doc in enumerate(docs_to_index):
         metadata_list.append(
             {
                 "chunk_index": doc.metadata.get("chunk_index"),
                 "chunk_strategy": doc.metadata.get("strategy"),
                 "chunk_filename": filename,
-                "created_at": datetime.now(),
+                "namespace": namespace,
+                "vector_id": vector_ids[position] if vector_ids else None,
+                "content_hash": content_hashes[position] if content_hashes else None,
+                "created_at": created_at,
             }
         )
-    return metadata_list
\ No newline at end of file
+    return metadata_list
@@ -1,7 +1,9 @@
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_experimental.text_splitter import SemanticChunker
 from langchain_core.documents import Document
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+
+from .semantic_chunking import get_semantic_chunker
+from ..config import get_semantic_chunk_vector_mode
 
 def recursive_text_splitter(content: str)-> List[str]:
     """
@@ -21,6 +23,10 @@ def recursive_text_splitter(content: str)-> List[str]:
     )
     return recursive_char_chunker.split_text(content)
 
+# Characters of text buffered before splitting when chunking a stream. The last chunk of
+# every window is carried over, since it may continue in the next piece of text.
+STREAM_WINDOW_CHARS = {"recursive": 16_000, "semantic": 64_000}
+
 def semantic_text_splitter(embeddings, content: str)-> List[str]:
     """
     Split text using LangChain's SemanticChunker.
@@ -32,8 +38,7 @@ def semantic_text_splitter(embeddings, content: str)-> List[str]:
     Returns:
         List[str]: List of text chunks.
     """
-    semantic_chunker = SemanticChunker(embeddings)
-    return semantic_chunker.split_text(content)
+    return get_semantic_chunker(embeddings).split_text(content)
 
 
 def get_text_chunks(
@@ -90,4 +95,84 @@ def get_text_chunks(
 
     stats["strategy_used"] = strategy
     stats["total_chunks"] = len(docs_to_index)
-    return docs_to_index, stats
\ No newline at end of file
+    return docs_to_index, stats
+
+
+def iter_text_chunks(
+    strategy: str, filename: str, text_pieces: Iterable[str], embeddings: Any) -> Iterator[Document]:
+    """
+    Chunk a stream of text pieces as they arrive, see `iter_chunks_with_vectors`.
+
+    Yields:
+        Document: Chunks with metadata, in document order.
+    """
+    for doc, _ in iter_chunks_with_vectors(strategy, filename, text_pieces, embeddings):
+        yield doc
+
+
+def iter_chunks_with_vectors(
+    strategy: str, filename: str, text_pieces: Iterable[str], embeddings: Any
+) -> Iterator[Tuple[Document, Optional[List[float]]]]:
+    """
+    Chunk a stream of text pieces as they arrive.
+
+    Text is buffered up to a strategy-specific window, split, and every chunk
+    except the last is emitted; the last one is carried into the next window.
+    Memory stays proportional to the window rather than to the document.
+
+    With the semantic strategy and SEMANTIC_CHUNK_VECTOR_MODE=mean, chunks come
+    with a vector derived from the sentence embeddings the chunker computed,
+    so they do not need to be embedded again.
+
+    Args:
+        strategy (str): 'recursive' or 'semantic'.
+        filename (str): Name of the file being processed.
+        text_pieces (Iterable[str]): Consecutive pieces of the document text.
+        embeddings: HuggingFace embeddings object (for semantic strategy).
+
+    Yields:
+        Tuple[Document, Optional[List[float]]]: Chunks with metadata, in document
+        order, and their vector when one was derived while chunking.
+    """
+    if strategy == "recursive":
+        split = lambda text: [(chunk, None) for chunk in recursive_text_splitter(text)]
+    elif strategy == "semantic":
+        chunker = get_semantic_chunker(embeddings)
+        if get_semantic_chunk_vector_mode() == "mean":
+            split = chunker.split_text_with_vectors
+        else:
+            split = lambda text: [(chunk, None) for chunk in chunker.split_text(text)]
+    else:
+        raise ValueError(f"Unknown chunking strategy: {strategy}")
+
+    window = STREAM_WINDOW_CHARS[strategy]
+    pieces: List[str] = []
+    buffered = 0
+    chunk_index = 0
+
+    def make_document(chunk: str) -> Document:
+        return Document(
+            page_content=chunk,
+            metadata={
+                "strategy": strategy,
+                "filename": filename,
+                "chunk_index": chunk_index,
+            },
+        )
+
+    for piece in text_pieces:
+        pieces.append(piece)
+        buffered += len(piece)
+        if buffered < window:
+            continue
+        chunks = split("".join(pieces))
+        for chunk, vector in chunks[:-1]:
+            yield make_document(chunk), vector
+            chunk_index += 1
+        pieces = [chunk for chunk, _ in chunks[-1:]]
+        buffered = sum(len(p) for p in pieces)
+
+    if pieces:
+        for chunk, vector in split("".join(pieces)):
+            yield make_document(chunk), vector
+            chunk_index += 1
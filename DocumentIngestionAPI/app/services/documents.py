@@ -0,0 +1,145 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from common import metrics
+from common.corpus import bump_corpus_generation
+from common.registry import DEFAULT_NAMESPACE
+from ..db.crud import delete_chunks, get_file_chunks, has_active_job
+from .vectorstore import delete_embeddings, delete_file_embeddings
+
+logger = logging.getLogger(__name__)
+
+# (namespace, filename) -> [lock, threads holding or waiting for it]; entries go once unused.
+_document_locks: Dict[Tuple[str, str], List[Any]] = {}
+_document_locks_guard = threading.Lock()
+
+
+class DocumentBusyError(RuntimeError):
+    """Raised when a document is deleted or ingested while another ingestion of it is queued or running."""
+
+
+def acquire_document(filename: str, namespace: str = DEFAULT_NAMESPACE, blocking: bool = True) -> bool:
+    """
+    Take the lock serializing ingestion and deletion of one document within this process.
+
+    Every document has its own lock, so unrelated documents never wait on each
+    other. Release with `release_document`, possibly from another thread.
+
+    Returns:
+        bool: False if `blocking` is False and the document is already locked.
+    """
+    key = (namespace, filename)
+    with _document_locks_guard:
+        entry = _document_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    if entry[0].acquire(blocking):
+        return True
+    _forget_document_lock(key)
+    return False
+
+
+def release_document(filename: str, namespace: str = DEFAULT_NAMESPACE) -> None:
+    """Release a lock taken with `acquire_document`."""
+    key = (namespace, filename)
+    _document_locks[key][0].release()
+    _forget_document_lock(key)
+
+
+def _forget_document_lock(key: Tuple[str, str]) -> None:
+    with _document_locks_guard:
+        entry = _document_locks[key]
+        entry[1] -= 1
+        if not entry[1]:
+            del _document_locks[key]
+
+
+@contextmanager
+def document_lock(filename: str, namespace: str = DEFAULT_NAMESPACE, blocking: bool = True) -> Iterator[None]:
+    """
+    Hold the document's lock, see `acquire_document`.
+
+    Raises:
+        DocumentBusyError: If `blocking` is False and the document is already locked.
+    """
+    if not acquire_document(filename, namespace, blocking):
+        raise DocumentBusyError(f"{filename} is being ingested or deleted")
+    try:
+        yield
+    finally:
+        release_document(filename, namespace)
+
+
+def _check_no_active_job(db: Session, filename: str, namespace: str) -> None:
+    if has_active_job(db, filename, namespace):
+        raise DocumentBusyError(f"An ingestion job for {filename} is queued or running")
+
+
+@metrics.instrumented("delete_document")
+def delete_document(db: Session, filename: str, namespace: str = DEFAULT_NAMESPACE) -> Optional[Dict[str, Any]]:
+    """
+    Remove an ingested file: its vectors, lexical index entries and metadata rows.
+
+    The file's chunks are found through the (namespace, filename) index of the
+    metadata table, and their vector ids are deleted in batches, so the work is
+    proportional to the file's chunk count rather than to the corpus. Vectors
+    go first: if their deletion fails the metadata rows still point at them
+    and the call can be retried.
+
+    Rows ingested before vector ids were recorded are removed through a
+    filename filter on the vector backend. Backends that cannot delete by
+    metadata (Pinecone serverless) keep those rows and vectors, and the
+    result reports status "partial".
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        filename (str): Name the file was ingested under.
+        namespace (str): Namespace the file was ingested into.
+
+    Returns:
+        Optional[Dict[str, Any]]: Status and counts of deleted chunks and vectors,
+        or None if no chunks are recorded for the file.
+
+    Raises:
+        DocumentBusyError: If an ingestion job for the file is queued or running,
+            or the file is being ingested; the delete does not wait for it.
+    """
+    started = time.perf_counter()
+    _check_no_active_job(db, filename, namespace)
+    with document_lock(filename, namespace, blocking=False):
+        # Checked again under the lock: a job may have started since.
+        _check_no_active_job(db, filename, namespace)
+        rows = get_file_chunks(db, filename, namespace)
+        if not rows:
+            return None
+        vector_ids = sorted({vector_id for _, vector_id, _, _ in rows if vector_id})
+        delete_embeddings(vector_ids, namespace)
+        # Rows ingested before vector ids were recorded cannot be traced to their vectors by id.
+        untracked = [row_id for row_id, vector_id, _, _ in rows if not vector_id]
+        if untracked and not delete_file_embeddings(filename, namespace):
+            logger.warning("%d chunks of %s have no recorded vector id and the backend cannot delete by filename; "
+                           "their rows and vectors were kept", len(untracked), filename)
+            deleted = [row_id for row_id, vector_id, _, _ in rows if vector_id]
+        else:
+            deleted = [row_id for row_id, *_ in rows]
+            untracked = []
+        delete_chunks(db, deleted)
+        # Retrieval results change, so answers cached for the old corpus go stale
+        bump_corpus_generation()
+
+    seconds = time.perf_counter() - started
+    logger.info("Deleted %s from namespace %r: %d chunks, %d vectors in %.2fs",
+                filename, namespace, len(deleted), len(vector_ids), seconds)
+    return {
+        "filename": filename,
+        "namespace": namespace,
+        "status": "partial" if untracked else "deleted",
+        "chunks_deleted": len(deleted),
+        "vectors_deleted": len(vector_ids),
+        "untracked_chunks": len(untracked),
+        "seconds": seconds,
+    }
@@ -0,0 +1,46 @@
+from typing import List, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from common import metrics, registry
+from ..config import get_embeddings
+from ..db.crud import get_cached_embeddings, save_cached_embeddings
+
+
+@metrics.instrumented("embed_chunks")
+def embed_texts_cached(db: Session, texts: List[str], content_hashes: List[str]) -> Tuple[List[List[float]], int]:
+    """
+    Embed chunk texts, reusing embeddings cached in the database by content hash.
+
+    Only texts whose hash is not cached for the current embedding model are sent
+    to the model; their vectors are cached for later uploads.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        texts (List[str]): Chunk texts to embed.
+        content_hashes (List[str]): Content hash of each text, in the same order.
+
+    Returns:
+        Tuple[List[List[float]], int]: One vector per text, and how many came from the cache.
+    """
+    model = registry.get_embedding_model_tag()
+    cached = {
+        content_hash: np.frombuffer(embedding, dtype=np.float32).tolist()
+        for content_hash, embedding in get_cached_embeddings(db, model, content_hashes).items()
+    }
+
+    missing = {content_hash: text for content_hash, text in zip(content_hashes, texts) if content_hash not in cached}
+    if missing:
+        vectors = get_embeddings().embed_documents(list(missing.values()))
+        computed = dict(zip(missing, vectors))
+        save_cached_embeddings(db, model, {
+            content_hash: np.asarray(vector, dtype=np.float32).tobytes()
+            for content_hash, vector in computed.items()
+        })
+        cached.update(computed)
+
+    hits = sum(1 for content_hash in content_hashes if content_hash not in missing)
+    metrics.count(metrics.CACHE_EVENTS, hits, cache="chunk_embedding", result="hit")
+    metrics.count(metrics.CACHE_EVENTS, len(content_hashes) - hits, cache="chunk_embedding", result="miss")
+    return [cached[content_hash] for content_hash in content_hashes], hits
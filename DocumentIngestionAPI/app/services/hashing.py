@@ -0,0 +1,25 @@
+import xxhash
+
+
+def content_hash(text: str) -> str:
+    """Return the 128-bit xxHash of a chunk text, used to key its cached embedding."""
+    return xxhash.xxh3_128_hexdigest(text.encode("utf-8"))
+
+
+def chunk_vector_id(filename: str, text: str) -> str:
+    """
+    Return the deterministic vector id of a chunk.
+
+    The id hashes the chunk text together with its filename, so re-uploading a
+    file maps unchanged chunks onto their existing vectors, while identical
+    boilerplate in two different files still gets two vectors that can be
+    deleted independently.
+
+    Args:
+        filename (str): Name of the file the chunk belongs to.
+        text (str): Chunk text.
+
+    Returns:
+        str: 32-character hex id.
+    """
+    return xxhash.xxh3_128_hexdigest(f"{filename}\0{text}".encode("utf-8"))
@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import os
+import shutil
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, BinaryIO, Dict, Optional, Set
+
+from common.db import get_async_sessionmaker
+from common.registry import DEFAULT_NAMESPACE
+from ..config import get_ingest_job_workers, get_job_stale_seconds, get_job_storage_dir
+from ..db.crud import claim_job, create_job, create_job_async, get_job, list_resumable_job_ids, update_job
+from ..db.models import IngestionJob, SessionLocal
+from .upload import upload_to_db
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+# Jobs submitted to this process's pool and not finished yet, so sweeps don't queue them twice.
+_submitted: Set[str] = set()
+_submitted_lock = threading.Lock()
+_sweeper: Optional[threading.Thread] = None
+_sweeper_stop = threading.Event()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=get_ingest_job_workers(),
+                    thread_name_prefix="ingestion-job",
+                )
+    return _executor
+
+
+def _stale_before() -> datetime:
+    return datetime.now() - timedelta(seconds=get_job_stale_seconds())
+
+
+def _heartbeat_seconds() -> float:
+    # Several beats per stale period, so a live job never looks abandoned.
+    return max(1.0, get_job_stale_seconds() / 3)
+
+
+def enqueue_upload(
+    db, source: BinaryIO, filename: str, file_type: str, strategy: str, namespace: str = DEFAULT_NAMESPACE
+) -> IngestionJob:
+    """
+    Persist an upload to disk, record a queued job and hand it to the worker pool.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        source (BinaryIO): Readable binary stream of the file content.
+        filename (str): Name of the uploaded file.
+        file_type (str): MIME type of the file.
+        strategy (str): Chunking strategy.
+        namespace (str): Partition of the index to ingest into; "" for the default one.
+
+    Returns:
+        IngestionJob: The queued job.
+    """
+    job_id = str(uuid.uuid4())
+    file_path = persist_upload(source, job_id)
+    try:
+        job = create_job(db, job_id, filename, file_type, strategy, file_path, namespace)
+    except Exception:
+        db.rollback()
+        _discard_upload(file_path)
+        raise
+    submit_job(job_id)
+    return job
+
+
+async def enqueue_upload_async(
+    source: BinaryIO, filename: str, file_type: str, strategy: str, namespace: str = DEFAULT_NAMESPACE
+) -> IngestionJob:
+    """
+    Async variant of `enqueue_upload` recording the job through the async engine.
+
+    Only the file copy runs in a worker thread; the job row is written on the event loop.
+    """
+    job_id = str(uuid.uuid4())
+    file_path = await asyncio.to_thread(persist_upload, source, job_id)
+    try:
+        async with get_async_sessionmaker()() as db:
+            job = await create_job_async(db, job_id, filename, file_type, strategy, file_path, namespace)
+    except BaseException:
+        _discard_upload(file_path)
+        raise
+    submit_job(job_id)
+    return job
+
+
+def persist_upload(source: BinaryIO, job_id: str) -> str:
+    """Copy an upload into JOB_STORAGE_DIR and return the path of the copy."""
+    storage_dir = get_job_storage_dir()
+    os.makedirs(storage_dir, exist_ok=True)
+    file_path = os.path.join(storage_dir, job_id)
+    with open(file_path, "wb") as f:
+        shutil.copyfileobj(source, f, 1024 * 1024)
+    return file_path
+
+
+def _discard_upload(file_path: str) -> None:
+    """Remove a persisted upload whose job could not be recorded or has ended."""
+    try:
+        os.remove(file_path)
+    except OSError as e:
+        logger.warning("Could not remove orphaned upload %s: %s", file_path, e)
+
+
+def submit_job(job_id: str) -> bool:
+    """
+    Schedule a job on the ingestion worker pool.
+
+    Returns:
+        bool: False if the job is already waiting or running in this process.
+    """
+    with _submitted_lock:
+        if job_id in _submitted:
+            return False
+        _submitted.add(job_id)
+    _get_executor().submit(run_job, job_id)
+    return True
+
+
+def _beat(job_id: str, stop: threading.Event) -> None:
+    """Refresh a running job's heartbeat until `stop` is set, even while a stage reports no progress."""
+    while not stop.wait(_heartbeat_seconds()):
+        try:
+            with SessionLocal() as db:
+                update_job(db, job_id)
+        except Exception as e:
+            logger.warning("Heartbeat of ingestion job %s failed: %s", job_id, e)
+
+
+def run_job(job_id: str) -> None:
+    """
+    Run one ingestion job, recording progress, timings and the outcome.
+
+    The job is claimed first, so a job already picked up by a live worker is skipped.
+
+    Args:
+        job_id (str): Unique job identifier.
+    """
+    db = SessionLocal()
+    heartbeat_stop = threading.Event()
+    try:
+        if not claim_job(db, job_id, _stale_before()):
+            return
+        threading.Thread(
+            target=_beat, args=(job_id, heartbeat_stop), name=f"ingestion-heartbeat-{job_id[:8]}", daemon=True
+        ).start()
+        job = get_job(db, job_id)
+
+        def progress(stage: str, chunks: int) -> None:
+            update_job(db, job_id, stage=stage, chunks_processed=chunks)
+
+        try:
+            with open(job.file_path, "rb") as source:
+                result = upload_to_db(
+                    source, job.file_type, job.filename, job.strategy, db, progress, job.namespace or DEFAULT_NAMESPACE
+                )
+        except Exception as e:
+            db.rollback()
+            logger.error("Ingestion job %s failed: %s", job_id, e)
+            update_job(db, job_id, status="failed", stage="failed", error=str(e), finished_at=datetime.now())
+            # Failed is final, nothing will read the upload again.
+            _discard_upload(job.file_path)
+            return
+
+        timings = result.pop("timings")
+        update_job(
+            db, job_id,
+            status="completed",
+            stage="done",
+            chunks_processed=result["chunks_length"],
+            timings=timings,
+            result=result,
+            finished_at=datetime.now(),
+        )
+        _discard_upload(job.file_path)
+        logger.info("Ingestion job %s completed with %d chunks", job_id, result["chunks_length"])
+    except Exception as e:
+        logger.error("Ingestion job %s could not be run: %s", job_id, e, exc_info=True)
+    finally:
+        heartbeat_stop.set()
+        db.close()
+        with _submitted_lock:
+            _submitted.discard(job_id)
+
+
+def resume_unfinished_jobs() -> int:
+    """
+    Resubmit jobs left queued or abandoned mid-run by a previous worker.
+
+    Returns:
+        int: Number of jobs resubmitted.
+    """
+    with SessionLocal() as db:
+        job_ids = list_resumable_job_ids(db, _stale_before())
+    resumed = sum(submit_job(job_id) for job_id in job_ids)
+    if resumed:
+        logger.info("Resumed %d unfinished ingestion jobs", resumed)
+    return resumed
+
+
+def _sweep() -> None:
+    while not _sweeper_stop.wait(get_job_stale_seconds()):
+        try:
+            resume_unfinished_jobs()
+        except Exception as e:
+            logger.warning("Sweep for unfinished ingestion jobs failed: %s", e)
+
+
+def start_job_sweeper() -> None:
+    """
+    Resume unfinished jobs now and then every JOB_STALE_SECONDS.
+
+    Running jobs heartbeat while they run, so a job counts as abandoned only
+    once its worker is gone. The periodic sweep also picks up jobs of a worker
+    that crashed and came back before they went stale at its own startup.
+    """
+    global _sweeper
+    resume_unfinished_jobs()
+    if _sweeper is None or not _sweeper.is_alive():
+        _sweeper_stop.clear()
+        _sweeper = threading.Thread(target=_sweep, name="ingestion-job-sweeper", daemon=True)
+        _sweeper.start()
+
+
+def stop_job_sweeper() -> None:
+    """Stop the periodic sweep on shutdown."""
+    _sweeper_stop.set()
+
+
+def job_status(job: IngestionJob) -> Dict[str, Any]:
+    """Serialize an ingestion job for the status endpoint."""
+    return {
+        "job_id": job.id,
+        "filename": job.filename,
+        "namespace": job.namespace,
+        "strategy": job.strategy,
+        "status": job.status,
+        "stage": job.stage,
+        "chunks_processed": job.chunks_processed,
+        "attempts": job.attempts,
+        "timings": job.timings,
+        "result": job.result,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
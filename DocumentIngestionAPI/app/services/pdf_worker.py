@@ -0,0 +1,28 @@
+import time
+from typing import List, Tuple
+
+# Kept free of application imports: process pool workers import only this module.
+
+
+def extract_page_range(path: str, start: int, stop: int) -> List[Tuple[str, float]]:
+    """
+    Extract the text of pages [start, stop) of a PDF on disk.
+
+    Args:
+        path (str): Path of the PDF file.
+        start (int): First page number (0-based, inclusive).
+        stop (int): Last page number (exclusive).
+
+    Returns:
+        List[Tuple[str, float]]: Text and extraction time in seconds for each page, in order.
+    """
+    # Imported on first use, so that importing the app does not load PyMuPDF.
+    import fitz
+
+    pages: List[Tuple[str, float]] = []
+    with fitz.open(path) as doc:
+        for page_number in range(start, stop):
+            started = time.perf_counter()
+            text = doc[page_number].get_text()
+            pages.append((text, time.perf_counter() - started))
+    return pages
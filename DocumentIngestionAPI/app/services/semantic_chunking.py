@@ -0,0 +1,104 @@
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_experimental.text_splitter import SemanticChunker
+
+logger = logging.getLogger(__name__)
+
+_chunkers: Dict[int, "VectorSemanticChunker"] = {}
+_chunkers_lock = threading.Lock()
+
+# Private SemanticChunker helpers split_text_with_vectors is built on; they are
+# not part of its API, so a langchain_experimental release may drop them.
+_CHUNKER_HELPERS = (
+    "_get_single_sentences_list",
+    "_calculate_sentence_distances",
+    "_calculate_breakpoint_threshold",
+    "_threshold_from_clusters",
+)
+_HAS_CHUNKER_HELPERS = all(callable(getattr(SemanticChunker, name, None)) for name in _CHUNKER_HELPERS)
+if not _HAS_CHUNKER_HELPERS:
+    logger.warning("SemanticChunker lacks %s; semantic chunks will be embedded separately",
+                   ", ".join(name for name in _CHUNKER_HELPERS if not hasattr(SemanticChunker, name)))
+
+
+class VectorSemanticChunker(SemanticChunker):
+    """
+    SemanticChunker that also returns a vector for every chunk.
+
+    Finding breakpoints already embeds every sentence together with its
+    neighbours; the vector of a chunk is the L2-normalised mean of those
+    embeddings over the chunk's sentences, so chunks do not need to go through
+    the embedding model a second time. Breakpoints are chosen exactly like
+    SemanticChunker does.
+
+    This relies on private SemanticChunker helpers. Without them, chunks come
+    from plain `split_text` with no vector, and ingestion embeds them.
+    """
+
+    def split_text_with_vectors(self, text: str) -> List[Tuple[str, Optional[List[float]]]]:
+        """
+        Split text into semantic chunks.
+
+        Args:
+            text (str): The text to split.
+
+        Returns:
+            List[Tuple[str, Optional[List[float]]]]: Chunks with their derived
+            vectors; the vector is None when the text was too short to be embedded,
+            or when this langchain_experimental lacks the helpers used to derive it.
+        """
+        if not _HAS_CHUNKER_HELPERS:
+            return [(chunk, None) for chunk in self.split_text(text)]
+        single_sentences_list = self._get_single_sentences_list(text)
+        # Mirrors SemanticChunker.split_text, which returns these unembedded.
+        if len(single_sentences_list) == 1 or (
+            self.breakpoint_threshold_type == "gradient" and len(single_sentences_list) == 2
+        ):
+            return [(sentence, None) for sentence in single_sentences_list]
+
+        distances, sentences = self._calculate_sentence_distances(single_sentences_list)
+        if self.number_of_chunks is not None:
+            threshold = self._threshold_from_clusters(distances)
+            breakpoint_array = distances
+        else:
+            threshold, breakpoint_array = self._calculate_breakpoint_threshold(distances)
+
+        groups: List[List[dict]] = []
+        start_index = 0
+        for index, distance in enumerate(breakpoint_array):
+            if distance <= threshold:
+                continue
+            group = sentences[start_index:index + 1]
+            if self.min_chunk_size is not None and len(" ".join(d["sentence"] for d in group)) < self.min_chunk_size:
+                continue
+            groups.append(group)
+            start_index = index + 1
+        if start_index < len(sentences):
+            groups.append(sentences[start_index:])
+
+        return [
+            (" ".join(d["sentence"] for d in group), _mean_vector([d["combined_sentence_embedding"] for d in group]))
+            for group in groups
+        ]
+
+
+def _mean_vector(vectors: List[List[float]]) -> List[float]:
+    mean = np.mean(np.asarray(vectors, dtype=np.float32), axis=0)
+    norm = np.linalg.norm(mean)
+    return (mean / norm if norm else mean).tolist()
+
+
+def get_semantic_chunker(embeddings: Embeddings) -> VectorSemanticChunker:
+    """Return the semantic chunker for an embeddings object, built once per process."""
+    chunker = _chunkers.get(id(embeddings))
+    if chunker is None:
+        with _chunkers_lock:
+            chunker = _chunkers.get(id(embeddings))
+            if chunker is None:
+                chunker = VectorSemanticChunker(embeddings)
+                _chunkers[id(embeddings)] = chunker
+    return chunker
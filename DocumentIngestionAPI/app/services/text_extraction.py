@@ -1,35 +1,176 @@
-import fitz 
+import codecs
+import io
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+from typing import BinaryIO, Iterator, List, Optional, Tuple
 
-def extract_text(file_type: str, content_bytes: bytes) -> str:
+from .pdf_worker import extract_page_range
+from ..config import get_pdf_extract_workers, get_pdf_pages_per_task, get_pdf_parallel_min_pages
+
+SUPPORTED_FILE_TYPES = ("text/plain", "application/pdf")
+
+# Size of the blocks read from uploads, both for text decoding and for spooling PDFs to disk.
+READ_BLOCK_SIZE = 1024 * 1024
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn keeps workers independent of the server's threads and open sockets
+                _pool = ProcessPoolExecutor(
+                    max_workers=get_pdf_extract_workers(),
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _pool
+
+
+def iter_pdf_pages(path: str) -> Iterator[Tuple[str, float]]:
     """
-    Extract text from .txt or .pdf content bytes.
+    Extract PDF pages in order, in parallel for large documents.
+
+    Documents with at least PDF_PARALLEL_MIN_PAGES pages are split into ranges
+    of PDF_PAGES_PER_TASK pages that a process pool extracts from the file on
+    disk; at most two ranges per worker are in flight, and results are
+    reassembled in page order. Smaller documents are extracted in-process.
+
+    Args:
+        path (str): Path of the PDF file.
+
+    Yields:
+        Tuple[str, float]: Page text and extraction time in seconds, in page order.
+
+    Raises:
+        RuntimeError: If reading the PDF fails.
+    """
+    import fitz
+
+    try:
+        with fitz.open(path) as doc:
+            page_count = doc.page_count
+            workers = get_pdf_extract_workers()
+            if workers <= 1 or page_count < get_pdf_parallel_min_pages():
+                for page in doc:
+                    started = time.perf_counter()
+                    text = page.get_text()
+                    yield text, time.perf_counter() - started
+                return
+    except RuntimeError:
+        raise
+    except Exception as e:
+        raise RuntimeError(f"Failed to read PDF: {e}") from e
+
+    pool = _get_process_pool()
+    size = get_pdf_pages_per_task()
+    ranges = ((start, min(start + size, page_count)) for start in range(0, page_count, size))
+    pending = deque(pool.submit(extract_page_range, path, start, stop) for start, stop in islice(ranges, 2 * workers))
+    try:
+        while pending:
+            try:
+                pages = pending.popleft().result()
+            except Exception as e:
+                raise RuntimeError(f"Failed to read PDF: {e}") from e
+            next_range = next(ranges, None)
+            if next_range is not None:
+                pending.append(pool.submit(extract_page_range, path, *next_range))
+            yield from pages
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+@contextmanager
+def spooled_pdf_path(source: BinaryIO) -> Iterator[str]:
+    """
+    Copy an upload stream to a temporary file so PyMuPDF can open it lazily by path.
+
+    Args:
+        source (BinaryIO): Readable binary stream positioned at the start of the PDF.
+
+    Yields:
+        str: Path of the temporary PDF, removed on exit.
+    """
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            shutil.copyfileobj(source, tmp, READ_BLOCK_SIZE)
+        yield path
+    finally:
+        os.remove(path)
+
+
+def iter_text(file_type: str, source: BinaryIO, page_timings: Optional[List[float]] = None) -> Iterator[str]:
+    """
+    Incrementally extract text from a .txt or .pdf stream.
+
+    Text files are decoded block by block and PDFs page by page, so only one
+    block or page is held in memory at a time.
 
     Args:
         file_type (str): MIME type of the file ('text/plain' or 'application/pdf').
-        content_bytes (bytes): The raw content of the file.
+        source (BinaryIO): Readable binary stream of the file content.
+        page_timings (Optional[List[float]]): If given, receives the extraction
+            time in seconds of every PDF page, in page order.
 
-    Returns:
-        str: Extracted text content.
+    Yields:
+        str: Consecutive pieces of the extracted text.
 
     Raises:
         ValueError: If the file type is unsupported or content is empty/unreadable.
         RuntimeError: If reading a PDF fails.
     """
-    content = ""
+    has_content = False
 
     if file_type == 'text/plain':
-        content = content_bytes.decode('utf-8')
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        while True:
+            block = source.read(READ_BLOCK_SIZE)
+            text = decoder.decode(block, final=not block)
+            if text:
+                has_content = has_content or bool(text.strip())
+                yield text
+            if not block:
+                break
     elif file_type == 'application/pdf':
-        try:
-            with fitz.open(stream=content_bytes, filetype="pdf") as doc:
-                for page in doc:
-                    content += page.get_text()
-        except Exception as e:
-            raise RuntimeError(f"Failed to read PDF: {e}") from e
+        with spooled_pdf_path(source) as path:
+            for text, seconds in iter_pdf_pages(path):
+                if page_timings is not None:
+                    page_timings.append(seconds)
+                has_content = has_content or bool(text.strip())
+                yield text
     else:
         raise ValueError("Unsupported file type. Please upload .txt or .pdf")
 
-    if not content.strip():
+    if not has_content:
         raise ValueError("The file appears to be empty or unreadable.")
-    
-    return content
\ No newline at end of file
+
+
+def extract_text(file_type: str, content_bytes: bytes) -> str:
+    """
+    Extract text from .txt or .pdf content bytes.
+
+    Args:
+        file_type (str): MIME type of the file ('text/plain' or 'application/pdf').
+        content_bytes (bytes): The raw content of the file.
+
+    Returns:
+        str: Extracted text content.
+
+    Raises:
+        ValueError: If the file type is unsupported or content is empty/unreadable.
+        RuntimeError: If reading a PDF fails.
+    """
+    # Collect pieces and join once instead of repeatedly concatenating strings.
+    return "".join(iter_text(file_type, io.BytesIO(content_bytes)))
@@ -1,58 +1,362 @@
+import heapq
+import logging
+import time
+from itertools import islice
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
-from typing import Any, Dict
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
 
-from .text_extraction import extract_text
-from .chunking import get_text_chunks
+from langchain_core.documents import Document
+
+from .text_extraction import iter_text
+from .chunking import iter_chunks_with_vectors
 from .build_metadata import build_metadata
 
-from ..db.crud import insert_chunks
-from .vectorstore import store_embeddings
-from ..config import get_embeddings
+from ..db.crud import delete_chunks, get_file_chunks, insert_chunks
+from .embedding_cache import embed_texts_cached
+from .documents import document_lock
+from .hashing import chunk_vector_id, content_hash
+from .vectorstore import delete_embeddings, get_vector_store, store_embeddings, update_embedding_metadata
+from ..config import get_embeddings, get_ingest_batch_size, get_metadata_insert_batch_size
+from common import metrics
+from common.registry import DEFAULT_NAMESPACE
+from common.corpus import bump_corpus_generation
+
+logger = logging.getLogger(__name__)
+
+# Number of slowest PDF pages reported per upload.
+SLOWEST_PAGES_REPORTED = 5
+
+
+def batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Yield consecutive lists of at most `size` items."""
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def iter_file_chunks(
+    strategy: str, filename: str, file_type: str, source: BinaryIO, page_timings: List[float], embeddings,
+) -> Iterator[Tuple[Document, Optional[List[float]]]]:
+    """
+    Lazily extract and chunk a file, yielding each chunk with its derived vector, if any.
+
+    Extraction and chunking are timed as the `extract_text` and
+    `extract_and_chunk` stages; chunking alone is their difference.
+    """
+    text = metrics.timed_iter("extract_text", iter_text(file_type, source, page_timings))
+    return metrics.timed_iter("extract_and_chunk", iter_chunks_with_vectors(strategy, filename, text, embeddings))
+
+
+class PreparedBatch(NamedTuple):
+    """A batch of chunks with ids assigned and embeddings computed for its new chunks."""
+    docs: List[Document]
+    vector_ids: List[str]
+    content_hashes: List[str]
+    new_docs: List[Document]
+    new_ids: List[str]
+    new_vectors: List[List[float]]
+    # Already indexed chunks whose position or strategy changed, with their vector ids.
+    moved_docs: List[Document]
+    moved_ids: List[str]
+
+
+class FileIngestion:
+    """
+    Incremental ingestion state of one file.
+
+    Every chunk gets a deterministic vector id derived from its filename and
+    text, so chunks already indexed for the file are neither embedded nor
+    upserted again, new chunks use the vector derived while chunking or else
+    a cached embedding of identical text when available, and `finish` deletes vectors of chunks that no longer appear in
+    the file and replaces its metadata rows. Indexed chunks that moved within
+    the file get their stored position and strategy rewritten, so the vector
+    and lexical metadata agree with the metadata rows.
+
+    The steps take the session to use explicitly, so that `prepare` and
+    `store` can run on different threads as long as calls for the same
+    file happen in order. If any step fails, `abort` removes what the run
+    stored, leaving the previous version of the file as it was.
+
+    A file is identified by its name within a namespace; the same name in
+    another namespace is a separate file.
+    """
+
+    def __init__(self, db: Session, filename: str, namespace: str = DEFAULT_NAMESPACE):
+        self.filename = filename
+        self.namespace = namespace
+        # What the previous version of the file left behind; replaced once the new version is stored.
+        self._previous_rows = get_file_chunks(db, filename, namespace)
+        self._previous_row_ids = {row_id for row_id, *_ in self._previous_rows}
+        self._previous_ids = {vector_id for _, vector_id, _, _ in self._previous_rows if vector_id}
+        # Position and strategy each indexed vector was stored with, from its first occurrence.
+        self._previous_positions: Dict[str, Tuple[int, str]] = {}
+        for _, vector_id, chunk_index, strategy in sorted(self._previous_rows, key=lambda row: row[2]):
+            if vector_id:
+                self._previous_positions.setdefault(vector_id, (chunk_index, strategy))
+        self._seen_ids: Set[str] = set()
+        # What this run changed in the vector store, undone by `abort`.
+        self._stored_ids: Set[str] = set()
+        self._moved: Dict[str, Document] = {}
+        self._pending_metadata: List[Dict[str, Any]] = []
+        self._metadata_batch_size = get_metadata_insert_batch_size()
+        self.chunks = 0
+        self.counts = {"embedded": 0, "derived": 0, "cache_hits": 0, "unchanged": 0, "repositioned": 0, "deleted": 0}
+        self.timings = {"embed_seconds": 0.0, "store_seconds": 0.0, "metadata_seconds": 0.0}
+
+    def prepare(
+        self, db: Session, batch: List[Document], vectors: Optional[List[Optional[List[float]]]] = None
+    ) -> PreparedBatch:
+        """
+        Assign vector ids to a batch and get vectors for the chunks not indexed yet.
+
+        Args:
+            db (Session): SQLAlchemy database session.
+            batch (List[Document]): Consecutive chunks of the file.
+            vectors (Optional[List[Optional[List[float]]]]): Vectors already derived
+                for the chunks while chunking, None where a chunk must be embedded.
+
+        Returns:
+            PreparedBatch: The batch with its ids and the vectors of its new chunks.
+        """
+        started = time.perf_counter()
+        hashes = [content_hash(doc.page_content) for doc in batch]
+        vector_ids = [chunk_vector_id(self.filename, doc.page_content) for doc in batch]
 
-def upload_to_db(content_bytes: bytes,
+        new: Dict[str, Tuple[Document, str, Optional[List[float]]]] = {}
+        moved: Dict[str, Document] = {}
+        for doc, chunk_hash, vector_id, vector in zip(batch, hashes, vector_ids, vectors or [None] * len(batch)):
+            if vector_id in self._previous_ids or vector_id in self._seen_ids:
+                self.counts["unchanged"] += 1
+                position = (doc.metadata.get("chunk_index"), doc.metadata.get("strategy"))
+                if (vector_id not in self._seen_ids and vector_id not in moved
+                        and self._previous_positions.get(vector_id, position) != position):
+                    moved[vector_id] = doc
+            elif vector_id not in new:
+                new[vector_id] = (doc, chunk_hash, vector)
+            self._seen_ids.add(vector_id)
+
+        missing = [(doc, chunk_hash) for doc, chunk_hash, vector in new.values() if vector is None]
+        embedded: List[List[float]] = []
+        if missing:
+            embedded, hits = embed_texts_cached(
+                db, [doc.page_content for doc, _ in missing], [chunk_hash for _, chunk_hash in missing]
+            )
+            self.counts["embedded"] += len(missing) - hits
+            self.counts["cache_hits"] += hits
+        self.counts["derived"] += len(new) - len(missing)
+
+        embedded_iter = iter(embedded)
+        new_vectors = [vector if vector is not None else next(embedded_iter) for _, _, vector in new.values()]
+        self.timings["embed_seconds"] += time.perf_counter() - started
+        self.counts["repositioned"] += len(moved)
+        return PreparedBatch(
+            batch, vector_ids, hashes, [doc for doc, _, _ in new.values()], list(new), new_vectors,
+            list(moved.values()), list(moved),
+        )
+
+    def store(self, db: Session, prepared: PreparedBatch) -> None:
+        """Upsert the new vectors of a prepared batch and record its metadata rows."""
+        started = time.perf_counter()
+        if prepared.new_docs:
+            # Recorded first: a failed upsert may still have stored part of the batch.
+            self._stored_ids.update(prepared.new_ids)
+            store_embeddings(prepared.new_docs, prepared.new_vectors, prepared.new_ids, self.namespace)
+        if prepared.moved_docs:
+            self._moved.update(zip(prepared.moved_ids, prepared.moved_docs))
+            update_embedding_metadata(prepared.moved_docs, prepared.moved_ids, self.namespace)
+        self.timings["store_seconds"] += time.perf_counter() - started
+
+        # Rows are buffered so each bulk insert carries up to METADATA_INSERT_BATCH_SIZE rows.
+        started = time.perf_counter()
+        self._pending_metadata.extend(
+            build_metadata(prepared.docs, self.filename, prepared.vector_ids, prepared.content_hashes, self.namespace)
+        )
+        if len(self._pending_metadata) >= self._metadata_batch_size:
+            insert_chunks(db, self._pending_metadata)
+            self._pending_metadata = []
+        self.timings["metadata_seconds"] += time.perf_counter() - started
+        self.chunks += len(prepared.docs)
+
+    def finish(self, db: Session) -> bool:
+        """
+        Flush metadata, delete what the previous version of the file left behind.
+
+        Vectors of removed chunks go before the metadata rows are swapped, so a
+        failure in between leaves rows pointing at deleted vectors, which a
+        document delete still cleans up, rather than vectors no row refers to.
+
+        Returns:
+            bool: Whether the indexed content of the file changed.
+        """
+        started = time.perf_counter()
+        removed_ids = list(self._previous_ids - self._seen_ids)
+        delete_embeddings(removed_ids, self.namespace)
+        self.counts["deleted"] = len(removed_ids)
+        self.timings["store_seconds"] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        if self._pending_metadata:
+            insert_chunks(db, self._pending_metadata)
+            self._pending_metadata = []
+        if self._previous_rows:
+            delete_chunks(db, [row_id for row_id, *_ in self._previous_rows])
+        self.timings["metadata_seconds"] += time.perf_counter() - started
+        for outcome, count in self.counts.items():
+            metrics.count(metrics.CHUNKS, count, outcome=outcome)
+        return bool(
+            self.counts["embedded"] or self.counts["derived"] or self.counts["cache_hits"]
+            or self.counts["repositioned"] or removed_ids
+        )
+
+    def abort(self, db: Session) -> None:
+        """
+        Undo a failed run: delete the vectors and metadata rows it added and
+        restore the stored position of chunks it moved.
+
+        Best effort; failures are logged, since the caller is already handling an error.
+        """
+        db.rollback()
+        self._pending_metadata = []
+        try:
+            inserted = [
+                row_id for row_id, *_ in get_file_chunks(db, self.filename, self.namespace)
+                if row_id not in self._previous_row_ids
+            ]
+            if inserted:
+                delete_chunks(db, inserted)
+            delete_embeddings(sorted(self._stored_ids), self.namespace)
+            moved_ids = [vector_id for vector_id in self._moved if vector_id in self._previous_positions]
+            update_embedding_metadata(
+                [self._restored(self._moved[vector_id], *self._previous_positions[vector_id]) for vector_id in moved_ids],
+                moved_ids,
+                self.namespace,
+            )
+            logger.info("Rolled back failed ingestion of %s: %d rows, %d vectors",
+                        self.filename, len(inserted), len(self._stored_ids))
+        except Exception as e:
+            db.rollback()
+            logger.error("Could not roll back failed ingestion of %s: %s", self.filename, e)
+
+    @staticmethod
+    def _restored(doc: Document, chunk_index: int, strategy: str) -> Document:
+        return Document(page_content=doc.page_content,
+                        metadata={**doc.metadata, "chunk_index": chunk_index, "strategy": strategy})
+
+
+@metrics.instrumented("upload")
+def upload_to_db(source: BinaryIO,
     file_type: str,
     filename: str,
     strategy: str,
-    db: Session
+    db: Session,
+    progress: Optional[Callable[[str, int], None]] = None,
+    namespace: str = DEFAULT_NAMESPACE,
 ) -> Dict[str, Any]:
     """
     Process a file: extract text, chunk it, store embeddings, and save metadata to the database.
 
+    The file is streamed through the pipeline: text is extracted incrementally,
+    chunked as it arrives, and chunks are embedded, upserted and recorded in
+    batches of INGEST_BATCH_SIZE, so peak memory depends on the batch size
+    rather than on the document size. Re-ingestion is incremental, see
+    `FileIngestion`.
+
     Args:
-        content_bytes (bytes): Raw file content.
+        source (BinaryIO): Readable binary stream of the file content.
         file_type (str): MIME type of the file ('text/plain' or 'application/pdf').
         filename (str): Name of the uploaded file.
         strategy (str): Chunking strategy ('recursive' or 'semantic').
         db (Session): SQLAlchemy database session to insert metadata.
+        progress (Optional[Callable[[str, int], None]]): Called with the current
+            stage and the number of chunks stored so far.
+        namespace (str): Partition of the index to ingest into; "" for the default one.
 
     Returns:
-        Dict[str, Any]: Dictionary containing the total number of chunks and the first few chunk previews.
+        Dict[str, Any]: Dictionary containing the total number of chunks, how many
+        were embedded, reused or deleted, the first few chunk previews and per-stage timings.
 
     Raises:
         HTTPException: If no chunks are produced from the file.
     """
+    report = progress or (lambda stage, chunks: None)
+    started = time.perf_counter()
 
-    content = extract_text(file_type, content_bytes)
     embeddings = get_embeddings()
-    
-    docs_to_index, stats = get_text_chunks(strategy, filename, content, embeddings)
+    get_vector_store(namespace).ensure_index()
+    report("extracting", 0)
 
-    if not docs_to_index:
-        raise HTTPException(status_code=400, detail="No chunks produced from the file.")
+    # Held until the new version is in place, so a delete of the file cannot interleave.
+    with document_lock(filename, namespace):
+        ingestion = FileIngestion(db, filename, namespace)
+        page_timings: List[float] = []
+        chunks = iter_file_chunks(strategy, filename, file_type, source, page_timings, embeddings)
 
-    # Store embeddings
-    store_embeddings(docs_to_index)
+        top_chunks_response: List[Dict[str, Any]] = []
+        try:
+            for batch in batched(chunks, get_ingest_batch_size()):
+                report("embedding", ingestion.chunks)
+                docs = [doc for doc, _ in batch]
+                ingestion.store(db, ingestion.prepare(db, docs, [vector for _, vector in batch]))
+                top_chunks_response.extend(
+                    {"chunk_id": doc.metadata.get("chunk_index"), "chunk_text": doc.page_content}
+                    for doc in docs[:5 - len(top_chunks_response)]
+                )
 
-    # Build metadata list from produced documents and use the injected DB session
-    metadata_list = build_metadata(docs_to_index, filename)
+            if not ingestion.chunks:
+                raise HTTPException(status_code=400, detail="No chunks produced from the file.")
 
-    insert_chunks(db, metadata_list)
-    
-    top_chunks_response = [
-        {"chunk_id": doc.metadata.get("chunk_index"), "chunk_text": doc.page_content}
-        for doc in docs_to_index[:5]
-    ]
+            report("finalizing", ingestion.chunks)
+            changed = ingestion.finish(db)
+        except BaseException:
+            ingestion.abort(db)
+            raise
+    if changed:
+        # Changed chunks can change retrieval results, so answers cached for the old corpus go stale
+        bump_corpus_generation()
 
-    return {"chunks_length": len(docs_to_index), "top_chunks": top_chunks_response}
+    total_seconds = time.perf_counter() - started
+    store_seconds = ingestion.timings["embed_seconds"] + ingestion.timings["store_seconds"]
+    metadata_seconds = ingestion.timings["metadata_seconds"]
+    return {
+        "chunks_length": ingestion.chunks,
+        "chunks_embedded": ingestion.counts["embedded"],
+        "chunks_derived": ingestion.counts["derived"],
+        "chunks_from_cache": ingestion.counts["cache_hits"],
+        "chunks_unchanged": ingestion.counts["unchanged"],
+        "chunks_repositioned": ingestion.counts["repositioned"],
+        "chunks_deleted": ingestion.counts["deleted"],
+        "top_chunks": top_chunks_response,
+        "timings": {
+            # Extraction and chunking are interleaved with the batches, so they get the remainder.
+            "extract_and_chunk_seconds": total_seconds - store_seconds - metadata_seconds,
+            "embed_and_store_seconds": store_seconds,
+            "metadata_seconds": metadata_seconds,
+            "total_seconds": total_seconds,
+        },
+        **({"extraction": summarize_page_timings(filename, page_timings)} if page_timings else {}),
+    }
+
+
+def summarize_page_timings(filename: str, page_timings: List[float]) -> Dict[str, Any]:
+    """
+    Summarize per-page PDF extraction times and log the slowest pages.
 
+    Args:
+        filename (str): Name of the uploaded file.
+        page_timings (List[float]): Extraction seconds per page, in page order.
+
+    Returns:
+        Dict[str, Any]: Page count, total extraction seconds and the slowest pages.
+    """
+    slowest = heapq.nlargest(SLOWEST_PAGES_REPORTED, enumerate(page_timings), key=lambda item: item[1])
+    logger.info(
+        "Extracted %d pages of %s in %.2fs; slowest: %s",
+        len(page_timings), filename, sum(page_timings),
+        ", ".join(f"page {page} {seconds * 1000:.0f}ms" for page, seconds in slowest),
+    )
+    return {
+        "pages": len(page_timings),
+        "seconds": sum(page_timings),
+        "slowest_pages": [{"page": page, "ms": seconds * 1000} for page, seconds in slowest],
+    }
@@ -1,44 +1,110 @@
-from typing import List
+from typing import List, Optional
 
-from pinecone import ServerlessSpec
-from langchain_pinecone import PineconeVectorStore
 from langchain_core.documents import Document
-from ..config import get_index_name, get_pineconeClient, get_embeddings
+from common import metrics, registry
+from common.vector_backends import VectorBackend
+from ..config import get_index_name
 
-# Initialize Pinecone client, embeddings, and index name
-pc = get_pineconeClient()
-embeddings = get_embeddings()
+# Index name is cheap to resolve; the backend and embeddings come from the shared registry.
 INDEX_NAME = get_index_name()
 
-def store_embeddings(docs: List[Document]) -> PineconeVectorStore:
+@metrics.instrumented("store_embeddings")
+def store_embeddings(
+    docs: List[Document],
+    vectors: List[List[float]],
+    ids: Optional[List[str]] = None,
+    namespace: str = registry.DEFAULT_NAMESPACE,
+) -> VectorBackend:
     """
-    Store embeddings for a list of documents in Pinecone.
+    Store embedded documents in the configured vector backend and the lexical index.
 
     Args:
-        docs (List[Document]): List of LangChain Document objects to embed.
+        docs (List[Document]): List of LangChain Document objects.
+        vectors (List[List[float]]): Embedding of each document, in the same order.
+        ids (Optional[List[str]]): Vector ids; existing vectors with the same id are overwritten.
+        namespace (str): Partition of the index to store into.
 
     Returns:
-        PineconeVectorStore: Vector store containing the stored embeddings.
+        VectorBackend: Vector backend containing the stored embeddings.
     """
-    if INDEX_NAME not in [index.name for index in pc.list_indexes()]:
-        pc.create_index(
-            name=INDEX_NAME,
-            dimension=384,
-            metric="cosine",
-            spec=ServerlessSpec(cloud="aws", region="us-east-1")
-        )
-    return PineconeVectorStore.from_documents(
-        documents=docs,
-        embedding=embeddings,
-        index_name=INDEX_NAME
-    )
+    vectorstore = get_vector_store(namespace)
+    texts = [doc.page_content for doc in docs]
+    metadatas = [doc.metadata for doc in docs]
+    ids = vectorstore.add_embeddings(texts, vectors, metadatas, ids)
+    # Keep the BM25 index in step with the vectors, under the same ids.
+    lexical_index = registry.get_lexical_index(INDEX_NAME, namespace)
+    if lexical_index is not None:
+        lexical_index.add(ids, texts, metadatas)
+    return vectorstore
+
+@metrics.instrumented("update_embedding_metadata")
+def update_embedding_metadata(
+    docs: List[Document], ids: List[str], namespace: str = registry.DEFAULT_NAMESPACE
+) -> None:
+    """
+    Rewrite the metadata of already stored chunks, e.g. after they moved within their file.
+
+    Args:
+        docs (List[Document]): Chunks with their current metadata.
+        ids (List[str]): Vector id of each chunk.
+        namespace (str): Partition of the index holding them.
+    """
+    if not ids:
+        return
+    metadatas = [doc.metadata for doc in docs]
+    get_vector_store(namespace).update_metadata(ids, metadatas)
+    lexical_index = registry.get_lexical_index(INDEX_NAME, namespace)
+    if lexical_index is not None:
+        # Re-adding an id replaces its entry.
+        lexical_index.add(ids, [doc.page_content for doc in docs], metadatas)
+
+@metrics.instrumented("delete_embeddings")
+def delete_embeddings(ids: List[str], namespace: str = registry.DEFAULT_NAMESPACE) -> None:
+    """
+    Delete vectors from the configured vector backend.
+
+    Args:
+        ids (List[str]): Ids of the vectors to delete.
+        namespace (str): Partition of the index holding them.
+    """
+    if ids:
+        get_vector_store(namespace).delete(ids)
+        lexical_index = registry.get_lexical_index(INDEX_NAME, namespace)
+        if lexical_index is not None:
+            lexical_index.delete(ids)
 
-def get_vector_store()-> PineconeVectorStore:
+@metrics.instrumented("delete_file_embeddings")
+def delete_file_embeddings(filename: str, namespace: str = registry.DEFAULT_NAMESPACE) -> bool:
     """
-    Retrieve a PineconeVectorStore connected to the existing index.
+    Delete every vector and lexical index entry stored for a file, whatever its id.
+
+    Reaches vectors whose ids were never recorded in the metadata table.
+
+    Args:
+        filename (str): Name the file was ingested under.
+        namespace (str): Partition of the index holding them.
 
     Returns:
-        PineconeVectorStore: Vector store instance for querying.
+        bool: False if the vector backend cannot delete by metadata; nothing is deleted then.
     """
-    vectorstore = PineconeVectorStore(index_name=INDEX_NAME, embedding=embeddings)
-    return vectorstore
+    filter = {"filename": filename}
+    try:
+        get_vector_store(namespace).delete_where(filter)
+    except NotImplementedError:
+        return False
+    lexical_index = registry.get_lexical_index(INDEX_NAME, namespace)
+    if lexical_index is not None:
+        lexical_index.delete_where(filter)
+    return True
+
+def get_vector_store(namespace: str = registry.DEFAULT_NAMESPACE)-> VectorBackend:
+    """
+    Retrieve the vector backend connected to a namespace of the ingestion index.
+
+    Args:
+        namespace (str): Partition of the index; "" for the default one.
+
+    Returns:
+        VectorBackend: Vector backend instance for querying.
+    """
+    return registry.get_vectorstore(INDEX_NAME, namespace)
@@ -0,0 +1,234 @@
+"""
+Offline end-to-end benchmark of the root FastAPI app.
+
+Pinecone, Redis and Gemini are replaced by the in-memory fakes in
+benchmarks/fakes.py, and both databases by SQLite in a temporary directory.
+The benchmark drives the real routes of main.py in-process:
+
+1. uploads synthetic documents through `/uploadfile/` and polls the
+   ingestion jobs until all of them finish,
+2. sends concurrent chat turns to `/agent`.
+
+It prints a JSON report with docs/s, chunks/s, chat latency percentiles and
+peak RSS, and optionally writes it to a file for comparison across commits:
+
+    python -m benchmarks.bench_app --docs 50 --queries 500 --concurrency 16 --output bench.json
+    python -m benchmarks.bench_app --fake-embeddings --llm-latency-ms 0   # harness only
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+WORDS = (
+    "invoice contract tenant payment schedule clause renewal notice policy claim "
+    "coverage premium deductible appointment interview candidate salary benefit "
+    "report quarter revenue margin forecast shipment warehouse delivery refund"
+).split()
+
+
+def make_document(rng: random.Random, paragraphs: int) -> str:
+    """Generate a synthetic document of sentence-shaped paragraphs."""
+    return "\n\n".join(
+        " ".join(
+            " ".join(rng.choices(WORDS, k=rng.randint(6, 18))).capitalize() + "."
+            for _ in range(rng.randint(2, 6))
+        )
+        for _ in range(paragraphs)
+    )
+
+
+def latency_summary(latencies_ms: List[float]) -> Dict[str, float]:
+    if not latencies_ms:
+        return {}
+    return {
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "mean_ms": float(np.mean(latencies_ms)),
+        "max_ms": float(np.max(latencies_ms)),
+    }
+
+
+def peak_rss_mb() -> Dict[str, float]:
+    # ru_maxrss is in KiB on Linux and bytes on macOS.
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return ""
+
+
+def configure_environment(workdir: str, args: argparse.Namespace) -> None:
+    """Point every setting at local resources before the app modules are imported."""
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.sqlite')}",
+        "REDIS_URL": "redis://fake",
+        "PINECONE_API_KEY": "fake",
+        "GOOGLE_API_KEY": "fake",
+        "INDEX_NAME": "langchainvector",
+        "VECTOR_BACKEND": "pinecone",
+        "JOB_STORAGE_DIR": os.path.join(workdir, "jobs"),
+        "LEXICAL_INDEX_DIR": os.path.join(workdir, "lexical"),
+        "INGEST_JOB_WORKERS": str(args.job_workers),
+        "RESPONSE_CACHE_ENABLED": "true" if args.response_cache else "false",
+    })
+
+
+def install_fakes(args: argparse.Namespace) -> None:
+    """Replace the external clients with the in-memory fakes."""
+    from benchmarks.fakes import FakeAsyncRedis, FakeLLM, FakePinecone, FakeRedis, FakeRedisStore, HashEmbeddings
+    from common import corpus, registry
+    from ConversationalRAG.app import config as agent_config
+    from ConversationalRAG.app.services import generation
+
+    registry._pinecone_client = FakePinecone(latency_ms=args.vector_latency_ms)
+    if args.fake_embeddings:
+        registry._embeddings = HashEmbeddings(registry.EMBEDDING_DIMENSION)
+
+    store = FakeRedisStore()
+    for decode in (True, False):
+        agent_config._redis_clients[decode] = FakeRedis(store, decode)
+        agent_config._async_redis_clients[decode] = FakeAsyncRedis(store, decode, latency_ms=args.redis_latency_ms)
+    corpus._redis_client = FakeRedis(store)
+    generation._llm = FakeLLM(latency_ms=args.llm_latency_ms)
+
+
+async def run_ingestion(client, args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    documents = [make_document(rng, args.paragraphs) for _ in range(args.docs)]
+
+    started = time.perf_counter()
+    job_ids = []
+    for i, document in enumerate(documents):
+        response = await client.post(
+            "/uploadfile/",
+            params={"strategy": args.strategy},
+            files={"file": (f"bench_{i}.txt", document.encode("utf-8"), "text/plain")},
+        )
+        response.raise_for_status()
+        job_ids.append(response.json()["job_id"])
+
+    results = {}
+    while len(results) < len(job_ids):
+        for job_id in job_ids:
+            if job_id in results:
+                continue
+            job = (await client.get(f"/uploadfile/jobs/{job_id}")).json()
+            if job["status"] in ("completed", "failed"):
+                results[job_id] = job
+        await asyncio.sleep(0.05)
+    seconds = time.perf_counter() - started
+
+    completed = [job for job in results.values() if job["status"] == "completed"]
+    chunks = sum(job["result"]["chunks_length"] for job in completed)
+    return {
+        "docs": len(documents),
+        "docs_failed": len(documents) - len(completed),
+        "chunks": chunks,
+        "bytes": sum(len(document) for document in documents),
+        "seconds": seconds,
+        "docs_per_second": len(completed) / seconds,
+        "chunks_per_second": chunks / seconds,
+    }
+
+
+async def run_chat(client, args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed + 1)
+    queries = [
+        (f"bench-session-{rng.randrange(args.sessions)}", "what does the " + " ".join(rng.choices(WORDS, k=3)) + " say?")
+        for _ in range(args.queries)
+    ]
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def turn(session_id: str, query: str) -> None:
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post("/agent", params={"user_query": query, "session_id": session_id})
+            latencies.append((time.perf_counter() - started) * 1000.0)
+            if response.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(turn(session_id, query) for session_id, query in queries))
+    seconds = time.perf_counter() - started
+    return {
+        "queries": len(queries),
+        "errors": errors,
+        "concurrency": args.concurrency,
+        "seconds": seconds,
+        "queries_per_second": len(queries) / seconds,
+        **latency_summary(latencies),
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    import httpx
+
+    from main import app
+
+    install_fakes(args)
+    report: Dict[str, Any] = {"commit": git_commit(), "config": vars(args)}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            if args.docs:
+                report["ingestion"] = await run_ingestion(client, args)
+            if args.queries:
+                report["chat"] = await run_chat(client, args)
+    report["peak_rss_mb"] = peak_rss_mb()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=20, help="documents uploaded")
+    parser.add_argument("--paragraphs", type=int, default=200, help="paragraphs per document")
+    parser.add_argument("--strategy", default="recursive", choices=("recursive", "semantic"))
+    parser.add_argument("--job-workers", type=int, default=2)
+    parser.add_argument("--queries", type=int, default=200, help="chat turns sent")
+    parser.add_argument("--sessions", type=int, default=20, help="distinct chat sessions")
+    parser.add_argument("--concurrency", type=int, default=8, help="chat turns in flight")
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--vector-latency-ms", type=float, default=20.0, help="per Pinecone call")
+    parser.add_argument("--redis-latency-ms", type=float, default=0.5, help="per Redis round trip")
+    parser.add_argument("--response-cache", action="store_true", help="enable the semantic response cache")
+    parser.add_argument("--fake-embeddings", action="store_true", help="hash embeddings instead of the model")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="rag-bench-") as workdir:
+        configure_environment(workdir, args)
+        report = asyncio.run(run(args))
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
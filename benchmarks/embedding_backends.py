@@ -0,0 +1,118 @@
+"""
+Compare embedding backends on CPU: throughput, query latency and drift from torch.
+
+Run from the repository root:
+
+    python -m benchmarks.embedding_backends --texts 2000 --queries 200
+    python -m benchmarks.embedding_backends --corpus some_document.txt --json results.json
+
+Every backend embeds the same texts. Throughput is measured over
+`embed_documents` (ingestion), latency over single `embed_query` calls
+(retrieval), and drift as the cosine similarity between each backend's vectors
+and the torch baseline's.
+"""
+import argparse
+import json
+import random
+import re
+import statistics
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from common.registry import EMBEDDING_BACKENDS, create_embeddings
+
+WORDS = (
+    "invoice contract tenant payment schedule clause renewal notice policy claim "
+    "coverage premium deductible appointment interview candidate salary benefit "
+    "report quarter revenue margin forecast shipment warehouse delivery refund"
+).split()
+
+
+def load_texts(corpus: str, count: int, seed: int) -> List[str]:
+    """Read sentences from a corpus file, or generate synthetic ones."""
+    if corpus:
+        with open(corpus, encoding="utf-8") as f:
+            sentences = [s.strip() for s in re.split(r"(?<=[.?!])\s+", f.read()) if s.strip()]
+        return (sentences * (count // max(1, len(sentences)) + 1))[:count]
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(WORDS, k=rng.randint(8, 60))) + "." for _ in range(count)]
+
+
+def percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q))
+
+
+def bench_backend(backend: str, texts: List[str], queries: List[str]) -> Dict[str, Any]:
+    """Load one backend and measure it."""
+    started = time.perf_counter()
+    embeddings = create_embeddings(backend)
+    embeddings.embed_query("warm up")
+    load_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    batch_seconds = time.perf_counter() - started
+
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        embeddings.embed_query(query)
+        latencies.append((time.perf_counter() - started) * 1000.0)
+
+    return {
+        "backend": backend,
+        "load_seconds": load_seconds,
+        "texts_per_second": len(texts) / batch_seconds,
+        "query_ms_p50": percentile(latencies, 50),
+        "query_ms_p95": percentile(latencies, 95),
+        "query_ms_p99": percentile(latencies, 99),
+        "query_ms_mean": statistics.fmean(latencies),
+        "_vectors": vectors,
+    }
+
+
+def cosine_drift(vectors: np.ndarray, baseline: np.ndarray) -> Dict[str, float]:
+    """Row-wise cosine similarity of two sets of vectors."""
+    norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(baseline, axis=1)
+    cosines = (vectors * baseline).sum(axis=1) / np.clip(norms, 1e-12, None)
+    return {
+        "cosine_mean": float(cosines.mean()),
+        "cosine_min": float(cosines.min()),
+        "cosine_p01": percentile(cosines.tolist(), 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default=",".join(EMBEDDING_BACKENDS),
+                        help="comma-separated backends; the first one is the drift baseline")
+    parser.add_argument("--texts", type=int, default=1000, help="texts embedded for throughput")
+    parser.add_argument("--queries", type=int, default=200, help="single queries timed for latency")
+    parser.add_argument("--corpus", default="", help="text file to draw sentences from")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", default="", help="also write the results to this file")
+    args = parser.parse_args()
+
+    texts = load_texts(args.corpus, args.texts, args.seed)
+    queries = load_texts(args.corpus, args.queries, args.seed + 1)
+    results = [bench_backend(backend, texts, queries) for backend in args.backends.split(",")]
+
+    baseline = results[0]["_vectors"]
+    for result in results:
+        result.update(cosine_drift(result.pop("_vectors"), baseline))
+
+    header = f"{'backend':<10} {'load s':>7} {'texts/s':>9} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'cos mean':>9} {'cos min':>8}"
+    print(header)
+    for r in results:
+        print(f"{r['backend']:<10} {r['load_seconds']:>7.2f} {r['texts_per_second']:>9.1f} "
+              f"{r['query_ms_p50']:>7.2f} {r['query_ms_p95']:>7.2f} {r['query_ms_p99']:>7.2f} "
+              f"{r['cosine_mean']:>9.5f} {r['cosine_min']:>8.5f}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"texts": len(texts), "queries": len(queries), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,390 @@
+"""
+In-memory stand-ins for the external services, used by the offline benchmarks.
+
+They implement only the parts of the Pinecone, Redis and LangChain LLM APIs
+that this codebase calls, with optional synthetic latency so results stay
+comparable to a deployment with remote services.
+"""
+import asyncio
+import fnmatch
+import hashlib
+import json
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+class _FakeNamespace:
+    """Vectors of one namespace, with the matrix rebuilt lazily after writes."""
+
+    def __init__(self):
+        self.vectors: Dict[str, np.ndarray] = {}
+        self.metadata: Dict[str, Dict[str, Any]] = {}
+        self.matrix: Optional[np.ndarray] = None
+        self.ids: List[str] = []
+
+
+class FakePineconeIndex:
+    """Exact cosine search over in-memory matrices, one per namespace like a Pinecone index."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self._latency = latency_ms / 1000.0
+        self._lock = threading.Lock()
+        self._namespaces: Dict[str, _FakeNamespace] = {}
+
+    def _sleep(self) -> None:
+        if self._latency:
+            time.sleep(self._latency)
+
+    def _namespace(self, namespace: str) -> _FakeNamespace:
+        return self._namespaces.setdefault(namespace, _FakeNamespace())
+
+    def upsert(self, vectors: List[Dict[str, Any]], namespace: str = "") -> None:
+        self._sleep()
+        with self._lock:
+            partition = self._namespace(namespace)
+            for vector in vectors:
+                values = np.asarray(vector["values"], dtype=np.float32)
+                norm = np.linalg.norm(values)
+                partition.vectors[vector["id"]] = values / norm if norm else values
+                partition.metadata[vector["id"]] = dict(vector.get("metadata") or {})
+            partition.matrix = None
+
+    def delete(self, ids: List[str], namespace: str = "") -> None:
+        self._sleep()
+        with self._lock:
+            partition = self._namespace(namespace)
+            for id_ in ids:
+                partition.vectors.pop(id_, None)
+                partition.metadata.pop(id_, None)
+            partition.matrix = None
+
+    def update(self, id: str, set_metadata: Optional[Dict[str, Any]] = None, namespace: str = "") -> None:
+        self._sleep()
+        with self._lock:
+            partition = self._namespace(namespace)
+            if id in partition.metadata:
+                partition.metadata[id].update(set_metadata or {})
+
+    def query(self, vector, top_k: int = 4, include_metadata: bool = False, filter=None, namespace: str = ""):
+        self._sleep()
+        with self._lock:
+            partition = self._namespace(namespace)
+            if partition.matrix is None:
+                partition.ids = list(partition.vectors)
+                partition.matrix = (
+                    np.stack([partition.vectors[id_] for id_ in partition.ids])
+                    if partition.ids else np.zeros((0, len(vector)), dtype=np.float32)
+                )
+            ids, matrix = partition.ids, partition.matrix
+            metadata = partition.metadata
+        if not ids:
+            return SimpleNamespace(matches=[])
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        scores = matrix @ query
+        if filter:
+            allowed = np.array([_matches_filter(metadata.get(id_, {}), filter) for id_ in ids])
+            scores = np.where(allowed, scores, -np.inf)
+        top = np.argsort(-scores)[:top_k]
+        return SimpleNamespace(matches=[
+            SimpleNamespace(id=ids[i], score=float(scores[i]), metadata=metadata.get(ids[i]) if include_metadata else None)
+            for i in top if np.isfinite(scores[i])
+        ])
+
+
+def _matches_filter(metadata: Dict[str, Any], filter: Dict[str, Any]) -> bool:
+    for key, condition in filter.items():
+        if isinstance(condition, dict):
+            if "$eq" in condition and metadata.get(key) != condition["$eq"]:
+                return False
+            if "$in" in condition and metadata.get(key) not in condition["$in"]:
+                return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+class FakePinecone:
+    """Pinecone client holding its indexes in memory."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self._latency_ms = latency_ms
+        self._indexes: Dict[str, FakePineconeIndex] = {}
+
+    def list_indexes(self):
+        return [SimpleNamespace(name=name) for name in self._indexes]
+
+    def create_index(self, name: str, **kwargs) -> None:
+        self._indexes.setdefault(name, FakePineconeIndex(self._latency_ms))
+
+    def Index(self, name: str) -> FakePineconeIndex:
+        return self._indexes.setdefault(name, FakePineconeIndex(self._latency_ms))
+
+
+class FakeRedisStore:
+    """Key space shared by the sync and async fake clients, safe across threads."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.data: Dict[str, Any] = {}
+        self.expiry: Dict[str, float] = {}
+
+    def live(self, key: str) -> bool:
+        deadline = self.expiry.get(key)
+        if deadline is not None and deadline <= time.monotonic():
+            self.data.pop(key, None)
+            self.expiry.pop(key, None)
+        return key in self.data
+
+
+def _encode(value: Any) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode("utf-8")
+
+
+class FakeRedis:
+    """Synchronous Redis client over a FakeRedisStore; values are kept as bytes."""
+
+    def __init__(self, store: FakeRedisStore, decode_responses: bool = True):
+        self._store = store
+        self._decode = decode_responses
+
+    def _out(self, value: Optional[bytes]):
+        if value is None or not self._decode:
+            return value
+        return value.decode("utf-8")
+
+    def get(self, key: str):
+        with self._store.lock:
+            return self._out(self._store.data.get(key)) if self._store.live(key) else None
+
+    def set(self, key: str, value: Any, ex: Optional[int] = None, nx: bool = False):
+        with self._store.lock:
+            if nx and self._store.live(key):
+                return None
+            self._store.data[key] = _encode(value)
+            self._store.expiry.pop(key, None)
+            if ex:
+                self._store.expiry[key] = time.monotonic() + ex
+            return True
+
+    def delete(self, *keys: str) -> int:
+        with self._store.lock:
+            removed = 0
+            for key in keys:
+                if self._store.live(key):
+                    removed += 1
+                self._store.data.pop(key, None)
+                self._store.expiry.pop(key, None)
+            return removed
+
+    def incr(self, key: str) -> int:
+        with self._store.lock:
+            value = int(self._store.data.get(key, b"0")) + 1 if self._store.live(key) else 1
+            self._store.data[key] = _encode(value)
+            return value
+
+    def _list(self, key: str) -> List[bytes]:
+        if not self._store.live(key):
+            self._store.data[key] = []
+        return self._store.data[key]
+
+    def rpush(self, key: str, *values: Any) -> int:
+        with self._store.lock:
+            items = self._list(key)
+            items.extend(_encode(value) for value in values)
+            return len(items)
+
+    def lrange(self, key: str, start: int, end: int):
+        with self._store.lock:
+            items = self._store.data.get(key, []) if self._store.live(key) else []
+            stop = None if end == -1 else end + 1
+            return [self._out(item) for item in items[start:stop]]
+
+    def llen(self, key: str) -> int:
+        with self._store.lock:
+            return len(self._store.data.get(key, [])) if self._store.live(key) else 0
+
+    def ltrim(self, key: str, start: int, end: int) -> bool:
+        with self._store.lock:
+            if self._store.live(key):
+                items = self._store.data[key]
+                stop = None if end == -1 else end + 1
+                self._store.data[key] = items[start:stop]
+            return True
+
+    def hset(self, key: str, field: str, value: Any) -> int:
+        with self._store.lock:
+            if not self._store.live(key):
+                self._store.data[key] = {}
+            added = field not in self._store.data[key]
+            self._store.data[key][field] = _encode(value)
+            return int(added)
+
+    def hget(self, key: str, field: str):
+        with self._store.lock:
+            return self._out(self._store.data[key].get(field)) if self._store.live(key) else None
+
+    def hgetall(self, key: str) -> Dict[Any, Any]:
+        with self._store.lock:
+            if not self._store.live(key):
+                return {}
+            return {self._out(field.encode()): self._out(value) for field, value in self._store.data[key].items()}
+
+    def keys(self, pattern: str = "*"):
+        with self._store.lock:
+            return [self._out(key.encode()) for key in list(self._store.data)
+                    if self._store.live(key) and fnmatch.fnmatchcase(key, pattern)]
+
+
+class FakeAsyncPipeline:
+    """Queues commands and runs them together on execute."""
+
+    def __init__(self, client: "FakeAsyncRedis"):
+        self._client = client
+        self._commands: List[Any] = []
+
+    async def __aenter__(self) -> "FakeAsyncPipeline":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self._commands = []
+
+    def __getattr__(self, name: str):
+        method = getattr(self._client.sync, name)
+
+        def queue(*args, **kwargs) -> "FakeAsyncPipeline":
+            self._commands.append((method, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self) -> List[Any]:
+        # Commands run back to back under the store lock, like a MULTI/EXEC transaction.
+        with self._client.sync._store.lock:
+            results = [method(*args, **kwargs) for method, args, kwargs in self._commands]
+        self._commands = []
+        return results
+
+
+class FakeAsyncRedis:
+    """redis.asyncio-compatible client over a FakeRedisStore."""
+
+    def __init__(self, store: FakeRedisStore, decode_responses: bool = True, latency_ms: float = 0.0):
+        self.sync = FakeRedis(store, decode_responses)
+        self._latency = latency_ms / 1000.0
+        self._scripts: Dict[str, Any] = {}
+
+    def pipeline(self, transaction: bool = True) -> FakeAsyncPipeline:
+        return FakeAsyncPipeline(self)
+
+    def register_script(self, source: str):
+        from ConversationalRAG.app.services.booking_state import _BOOKING_SCRIPT
+        from ConversationalRAG.app.services.chat_history import _FOLD_SCRIPT
+
+        ports = {_BOOKING_SCRIPT: _booking_script, _FOLD_SCRIPT: _fold_script}
+        if source not in ports:
+            raise NotImplementedError("The fake Redis only emulates the booking and history fold scripts")
+        port = ports[source]
+
+        async def run(keys: List[str], args: List[Any]):
+            await self._round_trip()
+            with self.sync._store.lock:
+                return port(self.sync, keys, args)
+        return run
+
+    async def _round_trip(self) -> None:
+        await asyncio.sleep(self._latency)
+
+    def __getattr__(self, name: str):
+        method = getattr(self.sync, name)
+
+        async def call(*args, **kwargs):
+            await self._round_trip()
+            return method(*args, **kwargs)
+        return call
+
+
+def _booking_script(client: FakeRedis, keys: List[str], args: List[Any]) -> List[Any]:
+    """Python port of booking_state._BOOKING_SCRIPT."""
+    state_key, history_key = keys
+    query, start, start_entry, transitions = args
+    if start == "1":
+        client.delete(state_key)
+        client.hset(state_key, "progress", "name")
+        return ["started", client.rpush(history_key, start_entry), "name"]
+
+    progress = client.hget(state_key, "progress")
+    if not progress:
+        return ["none", 0, ""]
+    step = json.loads(transitions).get(progress)
+    if not step:
+        return ["none", 0, progress]
+    if not step["valid"]:
+        return ["invalid", client.rpush(history_key, step["invalid"]), progress]
+
+    client.hset(state_key, step["field"], query)
+    if step["next"] == "":
+        data = client.hgetall(state_key)
+        client.delete(state_key)
+        return ["complete", 0, progress, *[item for pair in data.items() for item in pair]]
+    client.hset(state_key, "progress", step["next"])
+    return ["advanced", client.rpush(history_key, step["ok"]), progress]
+
+
+class FakeLLM:
+    """LLM returning a canned answer after a synthetic delay, streamed as tokens."""
+
+    def __init__(self, latency_ms: float = 300.0, tokens: int = 40):
+        self._latency = latency_ms / 1000.0
+        self._tokens = tokens
+
+    def _answer(self, prompt: str) -> List[str]:
+        digest = hashlib.blake2b(prompt.encode("utf-8"), digest_size=4).hexdigest()
+        return [f"word{i}-{digest} " for i in range(self._tokens)]
+
+    async def ainvoke(self, prompt: str, *args, **kwargs) -> str:
+        await asyncio.sleep(self._latency)
+        return "".join(self._answer(prompt))
+
+    async def astream(self, prompt: str, *args, **kwargs):
+        tokens = self._answer(prompt)
+        for token in tokens:
+            await asyncio.sleep(self._latency / len(tokens))
+            yield token
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic pseudo-embeddings for harness-only runs without the model."""
+
+    def __init__(self, dimension: int):
+        self._dimension = dimension
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for text in texts:
+            seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+            vector = np.random.default_rng(seed).standard_normal(self._dimension).astype(np.float32)
+            vectors.append((vector / np.linalg.norm(vector)).tolist())
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def _fold_script(client: FakeRedis, keys: List[str], args: List[Any]) -> int:
+    """Python port of chat_history._FOLD_SCRIPT."""
+    history_key, summary_key = keys
+    summary, previous, *older = args
+    if (client.get(summary_key) or "") != previous:
+        return 0
+    if client.lrange(history_key, 0, len(older) - 1) != older:
+        return 0
+    client.set(summary_key, summary)
+    client.ltrim(history_key, len(older), -1)
+    return 1
@@ -0,0 +1,111 @@
+"""
+Import-time budget check for the application entry point.
+
+Imports a module in a fresh interpreter with `python -X importtime`, then
+reports the total import time and the packages and modules that dominate it.
+Importing the app should only define things: models, clients and indexes are
+created in the lifespan, so anything slow showing up here is a regression.
+
+Run from the repository root:
+
+    python -m benchmarks.import_time                     # import `main`
+    python -m benchmarks.import_time --budget-ms 1500    # exit 1 if over budget
+    python -m benchmarks.import_time --module DocumentIngestionAPI.app.main --top 20
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+
+# "import time:  self [us] | cumulative | imported package" lines; indentation encodes nesting.
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def measure(module: str) -> Tuple[List[Tuple[str, int, int, int]], str]:
+    """
+    Import a module in a subprocess and parse its import-time trace.
+
+    Args:
+        module (str): Dotted module name to import.
+
+    Returns:
+        Tuple[List[Tuple[str, int, int, int]], str]: (module, self us, cumulative us, depth)
+        per imported module, and stderr of the interpreter if the import failed.
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    records, other = [], []
+    for line in process.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            records.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+        elif not line.startswith("import time:"):
+            other.append(line)
+    errors = "" if process.returncode == 0 else "\n".join(other[-40:])
+    return records, errors
+
+
+def summarize(module: str, records: List[Tuple[str, int, int, int]], top: int) -> Dict[str, Any]:
+    """Total import time, self time per top-level package and the slowest modules."""
+    total_us = next((cumulative for name, _, cumulative, depth in records if name == module and depth == 0),
+                    sum(cumulative for _, _, cumulative, depth in records if depth == 0))
+    packages: Dict[str, int] = defaultdict(int)
+    for name, self_us, _, _ in records:
+        packages[name.split(".")[0]] += self_us
+    slowest = sorted(records, key=lambda record: record[2], reverse=True)
+    return {
+        "module": module,
+        "total_ms": total_us / 1000.0,
+        "modules_imported": len(records),
+        "packages": [
+            {"package": package, "self_ms": self_us / 1000.0}
+            for package, self_us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+        ],
+        "slowest_modules": [
+            {"module": name, "cumulative_ms": cumulative / 1000.0, "self_ms": self_us / 1000.0}
+            for name, self_us, cumulative, _ in slowest[:top]
+        ],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main", help="module to import")
+    parser.add_argument("--top", type=int, default=10, help="packages and modules listed")
+    parser.add_argument("--budget-ms", type=float, default=0.0, help="fail when the import takes longer")
+    parser.add_argument("--json", default="", help="also write the report to this file")
+    args = parser.parse_args()
+
+    records, errors = measure(args.module)
+    if errors:
+        print(f"Importing {args.module} failed:\n{errors}", file=sys.stderr)
+        sys.exit(2)
+    report = summarize(args.module, records, args.top)
+
+    print(f"import {args.module}: {report['total_ms']:.1f} ms, {report['modules_imported']} modules")
+    print(f"\n{'package':<32} {'self ms':>9}")
+    for entry in report["packages"]:
+        print(f"{entry['package']:<32} {entry['self_ms']:>9.1f}")
+    print(f"\n{'module':<48} {'cumul ms':>9} {'self ms':>9}")
+    for entry in report["slowest_modules"]:
+        print(f"{entry['module']:<48} {entry['cumulative_ms']:>9.1f} {entry['self_ms']:>9.1f}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.budget_ms and report["total_ms"] > args.budget_ms:
+        dominant = report["packages"][0]["package"] if report["packages"] else "?"
+        print(f"\nOver budget: {report['total_ms']:.1f} ms > {args.budget_ms:.1f} ms (largest package: {dominant})",
+              file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import logging
+import os
+import threading
+from typing import Optional
+
+import redis
+
+# logger
+logger = logging.getLogger(__name__)
+
+# Redis key holding a counter bumped on every corpus change. Anything derived from
+# retrieval results (e.g. cached answers) is only valid for the generation it saw.
+CORPUS_GENERATION_KEY = "corpus_generation"
+
+_lock = threading.Lock()
+_redis_client: Optional[redis.Redis] = None
+
+
+def _get_redis_client() -> Optional[redis.Redis]:
+    global _redis_client
+    if _redis_client is None:
+        REDIS_URL = os.getenv("REDIS_URL")
+        if not REDIS_URL:
+            return None
+        with _lock:
+            if _redis_client is None:
+                _redis_client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+    return _redis_client
+
+
+def bump_corpus_generation() -> Optional[int]:
+    """
+    Increment the shared corpus generation after the indexed documents change.
+
+    Returns:
+        Optional[int]: The new generation, or None if Redis is unavailable.
+    """
+    redis_client = _get_redis_client()
+    if redis_client is None:
+        logger.warning("REDIS_URL not set; corpus generation not bumped.")
+        return None
+    try:
+        return redis_client.incr(CORPUS_GENERATION_KEY)
+    except redis.RedisError as e:
+        logger.warning("Failed to bump corpus generation: %s", e)
+        return None
@@ -0,0 +1,170 @@
+import logging
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Iterator, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from . import metrics
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+load_dotenv()
+
+# logger
+logger = logging.getLogger(__name__)
+
+# Async drivers used when ASYNC_DATABASE_URL is not set, by the DATABASE_URL dialect.
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite", "mysql": "aiomysql"}
+
+# One engine (and connection pool) per process, shared by both sub-apps.
+_lock = threading.Lock()
+_engine: Optional[Engine] = None
+_async_engine: Optional["AsyncEngine"] = None
+_async_sessionmaker: Optional["async_sessionmaker[AsyncSession]"] = None
+
+
+def get_database_url() -> str:
+    DATABASE_URL = os.getenv("DATABASE_URL")
+    if not DATABASE_URL:
+        raise ValueError("DATABASE_URL environment variable not set.")
+    return DATABASE_URL
+
+def get_async_database_url() -> str:
+    """ASYNC_DATABASE_URL, or DATABASE_URL with its driver swapped for an async one."""
+    url = os.getenv("ASYNC_DATABASE_URL")
+    if url:
+        return url
+    parsed = make_url(get_database_url())
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver known for {parsed.get_backend_name()}; set ASYNC_DATABASE_URL.")
+    return parsed.set(drivername=f"{parsed.get_backend_name()}+{driver}").render_as_string(hide_password=False)
+
+def get_pool_size() -> int:
+    return int(os.getenv("DB_POOL_SIZE", "5"))
+
+def get_max_overflow() -> int:
+    return int(os.getenv("DB_MAX_OVERFLOW", "10"))
+
+def get_pool_recycle_seconds() -> int:
+    return int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+
+def get_pool_timeout_seconds() -> float:
+    return float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+
+def is_async_db_enabled() -> bool:
+    """Whether request handlers use the async engine (DB_ASYNC_ENABLED, default false)."""
+    return os.getenv("DB_ASYNC_ENABLED", "false").lower() in ("1", "true", "yes")
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool recording how long each checkout waits for a connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.observe("db_pool_checkout", time.perf_counter() - started)
+
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Async counterpart of TimedQueuePool."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.observe("async_db_pool_checkout", time.perf_counter() - started)
+
+
+def _pool_options(url: str, poolclass: type) -> Dict[str, Any]:
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        # In-memory SQLite needs its single shared connection; keep SQLAlchemy's default pool.
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": get_pool_size(),
+        "max_overflow": get_max_overflow(),
+        "pool_recycle": get_pool_recycle_seconds(),
+        "pool_timeout": get_pool_timeout_seconds(),
+    }
+
+
+def get_engine() -> Engine:
+    """
+    Return the process-wide database engine, creating it on first use.
+
+    The pool is sized by DB_POOL_SIZE and DB_MAX_OVERFLOW, connections are
+    recycled after DB_POOL_RECYCLE_SECONDS, and a checkout gives up after
+    DB_POOL_TIMEOUT_SECONDS.
+
+    Raises:
+        ValueError: If DATABASE_URL is not set.
+    """
+    global _engine
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                url = get_database_url()
+                _engine = create_engine(url, pool_pre_ping=True, **_pool_options(url, TimedQueuePool))
+    return _engine
+
+
+def get_async_engine() -> "AsyncEngine":
+    """
+    Return the process-wide async engine, creating it on first use.
+
+    It shares the pool settings of `get_engine`; the async driver must be installed.
+    """
+    global _async_engine
+    if _async_engine is None:
+        with _lock:
+            if _async_engine is None:
+                from sqlalchemy.ext.asyncio import create_async_engine
+
+                url = get_async_database_url()
+                _async_engine = create_async_engine(url, pool_pre_ping=True, **_pool_options(url, TimedAsyncQueuePool))
+    return _async_engine
+
+
+def get_async_sessionmaker() -> "async_sessionmaker[AsyncSession]":
+    """Return the factory of AsyncSessions bound to the async engine."""
+    global _async_sessionmaker
+    if _async_sessionmaker is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        # Objects stay readable after commit, as responses are built from them outside the session.
+        _async_sessionmaker = async_sessionmaker(get_async_engine(), expire_on_commit=False)
+    return _async_sessionmaker
+
+
+async def dispose_engines() -> None:
+    """Close the pooled connections of both engines on shutdown; the engines stay usable."""
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    if _engine is not None:
+        _engine.dispose()
+
+
+def _collect_pool_stats() -> Iterator[metrics.Sample]:
+    engines = (("sync", _engine), ("async", _async_engine and _async_engine.sync_engine))
+    for name, engine in engines:
+        pool = engine.pool if engine is not None else None
+        if not isinstance(pool, QueuePool):
+            continue
+        labels = {"engine": name}
+        yield "rag_db_pool_size", "Configured pool size.", "gauge", labels, pool.size()
+        yield "rag_db_pool_checked_out", "Connections currently checked out.", "gauge", labels, pool.checkedout()
+        yield "rag_db_pool_overflow", "Connections open beyond the pool size.", "gauge", labels, max(0, pool.overflow())
+
+
+metrics.register_collector(_collect_pool_stats)
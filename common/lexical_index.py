@@ -0,0 +1,302 @@
+import fcntl
+import json
+import logging
+import math
+import os
+import re
+import threading
+import uuid
+from array import array
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+# logger
+logger = logging.getLogger(__name__)
+
+# Words, plus compounds such as product codes, versions, paths and error identifiers.
+_TOKEN = re.compile(r"\w+(?:[-.:/]\w+)*")
+_PARTS = re.compile(r"\w+")
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Term frequencies are stored as uint16.
+MAX_TERM_FREQUENCY = 65535
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase index terms.
+
+    Compound tokens like 'ERR-404' or 'v2.1' are kept whole so exact codes
+    match exactly, and are also indexed by their parts.
+    """
+    terms: List[str] = []
+    for match in _TOKEN.finditer(text.lower()):
+        token = match.group()
+        terms.append(token)
+        if not token.isalnum():
+            terms.extend(_PARTS.findall(token))
+    return terms
+
+
+class LexicalIndex:
+    """
+    Incremental BM25 index over chunk texts, persisted next to the vector index.
+
+    Every chunk occupies one row. Postings are kept per term as two compact
+    arrays, the rows containing the term (uint32) and its frequency in them
+    (uint16), so memory stays close to the size of the token stream. Deleted
+    rows are tombstoned and the index is compacted once tombstones outnumber
+    live rows. Changes are appended to a JSONL log that is replayed on load;
+    other processes' appends are picked up on the next search.
+
+    Processes sharing the directory serialize writes and compaction with an
+    exclusive `flock` on a lock file next to the log. A compacted log starts
+    with a new generation record, so a reader holding an offset into the
+    previous log replays the new one from the start instead of seeking into it.
+    """
+
+    def __init__(self, directory: str):
+        self._lock = threading.RLock()
+        self._log_path = os.path.join(directory, "lexical.jsonl")
+        self._lock_path = os.path.join(directory, "lexical.lock")
+        os.makedirs(directory, exist_ok=True)
+        self._reset()
+        with self._file_lock(fcntl.LOCK_SH):
+            self._refresh_locked()
+
+    def _reset(self) -> None:
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._row_ids: List[Optional[str]] = []
+        self._lengths = array("I")
+        self._live = bytearray()
+        # chunk id -> (row, text, metadata)
+        self._docs: Dict[str, Tuple[int, str, Dict[str, Any]]] = {}
+        # filename -> live rows, so filtering a search to one document does not scan the index
+        self._rows_by_filename: Dict[Any, Set[int]] = {}
+        self._total_length = 0
+        self._log_offset = 0
+        self._log_inode: Optional[int] = None
+        # Generation of the log file read so far; None for logs never compacted.
+        self._generation: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, ids: List[str], texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None) -> None:
+        """
+        Index chunks; chunks whose id is already indexed are replaced.
+
+        Args:
+            ids (List[str]): Chunk ids, the same as their vector ids.
+            texts (List[str]): Chunk texts.
+            metadatas (Optional[List[Dict[str, Any]]]): Chunk metadata, returned with search results.
+        """
+        metadatas = metadatas or [{} for _ in ids]
+        records = [{"op": "add", "id": id_, "text": text, "metadata": metadata}
+                   for id_, text, metadata in zip(ids, texts, metadatas)]
+        with self._lock, self._file_lock(fcntl.LOCK_EX):
+            self._refresh_locked()
+            for record in records:
+                self._apply(record)
+            self._append_locked(records)
+
+    def delete(self, ids: Iterable[str]) -> None:
+        """Remove chunks by id."""
+        with self._lock, self._file_lock(fcntl.LOCK_EX):
+            self._refresh_locked()
+            records = [{"op": "delete", "id": id_} for id_ in ids if id_ in self._docs]
+            if not records:
+                return
+            for record in records:
+                self._apply(record)
+            self._append_locked(records)
+            if len(self._row_ids) - len(self._docs) > len(self._docs):
+                self._compact_locked()
+
+    def search(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None) -> List[Tuple[Document, float]]:
+        """
+        Rank chunks against a query with BM25.
+
+        Args:
+            query (str): Query text.
+            k (int): Number of results.
+            filter (Optional[Dict[str, Any]]): Exact-match conditions on chunk metadata.
+
+        Returns:
+            List[Tuple[Document, float]]: Matching chunks with their BM25 score, best first.
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            if self._log_changed():
+                with self._file_lock(fcntl.LOCK_SH):
+                    self._refresh_locked()
+            if not terms or not self._docs:
+                return []
+            # np.array copies, so no buffer stays exported and the arrays can keep growing.
+            live = np.array(self._live, dtype=bool)
+            lengths = np.array(self._lengths, dtype=np.float32)
+            avg_length = self._total_length / len(self._docs) or 1.0
+            scores = np.zeros(len(self._row_ids), dtype=np.float32)
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                rows = np.array(postings[0], dtype=np.int64)
+                keep = live[rows]
+                rows = rows[keep]
+                if not rows.size:
+                    continue
+                freqs = np.array(postings[1], dtype=np.float32)[keep]
+                idf = math.log(1.0 + (len(self._docs) - rows.size + 0.5) / (rows.size + 0.5))
+                norm = BM25_K1 * (1.0 - BM25_B + BM25_B * lengths[rows] / avg_length)
+                scores[rows] += idf * freqs * (BM25_K1 + 1.0) / (freqs + norm)
+
+            if filter:
+                allowed = np.zeros(len(self._row_ids), dtype=bool)
+                allowed[self._matching_rows(filter)] = True
+                scores[~allowed] = 0.0
+
+            candidates = np.flatnonzero(scores)
+            if candidates.size > k:
+                candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+            candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+            results = []
+            for row in candidates.tolist():
+                id_ = self._row_ids[row]
+                _, text, metadata = self._docs[id_]
+                results.append((Document(id=id_, page_content=text, metadata=dict(metadata)), float(scores[row])))
+            return results
+
+    def delete_where(self, filter: Dict[str, Any]) -> int:
+        """
+        Remove every chunk whose metadata matches an exact-match filter.
+
+        Returns:
+            int: Number of chunks removed.
+        """
+        with self._lock:
+            with self._file_lock(fcntl.LOCK_SH):
+                self._refresh_locked()
+            ids = [self._row_ids[row] for row in self._matching_rows(filter)]
+            self.delete(ids)
+        return len(ids)
+
+    def _matching_rows(self, filter: Dict[str, Any]) -> List[int]:
+        if "filename" in filter:
+            # Only the rows of that file need checking against the rest of the filter.
+            candidates = (
+                (row, self._docs[self._row_ids[row]][2])
+                for row in self._rows_by_filename.get(filter["filename"], ())
+            )
+        else:
+            candidates = ((row, metadata) for row, _, metadata in self._docs.values())
+        return [row for row, metadata in candidates if all(metadata.get(key) == value for key, value in filter.items())]
+
+    @contextmanager
+    def _file_lock(self, operation: int) -> Iterator[None]:
+        """Hold a shared or exclusive flock that serializes log access across processes."""
+        with open(self._lock_path, "a") as f:
+            fcntl.flock(f.fileno(), operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _log_changed(self) -> bool:
+        """Cheap check whether the log may hold records not read yet."""
+        try:
+            stat = os.stat(self._log_path)
+        except FileNotFoundError:
+            return False
+        return stat.st_size != self._log_offset or stat.st_ino != self._log_inode
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        if record["op"] == "generation":
+            self._generation = record["id"]
+            return
+        id_ = record["id"]
+        previous = self._docs.pop(id_, None)
+        if previous is not None:
+            row = previous[0]
+            filename = previous[2].get("filename")
+            rows = self._rows_by_filename[filename]
+            rows.discard(row)
+            if not rows:
+                del self._rows_by_filename[filename]
+            self._live[row] = 0
+            self._row_ids[row] = None
+            self._total_length -= self._lengths[row]
+        if record["op"] != "add":
+            return
+
+        row = len(self._row_ids)
+        counts = Counter(tokenize(record["text"]))
+        for term, count in counts.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = (array("I"), array("H"))
+            postings[0].append(row)
+            postings[1].append(min(count, MAX_TERM_FREQUENCY))
+        length = sum(counts.values())
+        self._row_ids.append(id_)
+        self._lengths.append(length)
+        self._live.append(1)
+        self._total_length += length
+        self._docs[id_] = (row, record["text"], record["metadata"])
+        self._rows_by_filename.setdefault(record["metadata"].get("filename"), set()).add(row)
+
+    def _append_locked(self, records: List[Dict[str, Any]]) -> None:
+        # Called under the exclusive file lock right after a refresh, so the log
+        # ends where we stopped reading and the new offset skips nobody's records.
+        with open(self._log_path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+            self._log_offset = f.tell()
+            self._log_inode = os.fstat(f.fileno()).st_ino
+
+    def _refresh_locked(self) -> None:
+        """Replay log records appended since the last read, e.g. by another process."""
+        try:
+            f = open(self._log_path, "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            stat = os.fstat(f.fileno())
+            if stat.st_ino == self._log_inode and stat.st_size == self._log_offset:
+                return
+            first = f.readline()
+            generation = json.loads(first)["id"] if first.startswith(b'{"op": "generation"') else None
+            if self._log_offset and generation != self._generation:
+                # Compacted by another process; start over.
+                self._reset()
+            self._log_inode = stat.st_ino
+            f.seek(self._log_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # A partially written record; read it on the next refresh.
+                    break
+                self._apply(json.loads(line))
+                self._log_offset += len(line)
+
+    def _compact_locked(self) -> None:
+        docs = sorted(self._docs.items(), key=lambda item: item[1][0])
+        self._reset()
+        records = [{"op": "generation", "id": uuid.uuid4().hex}]
+        records.extend({"op": "add", "id": id_, "text": text, "metadata": metadata}
+                       for id_, (_, text, metadata) in docs)
+        for record in records:
+            self._apply(record)
+        tmp_path = self._log_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+            self._log_offset = f.tell()
+            self._log_inode = os.fstat(f.fileno()).st_ino
+        os.replace(tmp_path, self._log_path)
+        logger.info("Compacted lexical index %s to %d chunks", self._log_path, len(docs))
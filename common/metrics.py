@@ -0,0 +1,306 @@
+import asyncio
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# logger
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from cache hits to slow LLM calls and large uploads.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# A sample yielded by collectors: metric name, help text, type ('gauge' or 'counter'), labels, value.
+Sample = Tuple[str, str, str, Dict[str, str], float]
+
+
+def is_enabled() -> bool:
+    """Whether metrics are collected (METRICS_ENABLED, default true)."""
+    return os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+
+def is_tracing_enabled() -> bool:
+    """Whether stage spans are exported with OpenTelemetry (OTEL_TRACES_ENABLED, default false)."""
+    return os.getenv("OTEL_TRACES_ENABLED", "false").lower() in ("1", "true", "yes")
+
+
+# Read once: instrumentation is decided when modules are imported, so that
+# disabled metrics leave the wrapped functions untouched.
+ENABLED = is_enabled()
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+               for key, value in labels.items())
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic counter per label set."""
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_format_labels(dict(zip(self.labelnames, key)))} {_format_value(value)}"
+                for key, value in values.items()]
+
+
+class Gauge(Counter):
+    """Value that can go up and down per label set."""
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    """Cumulative histogram of observations per label set."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self._buckets = tuple(buckets)
+        # label key -> (per-bucket counts with a final +Inf bucket, sum)
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect_left(self._buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key) or self._values.setdefault(key, ([0] * (len(self._buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = {key: (list(counts), total[0]) for key, (counts, total) in self._values.items()}
+        lines = []
+        for key, (counts, total) in values.items():
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip((*self._buckets, "+Inf"), counts):
+                cumulative += count
+                le = bound if isinstance(bound, str) else _format_value(bound)
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': le})} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+_metrics: List[_Metric] = []
+_collectors: List[Callable[[], Iterable[Sample]]] = []
+
+STAGE_SECONDS = Histogram("rag_stage_duration_seconds", "Time spent in a pipeline stage.", ("stage",))
+STAGE_IN_FLIGHT = Gauge("rag_stage_in_flight", "Calls of a pipeline stage currently running.", ("stage",))
+STAGE_ERRORS = Counter("rag_stage_errors_total", "Pipeline stage calls that raised.", ("stage",))
+CHUNKS = Counter("rag_ingested_chunks_total", "Chunks processed by ingestion, by outcome.", ("outcome",))
+TOKENS = Counter("rag_llm_tokens_total", "Estimated LLM prompt and completion tokens.", ("kind",))
+CONTEXT_TOKENS = Counter("rag_context_tokens_total", "Retrieved context tokens kept in prompts or saved by assembly.", ("outcome",))
+CACHE_EVENTS = Counter("rag_cache_events_total", "Cache lookups by cache and result.", ("cache", "result"))
+
+
+def register_collector(collector: Callable[[], Iterable[Sample]]) -> None:
+    """
+    Register a callable producing extra samples at scrape time, e.g. from stats() of a component.
+
+    Args:
+        collector (Callable[[], Iterable[Sample]]): Returns (name, help, type, labels, value) samples.
+    """
+    _collectors.append(collector)
+
+
+def stats_samples(prefix: str, stats: Dict[str, Any], help: str) -> Iterator[Sample]:
+    """Turn the numeric entries of a stats() dict into gauge samples named `<prefix>_<key>`."""
+    for key, value in stats.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield f"{prefix}_{key}", help, "gauge", {}, float(value)
+
+
+def render() -> str:
+    """Render every metric and collector sample in the Prometheus text exposition format."""
+    lines: List[str] = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    described = set()
+    for collector in _collectors:
+        try:
+            samples = list(collector())
+        except Exception as e:
+            logger.warning("Metrics collector %s failed: %s", getattr(collector, "__name__", collector), e)
+            continue
+        for name, help, kind, labels, value in samples:
+            if name not in described:
+                described.add(name)
+                lines.extend([f"# HELP {name} {help}", f"# TYPE {name} {kind}"])
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def _get_tracer():
+    """Return an OpenTelemetry tracer exporting over OTLP, or None if tracing is off or unavailable."""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                _tracer = False
+                if is_tracing_enabled():
+                    try:
+                        from opentelemetry import trace
+                        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+                        from opentelemetry.sdk.resources import Resource
+                        from opentelemetry.sdk.trace import TracerProvider
+                        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+                        # Endpoint and headers come from the standard OTEL_EXPORTER_OTLP_* variables.
+                        provider = TracerProvider(resource=Resource.create({
+                            "service.name": os.getenv("OTEL_SERVICE_NAME", "conversational-rag"),
+                        }))
+                        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+                        trace.set_tracer_provider(provider)
+                        _tracer = trace.get_tracer(__name__)
+                    except Exception as e:
+                        logger.warning("OpenTelemetry tracing unavailable: %s", e)
+    return _tracer or None
+
+
+def observe(stage: str, seconds: float) -> None:
+    """Record a stage duration measured by the caller."""
+    if ENABLED:
+        STAGE_SECONDS.observe(seconds, stage=stage)
+
+
+@contextmanager
+def _timed(stage: str) -> Iterator[None]:
+    tracer = _get_tracer()
+    span = tracer.start_as_current_span(stage) if tracer else nullcontext()
+    STAGE_IN_FLIGHT.inc(stage=stage)
+    started = time.perf_counter()
+    try:
+        with span:
+            yield
+    except BaseException as e:
+        if not isinstance(e, (GeneratorExit, asyncio.CancelledError)):
+            STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage)
+        STAGE_IN_FLIGHT.dec(stage=stage)
+
+
+def timed(stage: str):
+    """
+    Context manager timing a block as a pipeline stage.
+
+    Records the duration histogram, the in-flight gauge, errors and, with
+    OTEL_TRACES_ENABLED, an OpenTelemetry span. A shared no-op when metrics are disabled.
+    """
+    return _timed(stage) if ENABLED else nullcontext()
+
+
+def instrumented(stage: str) -> Callable[[Callable], Callable]:
+    """
+    Decorator timing every call of a function as a pipeline stage, see `timed`.
+
+    Works for plain and async functions. With metrics disabled the function is
+    returned unchanged, so there is no overhead at all.
+    """
+    def decorate(func: Callable) -> Callable:
+        if not ENABLED:
+            return func
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with _timed(stage):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _timed(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def timed_iter(stage: str, iterator: Iterable[Any]) -> Iterator[Any]:
+    """
+    Time a lazily evaluated stage, counting only the time spent producing items.
+
+    Useful for generators like text extraction and chunking, whose work is
+    interleaved with the consumer's.
+    """
+    if not ENABLED:
+        yield from iterator
+        return
+    iterator = iter(iterator)
+    busy = 0.0
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                busy += time.perf_counter() - started
+                return
+            except Exception:
+                STAGE_ERRORS.inc(stage=stage)
+                raise
+            busy += time.perf_counter() - started
+            yield item
+    finally:
+        STAGE_SECONDS.observe(busy, stage=stage)
+
+
+def count(counter: Counter, amount: float = 1.0, **labels: str) -> None:
+    """Increment a counter when metrics are enabled."""
+    if ENABLED and amount:
+        counter.inc(amount, **labels)
@@ -0,0 +1,135 @@
+import logging
+import os
+import threading
+from typing import List, Optional
+
+import numpy as np
+import onnxruntime as ort
+from langchain_core.embeddings import Embeddings
+from tokenizers import Tokenizer
+
+# logger
+logger = logging.getLogger(__name__)
+
+# sentence-transformers truncates all-MiniLM-L6-v2 inputs at 256 tokens; match it.
+MAX_SEQ_LENGTH = 256
+BATCH_SIZE = 32
+INPUT_NAMES = ("input_ids", "attention_mask", "token_type_ids")
+FP32_FILENAME = "model.onnx"
+INT8_FILENAME = "model.int8.onnx"
+
+_export_lock = threading.Lock()
+
+
+def export_onnx_model(model_name: str, directory: str, quantize: bool = False) -> str:
+    """
+    Export a Hugging Face encoder to ONNX, once, and return the model path.
+
+    The tokenizer is saved next to the model so inference only needs the
+    `tokenizers` library. With `quantize`, weights of the exported model are
+    additionally quantized to int8 with ONNX Runtime dynamic quantization.
+    Files are written under a temporary name and renamed, so concurrent
+    workers never load a half-written model.
+
+    Args:
+        model_name (str): Hugging Face model id.
+        directory (str): Directory holding the exported files.
+        quantize (bool): Whether to return the int8 variant.
+
+    Returns:
+        str: Path of the ONNX model file.
+    """
+    fp32_path = os.path.join(directory, FP32_FILENAME)
+    int8_path = os.path.join(directory, INT8_FILENAME)
+    with _export_lock:
+        if not os.path.exists(fp32_path):
+            import torch
+            from transformers import AutoModel, AutoTokenizer
+
+            logger.info("Exporting %s to ONNX in %s", model_name, directory)
+            os.makedirs(directory, exist_ok=True)
+            tokenizer = AutoTokenizer.from_pretrained(model_name)
+            model = AutoModel.from_pretrained(model_name).eval()
+            sample = tokenizer(["export sample"], return_tensors="pt")
+            tmp_path = fp32_path + ".tmp"
+            with torch.no_grad():
+                torch.onnx.export(
+                    model,
+                    tuple(sample[name] for name in INPUT_NAMES),
+                    tmp_path,
+                    input_names=list(INPUT_NAMES),
+                    output_names=["last_hidden_state"],
+                    dynamic_axes={
+                        name: {0: "batch", 1: "sequence"} for name in (*INPUT_NAMES, "last_hidden_state")
+                    },
+                    opset_version=17,
+                    dynamo=False,
+                )
+            tokenizer.save_pretrained(directory)
+            os.replace(tmp_path, fp32_path)
+
+        if quantize and not os.path.exists(int8_path):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            logger.info("Quantizing %s to int8", fp32_path)
+            tmp_path = int8_path + ".tmp"
+            quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8)
+            os.replace(tmp_path, int8_path)
+
+    return int8_path if quantize else fp32_path
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Sentence-transformers style embeddings computed with ONNX Runtime on CPU.
+
+    Runs the exported encoder, mean-pools token states over the attention mask
+    and L2-normalises, which reproduces all-MiniLM-L6-v2's sentence-transformers
+    pipeline. Texts are sorted by length before batching to minimise padding.
+    """
+
+    def __init__(self, model_name: str, directory: str, quantize: bool = False, threads: Optional[int] = None):
+        model_path = export_onnx_model(model_name, directory, quantize)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self._session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self._inputs = [node.name for node in self._session.get_inputs()]
+
+        self._tokenizer = Tokenizer.from_file(os.path.join(directory, "tokenizer.json"))
+        self._tokenizer.enable_truncation(MAX_SEQ_LENGTH)
+        pad_id = self._tokenizer.token_to_id("[PAD]") or 0
+        self._tokenizer.enable_padding(pad_id=pad_id, pad_token="[PAD]")
+        logger.info("Loaded ONNX embedding model %s", model_path)
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self._tokenizer.encode_batch(texts)
+        features = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        token_states = self._session.run(None, {name: features[name] for name in self._inputs})[0]
+        mask = features["attention_mask"][..., None].astype(np.float32)
+        pooled = (token_states * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed a list of texts."""
+        if not texts:
+            return []
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = np.empty((len(texts), 0), dtype=np.float32)
+        for start in range(0, len(order), BATCH_SIZE):
+            positions = order[start:start + BATCH_SIZE]
+            batch = self._embed_batch([texts[i] for i in positions])
+            if not vectors.shape[1]:
+                vectors = np.empty((len(texts), batch.shape[1]), dtype=np.float32)
+            vectors[positions] = batch
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a single query text."""
+        return self.embed_documents([text])[0]
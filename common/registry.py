@@ -0,0 +1,264 @@
+import logging
+import os
+import re
+import threading
+from typing import TYPE_CHECKING, Dict, Iterable, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+from dotenv import load_dotenv
+
+from .lexical_index import LexicalIndex
+from .vector_backends import LOCAL_BACKENDS, PineconeBackend, VectorBackend
+
+if TYPE_CHECKING:
+    from pinecone import Pinecone
+
+load_dotenv()
+
+# logger
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_DIMENSION = 384
+# "torch" runs sentence-transformers on PyTorch; the ONNX backends run an exported copy on ONNX Runtime.
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+# Namespaces partition an index, e.g. per tenant; "" is the default partition.
+DEFAULT_NAMESPACE = ""
+_NAMESPACE = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.-]{0,63}")
+
+# Process-wide singletons shared by both routers mounted in the root app.
+_lock = threading.RLock()
+_embeddings = None
+_pinecone_client = None
+# Keyed by (index name, namespace)
+_vectorstores: Dict[Tuple[str, str], VectorBackend] = {}
+_lexical_indexes: Dict[Tuple[str, str], LexicalIndex] = {}
+
+
+def get_embedding_backend_name() -> str:
+    """Return the configured embedding backend: 'torch', 'onnx' or 'onnx-int8'."""
+    backend = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend}")
+    return backend
+
+
+def get_embedding_model_tag() -> str:
+    """
+    Identify the vectors the configured backend produces, for keying embedding caches.
+
+    The ONNX backends are tagged separately since their vectors drift slightly
+    from the torch ones.
+    """
+    backend = get_embedding_backend_name()
+    return EMBEDDING_MODEL_NAME if backend == "torch" else f"{EMBEDDING_MODEL_NAME}:{backend}"
+
+
+def create_embeddings(backend: str) -> Embeddings:
+    """
+    Build a new all-MiniLM-L6-v2 embeddings object on the given backend.
+
+    ONNX models are exported on first use under ONNX_MODEL_DIR (default
+    .onnx_models); ONNX_THREADS caps ONNX Runtime's intra-op threads.
+
+    Args:
+        backend (str): One of EMBEDDING_BACKENDS.
+
+    Returns:
+        Embeddings: The embeddings object.
+    """
+    if backend == "torch":
+        # Imported here: pulling in sentence-transformers dominates startup otherwise.
+        from langchain_huggingface import HuggingFaceEmbeddings
+
+        return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
+    if backend in ("onnx", "onnx-int8"):
+        from .onnx_embeddings import OnnxEmbeddings
+
+        directory = os.path.join(os.getenv("ONNX_MODEL_DIR", ".onnx_models"), EMBEDDING_MODEL_NAME.replace("/", "__"))
+        threads = int(os.getenv("ONNX_THREADS", "0")) or None
+        return OnnxEmbeddings(EMBEDDING_MODEL_NAME, directory, quantize=backend == "onnx-int8", threads=threads)
+    raise ValueError(f"Unknown embedding backend: {backend}")
+
+
+def get_embeddings() -> Embeddings:
+    """
+    Return the shared embedding model, loading it on first use.
+
+    The backend is chosen by EMBEDDING_BACKEND and serves both query and
+    ingestion embedding.
+
+    Returns:
+        Embeddings: The process-wide all-MiniLM-L6-v2 embeddings.
+    """
+    global _embeddings
+    if _embeddings is None:
+        with _lock:
+            if _embeddings is None:
+                backend = get_embedding_backend_name()
+                logger.info("Loading embedding model %s on %s", EMBEDDING_MODEL_NAME, backend)
+                _embeddings = create_embeddings(backend)
+    return _embeddings
+
+
+def get_pinecone_client() -> "Pinecone":
+    """
+    Return the shared Pinecone client, creating it on first use.
+
+    Raises:
+        ValueError: If PINECONE_API_KEY is not set.
+    """
+    global _pinecone_client
+    if _pinecone_client is None:
+        with _lock:
+            if _pinecone_client is None:
+                PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
+                if not PINECONE_API_KEY:
+                    raise ValueError("PINECONE API KEY environment variable not set.")
+                from pinecone import Pinecone
+
+                _pinecone_client = Pinecone(api_key=PINECONE_API_KEY)
+    return _pinecone_client
+
+
+def get_vector_backend_name() -> str:
+    """Return the configured vector backend: 'pinecone', 'faiss' or 'memmap'."""
+    backend = os.getenv("VECTOR_BACKEND", "pinecone").lower()
+    if backend != "pinecone" and backend not in LOCAL_BACKENDS:
+        raise ValueError(f"Unknown VECTOR_BACKEND: {backend}")
+    return backend
+
+
+def validate_namespace(namespace: Optional[str]) -> str:
+    """
+    Check a namespace name and return it, with None meaning the default namespace.
+
+    Raises:
+        ValueError: If the name is not 1-64 letters, digits, '_', '.' or '-'.
+    """
+    if not namespace:
+        return DEFAULT_NAMESPACE
+    if not _NAMESPACE.fullmatch(namespace):
+        raise ValueError(f"Invalid namespace: {namespace!r}")
+    return namespace
+
+
+def _partition_directory(root: str, index_name: str, namespace: str) -> str:
+    # The default namespace keeps the original layout, so existing indexes stay readable.
+    directory = os.path.join(root, index_name)
+    return os.path.join(directory, "namespaces", namespace) if namespace else directory
+
+
+def _partition_exists(directory: str, namespace: str) -> bool:
+    # The default namespace is created at warm-up; others only by ingesting into them.
+    return not namespace or os.path.isdir(directory)
+
+
+def get_vectorstore(index_name: str, namespace: str = DEFAULT_NAMESPACE, create: bool = True) -> Optional[VectorBackend]:
+    """
+    Return the shared vector backend for one namespace of an index, connecting on first use.
+
+    The implementation is chosen by VECTOR_BACKEND. On Pinecone a namespace
+    is a Pinecone namespace of the index; local backends keep each namespace
+    in its own directory under LOCAL_INDEX_DIR/<index_name>. Either way a
+    search only scans its own namespace.
+
+    Read paths pass `create=False`, so that querying arbitrary namespace names
+    neither creates directories nor grows the process-wide cache.
+
+    Args:
+        index_name (str): Name of the index.
+        namespace (str): Partition of the index; "" for the default one.
+        create (bool): Whether to create a local partition that does not exist yet.
+
+    Returns:
+        Optional[VectorBackend]: Vector backend for the namespace, or None if
+        `create` is False and nothing was ever stored in it.
+    """
+    namespace = validate_namespace(namespace)
+    key = (index_name, namespace)
+    vectorstore = _vectorstores.get(key)
+    if vectorstore is None:
+        backend = get_vector_backend_name()
+        if not create and namespace and backend == "pinecone":
+            # Querying a missing Pinecone namespace is harmless; just don't cache the handle.
+            return get_vectorstore(index_name).with_namespace(namespace)
+        with _lock:
+            vectorstore = _vectorstores.get(key)
+            if vectorstore is None:
+                if backend == "pinecone":
+                    if namespace:
+                        vectorstore = get_vectorstore(index_name).with_namespace(namespace)
+                    else:
+                        vectorstore = PineconeBackend(get_pinecone_client(), index_name, EMBEDDING_DIMENSION)
+                else:
+                    root = os.getenv("LOCAL_INDEX_DIR", ".vector_index")
+                    directory = _partition_directory(root, index_name, namespace)
+                    if not create and not _partition_exists(directory, namespace):
+                        return None
+                    vectorstore = LOCAL_BACKENDS[backend](directory, EMBEDDING_DIMENSION)
+                logger.info("Connected %s vector backend for index %s namespace %r", backend, index_name, namespace)
+                _vectorstores[key] = vectorstore
+    return vectorstore
+
+
+def is_lexical_index_enabled() -> bool:
+    """Whether chunks are also indexed and searched with BM25 (LEXICAL_INDEX_ENABLED, default true)."""
+    return os.getenv("LEXICAL_INDEX_ENABLED", "true").lower() in ("1", "true", "yes")
+
+
+def get_lexical_index(index_name: str, namespace: str = DEFAULT_NAMESPACE, create: bool = True) -> Optional[LexicalIndex]:
+    """
+    Return the shared BM25 index kept alongside one namespace of a vector index, loading it on first use.
+
+    The index persists under LEXICAL_INDEX_DIR/<index_name> (default
+    .lexical_index), partitioned by namespace like the local vector backends.
+
+    Args:
+        index_name (str): Name of the vector index.
+        namespace (str): Partition of the index; "" for the default one.
+        create (bool): Whether to create the partition if it does not exist yet.
+
+    Returns:
+        Optional[LexicalIndex]: The lexical index, or None if disabled, or if
+        `create` is False and nothing was ever indexed in the namespace.
+    """
+    if not is_lexical_index_enabled():
+        return None
+    namespace = validate_namespace(namespace)
+    key = (index_name, namespace)
+    lexical_index = _lexical_indexes.get(key)
+    if lexical_index is None:
+        with _lock:
+            lexical_index = _lexical_indexes.get(key)
+            if lexical_index is None:
+                root = os.getenv("LEXICAL_INDEX_DIR", ".lexical_index")
+                directory = _partition_directory(root, index_name, namespace)
+                if not create and not _partition_exists(directory, namespace):
+                    return None
+                lexical_index = LexicalIndex(directory)
+                logger.info("Loaded lexical index %s namespace %r with %d chunks", index_name, namespace, len(lexical_index))
+                _lexical_indexes[key] = lexical_index
+    return lexical_index
+
+
+def warm_up(index_names: Iterable[str] = ()) -> None:
+    """
+    Load the embedding model and connect vector stores ahead of the first request.
+
+    Args:
+        index_names (Iterable[str]): Indexes whose vector stores should be connected.
+    """
+    embeddings = get_embeddings()
+    # Run one forward pass so tokenizer and model weights are fully initialised.
+    embeddings.embed_query("warm up")
+    for index_name in index_names:
+        try:
+            # Verified once here; later ensure_index calls are answered from the backend's cache.
+            get_vectorstore(index_name).ensure_index()
+            get_lexical_index(index_name)
+        except Exception as e:
+            logger.warning("Could not connect vector store %s during warm-up: %s", index_name, e)
+    logger.info("Model registry warmed up.")
@@ -0,0 +1,49 @@
+import logging
+import threading
+from typing import Optional
+
+import tiktoken
+
+# logger
+logger = logging.getLogger(__name__)
+
+# Gemini's tokenizer is not public; cl100k_base is a close enough estimate for budgeting.
+ENCODING_NAME = "cl100k_base"
+# Rough characters-per-token ratio used when the BPE file cannot be loaded (e.g. offline).
+FALLBACK_CHARS_PER_TOKEN = 4
+
+_lock = threading.Lock()
+_encoding: Optional[tiktoken.Encoding] = None
+_encoding_failed = False
+
+
+def _get_encoding() -> Optional[tiktoken.Encoding]:
+    global _encoding, _encoding_failed
+    if _encoding is None and not _encoding_failed:
+        with _lock:
+            if _encoding is None and not _encoding_failed:
+                try:
+                    _encoding = tiktoken.get_encoding(ENCODING_NAME)
+                except Exception as e:
+                    logger.warning("Could not load %s, estimating token counts: %s", ENCODING_NAME, e)
+                    _encoding_failed = True
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Approximate the prompt token count of a text."""
+    encoding = _get_encoding()
+    if encoding is None:
+        return -(-len(text) // FALLBACK_CHARS_PER_TOKEN)
+    return len(encoding.encode(text))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cut a text down to its first `max_tokens` tokens."""
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[:max_tokens * FALLBACK_CHARS_PER_TOKEN]
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
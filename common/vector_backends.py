@@ -0,0 +1,530 @@
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+if TYPE_CHECKING:
+    from pinecone import Pinecone
+
+# logger
+logger = logging.getLogger(__name__)
+
+# Metadata key Pinecone records keep the chunk text under (same as PineconeVectorStore).
+TEXT_KEY = "text"
+UPSERT_BATCH_SIZE = 100
+
+
+class VectorBackend:
+    """
+    Minimal vector store interface used by ingestion and retrieval.
+
+    Embedding happens outside the backend, so every implementation only stores
+    and searches precomputed vectors.
+    """
+
+    def ensure_index(self) -> None:
+        """Create the underlying index if it does not exist yet."""
+
+    def add_embeddings(
+        self,
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        """
+        Upsert precomputed vectors with their texts and metadata.
+
+        Args:
+            texts (List[str]): Chunk texts.
+            embeddings (List[List[float]]): One vector per text.
+            metadatas (Optional[List[Dict[str, Any]]]): Metadata per text.
+            ids (Optional[List[str]]): Vector IDs; random IDs are generated when omitted.
+
+        Returns:
+            List[str]: IDs of the stored vectors.
+        """
+        raise NotImplementedError
+
+    def search(
+        self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        Return the top-k documents by cosine similarity.
+
+        Args:
+            embedding (List[float]): Query vector.
+            k (int): Number of results.
+            filter (Optional[Dict[str, Any]]): Exact-match metadata filter.
+
+        Returns:
+            List[Tuple[Document, float]]: Documents with their similarity scores.
+        """
+        raise NotImplementedError
+
+    async def asearch(
+        self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, float]]:
+        """Async variant of `search`; runs the search in a worker thread by default."""
+        return await asyncio.to_thread(self.search, embedding, k, filter)
+
+    def delete(self, ids: Iterable[str]) -> None:
+        """Delete vectors by ID."""
+        raise NotImplementedError
+
+    def update_metadata(self, ids: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        """
+        Replace the metadata of stored vectors without re-upserting their values.
+
+        Args:
+            ids (List[str]): Vector IDs; unknown IDs are ignored.
+            metadatas (List[Dict[str, Any]]): New metadata per ID.
+        """
+        raise NotImplementedError
+
+    def delete_where(self, filter: Dict[str, Any]) -> int:
+        """
+        Delete every vector whose metadata matches an exact-match filter.
+
+        Returns:
+            int: Number of vectors deleted.
+
+        Raises:
+            NotImplementedError: If the backend cannot delete by metadata.
+        """
+        raise NotImplementedError
+
+
+class PineconeBackend(VectorBackend):
+    """Vector backend storing vectors in one namespace of a Pinecone serverless index."""
+
+    def __init__(self, client: "Pinecone", index_name: str, dimension: int, namespace: str = ""):
+        self._client = client
+        self._index_name = index_name
+        self._dimension = dimension
+        # Pinecone's default namespace is addressed by leaving the argument out.
+        self._namespace_args = {"namespace": namespace} if namespace else {}
+        self._index = None
+        self._index_ready = False
+        self._index_lock = threading.Lock()
+
+    def with_namespace(self, namespace: str) -> "PineconeBackend":
+        """Return a backend for another namespace of the same index, sharing its connection."""
+        backend = PineconeBackend(self._client, self._index_name, self._dimension, namespace)
+        backend._index = self.index
+        backend._index_ready = self._index_ready
+        return backend
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = self._client.Index(self._index_name)
+        return self._index
+
+    def ensure_index(self) -> None:
+        # The control-plane check runs once per process, not on every upload.
+        if self._index_ready:
+            return
+        with self._index_lock:
+            if self._index_ready:
+                return
+            if self._index_name not in [index.name for index in self._client.list_indexes()]:
+                from pinecone import ServerlessSpec
+
+                self._client.create_index(
+                    name=self._index_name,
+                    dimension=self._dimension,
+                    metric="cosine",
+                    spec=ServerlessSpec(cloud="aws", region="us-east-1")
+                )
+            self._index_ready = True
+
+    def add_embeddings(self, texts, embeddings, metadatas=None, ids=None):
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        metadatas = metadatas or [{} for _ in texts]
+        vectors = [
+            {"id": id_, "values": list(vector), "metadata": {**metadata, TEXT_KEY: text}}
+            for id_, text, vector, metadata in zip(ids, texts, embeddings, metadatas)
+        ]
+        for start in range(0, len(vectors), UPSERT_BATCH_SIZE):
+            self.index.upsert(vectors=vectors[start:start + UPSERT_BATCH_SIZE], **self._namespace_args)
+        return ids
+
+    def search(self, embedding, k=4, filter=None):
+        response = self.index.query(
+            vector=list(embedding), top_k=k, include_metadata=True, filter=filter, **self._namespace_args
+        )
+        results = []
+        for match in response.matches:
+            metadata = dict(match.metadata or {})
+            text = metadata.pop(TEXT_KEY, "")
+            results.append((Document(id=match.id, page_content=text, metadata=metadata), match.score))
+        return results
+
+    def delete(self, ids):
+        ids = list(ids)
+        for start in range(0, len(ids), UPSERT_BATCH_SIZE):
+            self.index.delete(ids=ids[start:start + UPSERT_BATCH_SIZE], **self._namespace_args)
+
+    def update_metadata(self, ids, metadatas):
+        # Pinecone updates one record per call; set_metadata merges, so the stored text stays.
+        for id_, metadata in zip(ids, metadatas):
+            self.index.update(id=id_, set_metadata=metadata, **self._namespace_args)
+
+    def delete_where(self, filter):
+        raise NotImplementedError("Pinecone serverless indexes cannot delete vectors by metadata filter")
+
+
+class LocalBackend(VectorBackend):
+    """
+    On-disk vector backend for offline runs and benchmarks.
+
+    Vectors are L2-normalised so inner product equals cosine similarity. Chunk
+    texts and metadata live in an append-only JSONL docstore, and vectors in a
+    float32 file at the offset of their row; subclasses decide how the vectors
+    are searched. Every vector occupies one row, and deleted rows are tombstoned.
+
+    A vector is written before its docstore record, and at its row's offset
+    rather than appended, so a crash in between leaves only unreferenced bytes
+    past the last row, which the next add overwrites. A docstore record cut
+    short by a crash is ignored on load and truncated by the next write.
+
+    Processes sharing the directory serialize row allocation, vector writes and
+    docstore appends with an exclusive `flock` on a lock file next to the
+    docstore, and replay each other's records before writing or searching.
+    """
+
+    def __init__(self, directory: str, dimension: int):
+        self._directory = directory
+        self._dimension = dimension
+        self._lock = threading.RLock()
+        self._docstore_path = os.path.join(directory, "docstore.jsonl")
+        self._vectors_path = os.path.join(directory, "vectors.f32")
+        self._lock_path = os.path.join(directory, "docstore.lock")
+        # Bytes of the docstore applied so far; records past it were written by other processes.
+        self._docstore_offset = 0
+        # row -> vector id (None once deleted), and vector id -> (row, text, metadata)
+        self._row_ids: List[Optional[str]] = []
+        self._docs: Dict[str, Tuple[int, str, Dict[str, Any]]] = {}
+        # filename -> live rows, so filtering a search to one document does not scan the namespace
+        self._rows_by_filename: Dict[Any, Set[int]] = {}
+        os.makedirs(directory, exist_ok=True)
+        # Subclasses build their search structures from the loaded rows.
+        with self._file_lock(fcntl.LOCK_SH):
+            self._read_docstore()
+
+    @contextmanager
+    def _file_lock(self, operation: int) -> Iterator[None]:
+        """Hold a shared or exclusive flock that serializes docstore access across processes."""
+        with open(self._lock_path, "a") as f:
+            fcntl.flock(f.fileno(), operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _docstore_changed(self) -> bool:
+        """Cheap check whether the docstore may hold records not read yet."""
+        try:
+            return os.path.getsize(self._docstore_path) != self._docstore_offset
+        except FileNotFoundError:
+            return False
+
+    def _read_docstore(self) -> Tuple[List[int], List[int]]:
+        """
+        Apply docstore records appended since the last read.
+
+        Returns:
+            Tuple[List[int], List[int]]: Rows added and rows deleted by those records.
+        """
+        added: List[int] = []
+        removed: List[int] = []
+        try:
+            f = open(self._docstore_path, "rb")
+        except FileNotFoundError:
+            return added, removed
+        with f:
+            f.seek(self._docstore_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Cut short by a crash, since writers hold the exclusive lock.
+                    break
+                record = json.loads(line)
+                if record["op"] == "add":
+                    row = record["row"]
+                    self._row_ids.extend([None] * (row + 1 - len(self._row_ids)))
+                    self._row_ids[row] = record["id"]
+                    self._put_doc(record["id"], row, record["text"], record["metadata"])
+                    added.append(row)
+                elif record["op"] == "update":
+                    row, text, _ = self._docs[record["id"]]
+                    self._put_doc(record["id"], row, text, record["metadata"])
+                else:
+                    row = self._pop_doc(record["id"])
+                    self._row_ids[row] = None
+                    removed.append(row)
+                self._docstore_offset += len(line)
+        return added, removed
+
+    def _refresh_locked(self) -> None:
+        """Replay records of other processes and make their vectors searchable."""
+        added, removed = self._read_docstore()
+        if added:
+            rows = np.asarray(added, dtype=np.int64)
+            self._add_vectors(rows, self._read_vectors(rows[0], len(rows)))
+        if removed:
+            self._remove_vectors(np.asarray(removed, dtype=np.int64))
+
+    def _put_doc(self, id_: str, row: int, text: str, metadata: Dict[str, Any]) -> None:
+        if id_ in self._docs:
+            self._pop_doc(id_)
+        self._docs[id_] = (row, text, metadata)
+        self._rows_by_filename.setdefault(metadata.get("filename"), set()).add(row)
+
+    def _pop_doc(self, id_: str) -> int:
+        row, _, metadata = self._docs.pop(id_)
+        filename = metadata.get("filename")
+        rows = self._rows_by_filename[filename]
+        rows.discard(row)
+        if not rows:
+            del self._rows_by_filename[filename]
+        return row
+
+    def _write_vectors(self, first_row: int, vectors: np.ndarray) -> None:
+        fd = os.open(self._vectors_path, os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            os.pwrite(fd, np.ascontiguousarray(vectors, dtype=np.float32).tobytes(), first_row * self._dimension * 4)
+        finally:
+            os.close(fd)
+
+    def _read_vectors(self, first_row: int = 0, count: Optional[int] = None) -> np.ndarray:
+        """Vectors of consecutive docstore rows (all by default), zeros where none were ever written."""
+        if count is None:
+            count = len(self._row_ids) - first_row
+        matrix = np.zeros((count, self._dimension), dtype=np.float32)
+        if os.path.exists(self._vectors_path):
+            stored = np.fromfile(
+                self._vectors_path, dtype=np.float32, count=count * self._dimension,
+                offset=first_row * self._dimension * 4,
+            )
+            rows = stored.size // self._dimension
+            matrix[:rows] = stored[:rows * self._dimension].reshape(rows, self._dimension)
+        return matrix
+
+    def _append_docstore(self, records: List[Dict[str, Any]]) -> None:
+        # Called under the exclusive file lock right after a refresh, so anything
+        # past the offset is a record cut short by a crash.
+        if self._docstore_changed():
+            os.truncate(self._docstore_path, self._docstore_offset)
+        with open(self._docstore_path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+            self._docstore_offset = f.tell()
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _allowed_rows(self, filter: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        if not filter:
+            return None
+        if "filename" in filter:
+            # Only the rows of that file need checking against the rest of the filter.
+            candidates = (
+                (row, self._docs[self._row_ids[row]][2])
+                for row in self._rows_by_filename.get(filter["filename"], ())
+            )
+        else:
+            candidates = ((row, metadata) for row, _, metadata in self._docs.values())
+        return np.fromiter(
+            (row for row, metadata in candidates if all(metadata.get(key) == value for key, value in filter.items())),
+            dtype=np.int64,
+        )
+
+    def add_embeddings(self, texts, embeddings, metadatas=None, ids=None):
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        if not ids:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        vectors = self._normalize(np.asarray(embeddings, dtype=np.float32).reshape(-1, self._dimension))
+        with self._lock, self._file_lock(fcntl.LOCK_EX):
+            self._refresh_locked()
+            # Re-adding an existing ID replaces its previous row.
+            self._delete_locked([id_ for id_ in ids if id_ in self._docs])
+            first_row = len(self._row_ids)
+            rows = np.arange(first_row, first_row + len(ids), dtype=np.int64)
+            self._write_vectors(first_row, vectors)
+            self._add_vectors(rows, vectors)
+            records = []
+            for row, id_, text, metadata in zip(rows.tolist(), ids, texts, metadatas):
+                self._row_ids.append(id_)
+                self._put_doc(id_, row, text, metadata)
+                records.append({"op": "add", "row": row, "id": id_, "text": text, "metadata": metadata})
+            self._append_docstore(records)
+        return ids
+
+    def search(self, embedding, k=4, filter=None):
+        query = self._normalize(np.asarray(embedding, dtype=np.float32).reshape(1, -1))
+        with self._lock:
+            if self._docstore_changed():
+                with self._file_lock(fcntl.LOCK_SH):
+                    self._refresh_locked()
+            allowed = self._allowed_rows(filter)
+            if allowed is not None and allowed.size == 0:
+                return []
+            hits = self._search_vectors(query[0], k, allowed)
+            results = []
+            for row, score in hits:
+                id_ = self._row_ids[row]
+                if id_ is None:
+                    continue
+                _, text, metadata = self._docs[id_]
+                results.append((Document(id=id_, page_content=text, metadata=dict(metadata)), score))
+            return results
+
+    def delete(self, ids):
+        with self._lock, self._file_lock(fcntl.LOCK_EX):
+            self._refresh_locked()
+            self._delete_locked([id_ for id_ in ids if id_ in self._docs])
+
+    def delete_where(self, filter):
+        with self._lock, self._file_lock(fcntl.LOCK_EX):
+            self._refresh_locked()
+            ids = [self._row_ids[row] for row in self._allowed_rows(filter).tolist()]
+            self._delete_locked(ids)
+            return len(ids)
+
+    def update_metadata(self, ids, metadatas):
+        with self._lock, self._file_lock(fcntl.LOCK_EX):
+            self._refresh_locked()
+            records = []
+            for id_, metadata in zip(ids, metadatas):
+                if id_ in self._docs:
+                    row, text, _ = self._docs[id_]
+                    self._put_doc(id_, row, text, metadata)
+                    records.append({"op": "update", "id": id_, "metadata": metadata})
+            if records:
+                self._append_docstore(records)
+
+    def _delete_locked(self, ids: List[str]) -> None:
+        if not ids:
+            return
+        rows = []
+        for id_ in ids:
+            row = self._pop_doc(id_)
+            self._row_ids[row] = None
+            rows.append(row)
+        self._remove_vectors(np.asarray(rows, dtype=np.int64))
+        self._append_docstore([{"op": "delete", "id": id_} for id_ in ids])
+
+    def _add_vectors(self, rows: np.ndarray, vectors: np.ndarray) -> None:
+        """Make vectors already written to the vector file searchable."""
+        raise NotImplementedError
+
+    def _remove_vectors(self, rows: np.ndarray) -> None:
+        raise NotImplementedError
+
+    def _search_vectors(
+        self, query: np.ndarray, k: int, allowed: Optional[np.ndarray]
+    ) -> List[Tuple[int, float]]:
+        raise NotImplementedError
+
+
+class FaissBackend(LocalBackend):
+    """
+    Local backend using an exact inner-product FAISS index keyed by row number.
+
+    The index lives in memory and is rebuilt from the vector file on load, so
+    adds and deletes never rewrite a serialized copy of the whole index.
+    """
+
+    def __init__(self, directory: str, dimension: int):
+        import faiss
+
+        self._faiss = faiss
+        super().__init__(directory, dimension)
+        self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+        legacy_path = os.path.join(directory, "vectors.faiss")
+        with self._file_lock(fcntl.LOCK_EX):
+            if os.path.exists(legacy_path) and not os.path.exists(self._vectors_path):
+                self._migrate(legacy_path)
+        live = np.array([row for row, id_ in enumerate(self._row_ids) if id_ is not None], dtype=np.int64)
+        if live.size:
+            self._index.add_with_ids(self._read_vectors()[live], live)
+
+    def _migrate(self, legacy_path: str) -> None:
+        # Indexes written before the vector file existed kept their vectors only in the FAISS file.
+        legacy = self._faiss.read_index(legacy_path)
+        matrix = np.zeros((len(self._row_ids), self._dimension), dtype=np.float32)
+        for row, id_ in enumerate(self._row_ids):
+            if id_ is not None:
+                matrix[row] = legacy.reconstruct(row)
+        self._write_vectors(0, matrix)
+        os.remove(legacy_path)
+        logger.info("Migrated FAISS index %s to %s", legacy_path, self._vectors_path)
+
+    def _add_vectors(self, rows, vectors):
+        self._index.add_with_ids(vectors, rows)
+
+    def _remove_vectors(self, rows):
+        self._index.remove_ids(rows)
+
+    def _search_vectors(self, query, k, allowed):
+        params = None
+        if allowed is not None:
+            params = self._faiss.SearchParameters(sel=self._faiss.IDSelectorBatch(allowed))
+        scores, rows = self._index.search(query.reshape(1, -1), k, params=params)
+        return [(int(row), float(score)) for row, score in zip(rows[0], scores[0]) if row != -1]
+
+
+class MemmapBackend(LocalBackend):
+    """Local backend scanning a memory-mapped float32 matrix with NumPy."""
+
+    def __init__(self, directory: str, dimension: int):
+        self._matrix: Optional[np.memmap] = None
+        super().__init__(directory, dimension)
+        self._live = np.array([id_ is not None for id_ in self._row_ids], dtype=bool)
+        self._remap(len(self._row_ids))
+
+    def _remap(self, rows: int) -> None:
+        if rows == 0:
+            self._matrix = None
+            return
+        self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self._dimension))
+
+    def _add_vectors(self, rows, vectors):
+        self._live = np.concatenate([self._live, np.ones(len(rows), dtype=bool)])
+        self._remap(len(self._live))
+
+    def _remove_vectors(self, rows):
+        self._live[rows] = False
+
+    def _search_vectors(self, query, k, allowed):
+        if self._matrix is None:
+            return []
+        mask = self._live
+        if allowed is not None:
+            mask = np.zeros_like(self._live)
+            mask[allowed] = True
+            mask &= self._live
+        scores = self._matrix @ query
+        scores = np.where(mask, scores, -np.inf)
+        k = min(k, int(mask.sum()))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(row), float(scores[row])) for row in top]
+
+
+LOCAL_BACKENDS = {"faiss": FaissBackend, "memmap": MemmapBackend}
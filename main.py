@@ -1,8 +1,37 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
+from common import db, metrics, registry
+from ConversationalRAG.app import config as agent_config
+from ConversationalRAG.app.db.models import init_db as init_booking_db
 from ConversationalRAG.app.main import router as agent_router
+from DocumentIngestionAPI.app import config as upload_config
+from DocumentIngestionAPI.app.db.models import init_db as init_ingestion_db
 from DocumentIngestionAPI.app.main import router as upload_router
+from DocumentIngestionAPI.app.services.jobs import start_job_sweeper, stop_job_sweeper
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Connect the databases and create missing tables once, instead of at import time.
+    await run_in_threadpool(init_ingestion_db)
+    await run_in_threadpool(init_booking_db)
+    # Load the shared embedding model and verify the vector indexes before serving,
+    # so the first request doesn't pay for either.
+    await run_in_threadpool(
+        registry.warm_up,
+        [agent_config.INDEX_NAME, upload_config.get_index_name()],
+    )
+    # Pick up ingestion jobs a previous process left unfinished, now and periodically.
+    await run_in_threadpool(start_job_sweeper)
+    yield
+    stop_job_sweeper()
+    await db.dispose_engines()
+
 
-app = FastAPI(title="Conversational RAG API")
+app = FastAPI(title="Conversational RAG API", lifespan=lifespan)
 
 #Document Ingestion API
 app.include_router(upload_router)
@@ -11,3 +40,7 @@ app.include_router(upload_router)
 app.include_router(agent_router)
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics() -> PlainTextResponse:
+    """Stage latencies, counters and cache statistics of this process in the Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
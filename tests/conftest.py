@@ -0,0 +1,38 @@
+import argparse
+import atexit
+import os
+import shutil
+import tempfile
+
+import pytest
+
+from benchmarks import bench_app
+
+FAKES = argparse.Namespace(
+    job_workers=1, response_cache=False, fake_embeddings=True,
+    vector_latency_ms=0, redis_latency_ms=0, llm_latency_ms=0,
+)
+
+# App modules read part of their settings at import time, so local resources
+# are configured before any test imports them.
+_workdir = tempfile.mkdtemp(prefix="rag-tests-")
+atexit.register(shutil.rmtree, _workdir, True)
+bench_app.configure_environment(_workdir, FAKES)
+os.environ["VECTOR_BACKEND"] = "memmap"
+os.environ["LOCAL_INDEX_DIR"] = os.path.join(_workdir, "vectors")
+
+
+@pytest.fixture
+def fakes():
+    """In-memory Redis, LLM and hash embeddings from the benchmark suite, fresh for every test."""
+    bench_app.install_fakes(FAKES)
+
+
+@pytest.fixture
+def ingestion_db(fakes):
+    """The ingestion database, shared by the whole session: tests use their own filenames."""
+    from DocumentIngestionAPI.app.db.models import SessionLocal, init_db
+
+    init_db()
+    with SessionLocal() as db:
+        yield db
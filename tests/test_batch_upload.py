@@ -0,0 +1,158 @@
+import io
+import threading
+import uuid
+import zipfile
+
+import pytest
+
+from DocumentIngestionAPI.app.db.crud import create_job, get_file_chunks, update_job
+from DocumentIngestionAPI.app.db.models import SessionLocal
+from DocumentIngestionAPI.app.services import batch_upload, upload
+from DocumentIngestionAPI.app.services.batch_upload import ingest_uploads
+from DocumentIngestionAPI.app.services.documents import DocumentBusyError, delete_document
+from DocumentIngestionAPI.app.services.vectorstore import get_vector_store
+
+OLD = "\n\n".join(" ".join([word] * 40) for word in ("apple", "pear", "plum"))
+NEW = OLD.replace("plum", "fig")
+
+
+def _upload(filename: str, text: str):
+    return (filename, "text/plain", io.BytesIO(text.encode()))
+
+
+def _stored(filename: str):
+    """Chunk texts of the file in the vector store and in the metadata table."""
+    vectors = sorted(text for _, text, metadata in get_vector_store()._docs.values() if metadata.get("filename") == filename)
+    with SessionLocal() as db:
+        rows = len(get_file_chunks(db, filename))
+    return vectors, rows
+
+
+def _ingested(text: str):
+    """What `_stored` returns once `text`, made of 40-word paragraphs, is ingested."""
+    return [" ".join([word] * 40) for word in sorted(text.split()[::40])], 3
+
+
+@pytest.fixture
+def pause_extraction(monkeypatch):
+    """Return a function pausing the extraction of batch files from then on, until the returned event is set."""
+    def pause():
+        started, release = threading.Event(), threading.Event()
+        iter_file_chunks = batch_upload.iter_file_chunks
+
+        def paused(*args, **kwargs):
+            started.set()
+            release.wait(10)
+            yield from iter_file_chunks(*args, **kwargs)
+
+        monkeypatch.setattr(batch_upload, "iter_file_chunks", paused)
+        return started, release
+
+    return pause
+
+
+def _in_thread(target, *args):
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault("value", target(*args)))
+    thread.start()
+    return thread, result
+
+
+def test_delete_during_batch_of_the_same_file_is_rejected(ingestion_db, pause_extraction):
+    filename = f"{uuid.uuid4().hex}.txt"
+    ingest_uploads([_upload(filename, OLD)], "recursive")
+    started, release = pause_extraction()
+
+    thread, result = _in_thread(ingest_uploads, [_upload(filename, NEW)], "recursive")
+    assert started.wait(10)
+    with pytest.raises(DocumentBusyError):
+        delete_document(ingestion_db, filename)
+    release.set()
+    thread.join()
+
+    assert result["value"]["files"][0]["status"] == "completed"
+    assert _stored(filename) == _ingested(NEW)
+    assert delete_document(ingestion_db, filename)["status"] == "deleted"
+    assert _stored(filename) == ([], 0)
+
+
+def test_concurrent_batches_of_the_same_file_do_not_interleave(fakes, pause_extraction):
+    filename = f"{uuid.uuid4().hex}.txt"
+    ingest_uploads([_upload(filename, OLD)], "recursive")
+    started, release = pause_extraction()
+
+    thread, first = _in_thread(ingest_uploads, [_upload(filename, NEW)], "recursive")
+    assert started.wait(10)
+    second = ingest_uploads([_upload(filename, OLD.replace("plum", "kiwi"))], "recursive")
+    release.set()
+    thread.join()
+
+    assert second["files"][0]["status"] == "failed"
+    assert "being ingested" in second["files"][0]["error"]
+    assert first["value"]["files"][0]["status"] == "completed"
+    assert _stored(filename) == _ingested(NEW)
+
+
+def test_batch_entry_with_a_queued_job_fails_and_keeps_the_file(ingestion_db):
+    filename = f"{uuid.uuid4().hex}.txt"
+    other = f"{uuid.uuid4().hex}.txt"
+    ingest_uploads([_upload(filename, OLD)], "recursive")
+    job_id = str(uuid.uuid4())
+    create_job(ingestion_db, job_id, filename, "text/plain", "recursive", "/nonexistent")
+    try:
+        result = ingest_uploads([_upload(filename, NEW), _upload(other, NEW)], "recursive")
+    finally:
+        update_job(ingestion_db, job_id, status="failed")
+
+    assert [file["status"] for file in result["files"]] == ["failed", "completed"]
+    assert _stored(filename) == _ingested(OLD)
+
+
+def test_failed_file_is_rolled_back(fakes, monkeypatch):
+    filename = f"{uuid.uuid4().hex}.txt"
+    ingest_uploads([_upload(filename, OLD)], "recursive")
+    monkeypatch.setenv("INGEST_BATCH_SIZE", "1")
+    store_embeddings = upload.store_embeddings
+    calls = []
+
+    def failing_second_batch(*args, **kwargs):
+        calls.append(1)
+        store_embeddings(*args, **kwargs)
+        if len(calls) == 2:
+            raise RuntimeError("upsert failed")
+
+    monkeypatch.setattr(upload, "store_embeddings", failing_second_batch)
+    text = "\n\n".join(" ".join([word] * 40) for word in ("fig", "apple", "kiwi", "lime", "pear", "plum"))
+    result = ingest_uploads([_upload(filename, text)], "recursive")
+
+    assert result["files"][0]["error"] == "upsert failed"
+    assert _stored(filename) == _ingested(OLD)
+    positions = sorted((text[:4], metadata["chunk_index"]) for _, text, metadata in get_vector_store()._docs.values()
+                       if metadata.get("filename") == filename)
+    assert positions == [("appl", 0), ("pear", 1), ("plum", 2)]
+
+
+def _zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, text in members.items():
+            archive.writestr(name, text)
+    buffer.seek(0)
+    return buffer
+
+
+def test_zip_members_over_the_size_limit_are_skipped(fakes, monkeypatch):
+    monkeypatch.setenv("BATCH_MAX_MEMBER_BYTES", "1000")
+    prefix = uuid.uuid4().hex
+    archive = _zip({f"{prefix}/big.txt": "a " * 1000, f"{prefix}/small.txt": OLD})
+    result = ingest_uploads([(f"{prefix}.zip", "application/zip", archive)], "recursive")
+
+    assert [file["filename"] for file in result["files"]] == [f"{prefix}/small.txt"]
+    assert result["skipped"] == [{"filename": f"{prefix}/big.txt", "reason": "File too large"}]
+
+
+def test_zip_archives_over_the_total_limit_are_rejected(fakes, monkeypatch):
+    monkeypatch.setenv("BATCH_MAX_ARCHIVE_BYTES", "1000")
+    archive = _zip({"a.txt": "a " * 400, "b.txt": "b " * 400})
+    with pytest.raises(ValueError, match="decompress to more than"):
+        ingest_uploads([("bomb.zip", "application/zip", archive)], "recursive")
@@ -0,0 +1,98 @@
+import asyncio
+
+from ConversationalRAG.app.config import get_async_redis_client
+from ConversationalRAG.app.services import chat_history
+from common.tokens import count_tokens
+
+
+def _fill(session_id, count):
+    client = get_async_redis_client()
+    messages = [chat_history.format_message("user", f"message {i}") for i in range(count)]
+    return client.rpush(session_id, *messages)
+
+
+def test_history_includes_messages_waiting_to_be_folded(fakes, monkeypatch):
+    monkeypatch.setenv("HISTORY_VERBATIM_TURNS", "2")
+    monkeypatch.setenv("HISTORY_FOLD_BATCH", "4")
+
+    async def run():
+        # Past the verbatim window but below the compaction threshold.
+        await _fill("waiting", 7)
+        return await chat_history.get_chat_history("waiting")
+
+    history = asyncio.run(run())
+
+    assert history.splitlines() == [f"User: message {i}" for i in range(7)]
+
+
+def test_compaction_outliving_its_lock_folds_once(fakes, monkeypatch):
+    monkeypatch.setenv("HISTORY_VERBATIM_TURNS", "2")
+    monkeypatch.setenv("HISTORY_FOLD_BATCH", "1")
+
+    async def run():
+        client = get_async_redis_client()
+        release_first = asyncio.Event()
+        calls = []
+
+        async def summarize(prompt):
+            calls.append(prompt)
+            if len(calls) == 1:
+                await release_first.wait()
+                return "stale summary"
+            return "fresh summary"
+        monkeypatch.setattr(chat_history, "generate_llm_response", summarize)
+
+        await _fill("overlap", 6)
+        first = asyncio.create_task(chat_history.compact_history("overlap"))
+        while not calls:
+            await asyncio.sleep(0)
+        # The lock expires while the first summary is still being generated.
+        await client.delete("overlap:summary_lock")
+        await chat_history.compact_history("overlap")
+        release_first.set()
+        await first
+        return await client.get("overlap:summary"), await client.lrange("overlap", 0, -1)
+
+    summary, remaining = asyncio.run(run())
+
+    assert summary == "fresh summary"
+    assert remaining == [f"User: message {i}" for i in range(2, 6)]
+
+
+def test_failing_compaction_caps_the_history(fakes, monkeypatch):
+    monkeypatch.setenv("HISTORY_VERBATIM_TURNS", "2")
+    monkeypatch.setenv("HISTORY_FOLD_BATCH", "1")
+    monkeypatch.setenv("HISTORY_MAX_MESSAGES", "8")
+
+    async def fail(prompt):
+        raise RuntimeError("LLM unavailable")
+    monkeypatch.setattr(chat_history, "generate_llm_response", fail)
+
+    async def run():
+        await _fill("failing", 12)
+        await chat_history.compact_history("failing")
+        client = get_async_redis_client()
+        return await client.lrange("failing", 0, -1), await client.get("failing:summary")
+
+    remaining, summary = asyncio.run(run())
+
+    assert remaining == [f"User: message {i}" for i in range(4, 12)]
+    assert summary is None
+
+
+def test_history_keeps_the_summary_and_newest_messages_within_budget(fakes, monkeypatch):
+    monkeypatch.setenv("HISTORY_TOKEN_BUDGET", "40")
+
+    async def run():
+        client = get_async_redis_client()
+        await client.set(chat_history.summary_key("budget"), "the user asked about refunds")
+        await client.rpush("budget", *[chat_history.format_message("user", " ".join(["word"] * 8) + f" {i}")
+                                       for i in range(6)])
+        return await chat_history.get_chat_history("budget")
+
+    lines = asyncio.run(run()).splitlines()
+
+    assert lines[0] == "Summary of earlier conversation: the user asked about refunds"
+    assert 1 < len(lines) < 7
+    assert lines[-1].endswith(" 5")
+    assert sum(count_tokens(line) for line in lines) <= 40
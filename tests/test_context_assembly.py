@@ -0,0 +1,49 @@
+from langchain_core.documents import Document
+
+from ConversationalRAG.app.services.context_assembly import PASSAGE_SEPARATOR, assemble_context
+from common.tokens import count_tokens
+
+
+def _chunk(text: str, filename: str, chunk_index: int) -> Document:
+    return Document(page_content=text, metadata={"filename": filename, "chunk_index": chunk_index})
+
+
+def test_near_duplicates_free_their_slot_for_the_next_chunk():
+    docs = [
+        _chunk("the warranty covers parts and labour for two years", "a.txt", 0),
+        _chunk("The warranty covers parts and labour for two years.", "b.txt", 7),
+        _chunk("returns are accepted within thirty days of delivery", "c.txt", 3),
+    ]
+
+    context = assemble_context(docs, top_k=2)
+
+    assert context.duplicates == 1
+    assert context.text.split(PASSAGE_SEPARATOR) == [docs[0].page_content, docs[2].page_content]
+
+
+def test_adjacent_chunks_merge_in_file_order_at_their_best_rank():
+    docs = [
+        _chunk("second part of the manual", "manual.txt", 5),
+        _chunk("an unrelated faq answer", "faq.txt", 1),
+        _chunk("first part of the manual", "manual.txt", 4),
+    ]
+
+    context = assemble_context(docs, top_k=3)
+
+    assert context.merged == 1
+    assert context.text.split(PASSAGE_SEPARATOR) == [
+        "first part of the manual\nsecond part of the manual",
+        "an unrelated faq answer",
+    ]
+
+
+def test_passages_are_cut_to_the_token_budget(monkeypatch):
+    monkeypatch.setenv("CONTEXT_TOKEN_BUDGET", "30")
+    docs = [_chunk(" ".join(f"{word}{i}" for i in range(40)), f"{word}.txt", 0) for word in ("alpha", "beta")]
+
+    context = assemble_context(docs, top_k=2)
+
+    assert context.passages == 1
+    assert context.text.startswith("alpha0 alpha1")
+    assert 0 < count_tokens(context.text) <= 30
+    assert context.tokens_saved > 0
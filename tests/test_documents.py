@@ -0,0 +1,114 @@
+import io
+import threading
+import uuid
+
+import pytest
+from sqlalchemy import update
+
+from DocumentIngestionAPI.app.db.crud import create_job, get_file_chunks, update_job
+from DocumentIngestionAPI.app.db.models import ChunkMetadata
+from DocumentIngestionAPI.app.services import documents
+from DocumentIngestionAPI.app.services.documents import (
+    DocumentBusyError,
+    acquire_document,
+    delete_document,
+    release_document,
+)
+from DocumentIngestionAPI.app.services.upload import upload_to_db
+from DocumentIngestionAPI.app.services.vectorstore import get_vector_store
+
+TEXT = "\n\n".join(" ".join([word] * 40) for word in ("apple", "pear", "plum"))
+
+
+def _ingest(db, filename: str, text: str = TEXT):
+    return upload_to_db(io.BytesIO(text.encode()), "text/plain", filename, "recursive", db)
+
+
+def _stored_filenames(namespace: str = ""):
+    backend = get_vector_store(namespace)
+    return [metadata.get("filename") for _, _, metadata in backend._docs.values()]
+
+
+def test_document_locks_are_per_document():
+    assert acquire_document("a.txt")
+    try:
+        assert acquire_document("b.txt", blocking=False)
+        release_document("b.txt")
+        assert not acquire_document("a.txt", blocking=False)
+        assert acquire_document("a.txt", namespace="other", blocking=False)
+        release_document("a.txt", namespace="other")
+    finally:
+        release_document("a.txt")
+    assert documents._document_locks == {}
+
+
+def test_delete_does_not_wait_for_an_ingestion(ingestion_db):
+    filename = f"{uuid.uuid4().hex}.txt"
+    _ingest(ingestion_db, filename)
+    acquire_document(filename)
+    try:
+        with pytest.raises(DocumentBusyError):
+            delete_document(ingestion_db, filename)
+    finally:
+        release_document(filename)
+    assert delete_document(ingestion_db, filename)["status"] == "deleted"
+
+
+def test_delete_rejected_while_a_job_is_queued(ingestion_db):
+    filename = f"{uuid.uuid4().hex}.txt"
+    _ingest(ingestion_db, filename)
+    job_id = str(uuid.uuid4())
+    create_job(ingestion_db, job_id, filename, "text/plain", "recursive", "/nonexistent")
+    with pytest.raises(DocumentBusyError):
+        delete_document(ingestion_db, filename)
+    update_job(ingestion_db, job_id, status="failed")
+    assert delete_document(ingestion_db, filename)["chunks_deleted"] == 3
+
+
+def test_delete_removes_vectors_without_recorded_ids(ingestion_db):
+    filename = f"{uuid.uuid4().hex}.txt"
+    _ingest(ingestion_db, filename)
+    ingestion_db.execute(
+        update(ChunkMetadata).where(ChunkMetadata.chunk_filename == filename, ChunkMetadata.chunk_index == 0)
+        .values(vector_id=None)
+    )
+    ingestion_db.commit()
+
+    result = delete_document(ingestion_db, filename)
+    assert result["status"] == "deleted"
+    assert result["chunks_deleted"] == 3
+    assert get_file_chunks(ingestion_db, filename) == []
+    assert filename not in _stored_filenames()
+
+
+def test_replace_keeps_unchanged_chunks_and_drops_removed_ones(ingestion_db):
+    filename = f"{uuid.uuid4().hex}.txt"
+    _ingest(ingestion_db, filename)
+    # A word no other test ingests, so the new chunk is not in the embedding cache
+    result = _ingest(ingestion_db, filename, TEXT.replace("plum", "w" + uuid.uuid4().hex[:4]))
+    assert (result["chunks_unchanged"], result["chunks_embedded"], result["chunks_deleted"]) == (2, 1, 1)
+    assert sorted(index for _, _, index, _ in get_file_chunks(ingestion_db, filename)) == [0, 1, 2]
+    assert _stored_filenames().count(filename) == 3
+
+
+def test_concurrent_ingestions_of_one_document_do_not_duplicate_it(ingestion_db):
+    from DocumentIngestionAPI.app.db.models import SessionLocal
+
+    filename = f"{uuid.uuid4().hex}.txt"
+    errors = []
+
+    def ingest(text):
+        try:
+            with SessionLocal() as db:
+                _ingest(db, filename, text)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=ingest, args=(TEXT.replace("plum", word),)) for word in ("fig", "kiwi", "lime")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(get_file_chunks(ingestion_db, filename)) == 3
+    assert _stored_filenames().count(filename) == 3
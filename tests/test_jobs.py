@@ -0,0 +1,100 @@
+import io
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from DocumentIngestionAPI.app.db.crud import claim_job, create_job, get_job, list_resumable_job_ids
+from DocumentIngestionAPI.app.db.models import IngestionJob, SessionLocal
+from DocumentIngestionAPI.app.services import jobs
+from DocumentIngestionAPI.app.services.jobs import enqueue_upload, persist_upload, resume_unfinished_jobs
+
+TEXT = b"\n\n".join(b" ".join([word] * 40) for word in (b"apple", b"pear"))
+
+
+@pytest.fixture
+def job_storage(ingestion_db, tmp_path, monkeypatch):
+    monkeypatch.setenv("JOB_STORAGE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def _wait(job_id: str, timeout: float = 10.0) -> IngestionJob:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with SessionLocal() as db:
+            job = get_job(db, job_id)
+            if job.status in ("completed", "failed"):
+                return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def _record_job(db, content: bytes = TEXT, **values) -> str:
+    """A job as another process would leave it: recorded but not submitted here."""
+    job_id = str(uuid.uuid4())
+    file_path = persist_upload(io.BytesIO(content), job_id)
+    create_job(db, job_id, f"{job_id}.txt", "text/plain", "recursive", file_path)
+    if values:
+        db.execute(update(IngestionJob).where(IngestionJob.id == job_id).values(**values))
+        db.commit()
+    return job_id
+
+
+def test_finished_jobs_remove_their_upload(ingestion_db, job_storage):
+    completed = enqueue_upload(ingestion_db, io.BytesIO(TEXT), f"{uuid.uuid4().hex}.txt", "text/plain", "recursive")
+    failed = enqueue_upload(ingestion_db, io.BytesIO(b""), f"{uuid.uuid4().hex}.txt", "text/plain", "recursive")
+
+    assert _wait(completed.id).status == "completed"
+    assert _wait(failed.id).status == "failed"
+    # Uploads are removed right after the final status is recorded.
+    deadline = time.monotonic() + 5
+    while os.listdir(job_storage) and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert os.listdir(job_storage) == []
+
+
+def test_recently_queued_jobs_are_left_to_their_process(ingestion_db, job_storage):
+    fresh = _record_job(ingestion_db)
+    old = _record_job(ingestion_db, created_at=datetime.now() - timedelta(minutes=10))
+    abandoned = _record_job(ingestion_db, status="running", updated_at=datetime.now() - timedelta(minutes=10))
+    running = _record_job(ingestion_db, status="running")
+
+    resumable = list_resumable_job_ids(ingestion_db, datetime.now() - timedelta(minutes=1))
+    assert old in resumable and abandoned in resumable
+    assert fresh not in resumable and running not in resumable
+
+
+def test_resume_runs_abandoned_jobs_once(ingestion_db, job_storage, monkeypatch):
+    monkeypatch.setenv("JOB_STALE_SECONDS", "60")
+    stale = datetime.now() - timedelta(minutes=10)
+    abandoned = _record_job(ingestion_db, status="running", updated_at=stale, attempts=1)
+    queued = _record_job(ingestion_db, created_at=stale)
+
+    assert resume_unfinished_jobs() >= 2
+    for job_id in (abandoned, queued):
+        job = _wait(job_id)
+        assert job.status == "completed"
+    assert _wait(abandoned).attempts == 2
+    assert resume_unfinished_jobs() == 0
+
+
+def test_heartbeat_keeps_a_long_job_claimed(ingestion_db, job_storage, monkeypatch):
+    # Beats every second; the job runs longer than it takes to go stale without them.
+    monkeypatch.setenv("JOB_STALE_SECONDS", "2")
+    upload_to_db = jobs.upload_to_db
+
+    def slow_upload(*args, **kwargs):
+        time.sleep(3)
+        return upload_to_db(*args, **kwargs)
+
+    monkeypatch.setattr(jobs, "upload_to_db", slow_upload)
+    job = enqueue_upload(ingestion_db, io.BytesIO(TEXT), f"{uuid.uuid4().hex}.txt", "text/plain", "recursive")
+    time.sleep(2.5)
+    with SessionLocal() as db:
+        assert not claim_job(db, job.id, datetime.now() - timedelta(seconds=2))
+        assert job.id not in list_resumable_job_ids(db, datetime.now() - timedelta(seconds=2))
+    finished = _wait(job.id)
+    assert (finished.status, finished.attempts) == ("completed", 1)
@@ -0,0 +1,90 @@
+import multiprocessing
+
+from common.lexical_index import LexicalIndex
+
+
+def _texts(index: LexicalIndex, query: str):
+    return [doc.page_content for doc, _ in index.search(query, k=100)]
+
+
+def test_reader_replays_log_compacted_by_another_process(tmp_path):
+    a = LexicalIndex(str(tmp_path))
+    a.add(["a0", "a1"], ["zucchini soup with a long enough description", "apple pie"])
+    assert _texts(a, "apple") == ["apple pie"]
+
+    b = LexicalIndex(str(tmp_path))
+    b.add([f"b{i}" for i in range(20)], [f"banana bread number {i}" for i in range(20)])
+    # Tombstones outnumber live rows: B compacts into a new, larger log,
+    # so A's offset now points into the middle of a record.
+    b.delete(["a0"] + [f"b{i}" for i in range(11)])
+    b.add(["c1"], ["cherry tart " * 20])
+
+    assert _texts(a, "apple") == ["apple pie"]
+    assert len(_texts(a, "banana")) == 9
+    assert _texts(a, "cherry") == ["cherry tart " * 20]
+    assert _texts(a, "zucchini") == []
+    a.add(["a2"], ["apple crumble"])
+    assert len(LexicalIndex(str(tmp_path))) == 12
+
+
+def _add(directory: str, id_: str, text: str) -> None:
+    LexicalIndex(directory).add([id_], [text])
+
+
+def test_append_does_not_skip_records_of_another_process(tmp_path):
+    a = LexicalIndex(str(tmp_path))
+    a.add(["a1"], ["apple"])
+    context = multiprocessing.get_context("fork")
+    other = context.Process(target=_add, args=(str(tmp_path), "b1", "grape"))
+    append = a._append_locked
+
+    def append_after_other_process(records):
+        # Another process writes between our refresh and our append; with the
+        # file lock held it has to wait until we are done.
+        other.start()
+        other.join(timeout=0.5)
+        append(records)
+
+    a._append_locked = append_after_other_process
+    a.add(["a2"], ["melon"])
+    other.join()
+    assert other.exitcode == 0
+    assert _texts(a, "grape") == ["grape"]
+    assert _texts(a, "melon") == ["melon"]
+
+
+def _writer(directory: str, worker: int, count: int) -> None:
+    index = LexicalIndex(directory)
+    for i in range(count):
+        index.add([f"w{worker}-{i}"], [f"shared term worker{worker} item{i}"])
+        if i % 5 == 4:
+            index.delete([f"w{worker}-{i - 1}"])
+
+
+def test_concurrent_writers_in_separate_processes(tmp_path):
+    reader = LexicalIndex(str(tmp_path))
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_writer, args=(str(tmp_path), worker, 200)) for worker in range(4)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+        assert process.exitcode == 0
+
+    expected = {f"w{worker}-{i}" for worker in range(4) for i in range(200) if i % 5 != 3}
+    for index in (reader, LexicalIndex(str(tmp_path))):
+        assert {doc.id for doc, _ in index.search("shared", k=1000)} == expected
+
+
+def test_filename_filter_follows_replaced_and_deleted_chunks(tmp_path):
+    index = LexicalIndex(str(tmp_path))
+    index.add(["1", "2", "3"], ["pear one", "pear two", "pear three"],
+              [{"filename": "a.txt"}, {"filename": "b.txt"}, {"filename": "a.txt", "page": 2}])
+    index.add(["1"], ["pear moved"], [{"filename": "b.txt"}])
+    index.delete(["2"])
+
+    for reader in (index, LexicalIndex(str(tmp_path))):
+        assert {doc.id for doc, _ in reader.search("pear", filter={"filename": "a.txt"})} == {"3"}
+        assert {doc.id for doc, _ in reader.search("pear", filter={"filename": "b.txt"})} == {"1"}
+        assert reader.search("pear", filter={"filename": "a.txt", "page": 1}) == []
+        assert reader.search("pear", filter={"filename": "c.txt"}) == []
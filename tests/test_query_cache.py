@@ -0,0 +1,34 @@
+import asyncio
+
+from ConversationalRAG.app.config import get_async_redis_client
+from ConversationalRAG.app.services.query_cache import QueryEmbeddingCache
+
+
+def _cache(max_entries: int = 2) -> QueryEmbeddingCache:
+    return QueryEmbeddingCache(get_async_redis_client(decode_responses=False), max_entries=max_entries, ttl_seconds=60)
+
+
+def test_workers_share_vectors_through_redis(fakes):
+    first, second = _cache(), _cache()
+
+    async def run():
+        await first.put("Reset my  PASSWORD", [0.5, 0.25])
+        return await second.get("reset my password"), await second.get("reset my password")
+
+    assert asyncio.run(run()) == ([0.5, 0.25], [0.5, 0.25])
+    stats = second.stats()
+    assert (stats["redis_hits"], stats["local_hits"], stats["misses"]) == (1, 1, 0)
+
+
+def test_local_tier_evicts_least_recently_used(fakes):
+    cache = QueryEmbeddingCache(None, max_entries=2, ttl_seconds=60)
+
+    async def run():
+        await cache.put("a", [1.0])
+        await cache.put("b", [2.0])
+        await cache.get("a")
+        await cache.put("c", [3.0])
+        return [await cache.get(query) for query in ("a", "b", "c")]
+
+    assert asyncio.run(run()) == [[1.0], None, [3.0]]
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,69 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from ConversationalRAG.app.services import query_cache
+from ConversationalRAG.app.services.response_cache import SemanticResponseCache
+
+DIMENSION = 8
+
+
+@pytest.fixture
+def embeddings(fakes, monkeypatch):
+    """A fresh query embedding cache without a Redis tier."""
+    cache = query_cache.QueryEmbeddingCache(None, max_entries=100, ttl_seconds=60)
+    monkeypatch.setattr(query_cache, "_cache", cache)
+    return cache
+
+
+def _cache() -> SemanticResponseCache:
+    return SemanticResponseCache(max_entries=4, ttl_seconds=60, threshold=0.95, dimension=DIMENSION)
+
+
+def test_lexical_fast_path_queries_are_keyed_by_text(embeddings, monkeypatch):
+    def batcher():
+        raise AssertionError("make_key must not embed the query")
+    monkeypatch.setattr("ConversationalRAG.app.services.retrieval.get_query_batcher", batcher)
+    cache = _cache()
+
+    async def run():
+        # Nothing in the query embedding cache: retrieval took the lexical fast path.
+        key = await cache.make_key("Error E1234 on startup", "context")
+        assert key.embedding is None
+        cache.store(key, "answer", 1.0)
+        repeat = await cache.make_key("  error e1234   ON startup", "context")
+        other_context = await cache.make_key("Error E1234 on startup", "other context")
+        other_query = await cache.make_key("Error E1235 on startup", "context")
+        return cache.lookup(repeat), cache.lookup(other_context), cache.lookup(other_query)
+
+    assert asyncio.run(run()) == ("answer", None, None)
+
+
+def test_near_duplicate_queries_hit_through_the_retrieval_vector(embeddings):
+    cache = _cache()
+    vector = np.random.default_rng(0).random(DIMENSION, dtype=np.float32)
+
+    async def run():
+        # Retrieval embedded both questions, so their vectors are in the query cache.
+        await embeddings.put("how do I reset my password", vector.tolist())
+        await embeddings.put("how can I reset my password", (vector * 2 + 0.01).tolist())
+        cache.store(await cache.make_key("how do I reset my password", "context"), "answer", 1.0)
+        return cache.lookup(await cache.make_key("how can I reset my password", "context"))
+
+    assert asyncio.run(run()) == "answer"
+
+
+def test_same_query_is_cached_per_context(embeddings):
+    cache = _cache()
+
+    async def run():
+        for context in ("first", "second"):
+            cache.store(await cache.make_key("what is the refund policy", context), f"{context} answer", 1.0)
+        # Storing the same question and context again replaces its entry.
+        cache.store(await cache.make_key("what is the refund policy", "first"), "updated answer", 1.0)
+        return [cache.lookup(await cache.make_key("what is the refund policy", context))
+                for context in ("first", "second")]
+
+    assert asyncio.run(run()) == ["updated answer", "second answer"]
+    assert cache.stats()["entries"] == 2
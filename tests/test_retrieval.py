@@ -0,0 +1,71 @@
+import asyncio
+
+from langchain_core.documents import Document
+
+from common.lexical_index import LexicalIndex
+from ConversationalRAG.app.services import retrieval
+
+
+def _doc(id_: str) -> Document:
+    return Document(id=id_, page_content=f"text of {id_}")
+
+
+def test_rank_fusion_favours_documents_ranked_by_both_searches():
+    dense = [_doc("a"), _doc("b"), _doc("c")]
+    lexical = [_doc("c"), _doc("d")]
+
+    fused = retrieval.reciprocal_rank_fusion([dense, lexical], k=60)
+
+    assert [doc.id for doc in fused] == ["c", "a", "b", "d"]
+
+
+class _VectorStore:
+    def __init__(self):
+        self.searches = 0
+
+    async def asearch(self, embedding, k=4, filter=None):
+        self.searches += 1
+        return []
+
+
+def _retrieve(monkeypatch, tmp_path, query):
+    index = LexicalIndex(str(tmp_path))
+    index.add(
+        ["c0", "c1", "c2"],
+        ["error E4711 means the pump overheated, let it cool down",
+         "the pump runs quietly in eco mode",
+         "clean the filter every month"],
+        [{"filename": "manual.txt", "chunk_index": i} for i in range(3)],
+    )
+    vectorstore = _VectorStore()
+    embedded = []
+
+    async def embed_query(text):
+        embedded.append(text)
+        return [0.0] * 8
+    monkeypatch.setattr(retrieval, "get_lexical_index", lambda namespace: index)
+    monkeypatch.setattr(retrieval, "get_vectorstore", lambda namespace: vectorstore)
+    monkeypatch.setattr(retrieval, "embed_query", embed_query)
+    context = asyncio.run(retrieval.retrieve_context(query, top_k=1))
+    return context, embedded, vectorstore.searches
+
+
+def test_confident_lexical_match_skips_the_vector_search(monkeypatch, tmp_path):
+    monkeypatch.setenv("LEXICAL_FAST_PATH_ENABLED", "true")
+    monkeypatch.setenv("LEXICAL_FAST_PATH_MIN_SCORE", "0.5")
+
+    context, embedded, searches = _retrieve(monkeypatch, tmp_path, "E4711")
+
+    assert context.startswith("error E4711")
+    assert (embedded, searches) == ([], 0)
+
+
+def test_ambiguous_lexical_match_falls_back_to_hybrid_search(monkeypatch, tmp_path):
+    monkeypatch.setenv("LEXICAL_FAST_PATH_ENABLED", "true")
+    monkeypatch.setenv("LEXICAL_FAST_PATH_MIN_SCORE", "0.5")
+
+    # "pump" is in two chunks with similar scores, and "noise" in none.
+    context, embedded, searches = _retrieve(monkeypatch, tmp_path, "pump noise")
+
+    assert (embedded, searches) == (["pump noise"], 1)
+    assert "pump" in context
@@ -0,0 +1,98 @@
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from common.vector_backends import FaissBackend, MemmapBackend
+
+DIMENSION = 8
+
+
+@pytest.fixture(params=[FaissBackend, MemmapBackend])
+def backend_class(request):
+    return request.param
+
+
+def _vectors(count: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).random((count, DIMENSION), dtype=np.float32)
+
+
+def test_empty_add(backend_class, tmp_path):
+    backend = backend_class(str(tmp_path), DIMENSION)
+    assert backend.add_embeddings([], []) == []
+    assert backend.search(_vectors(1)[0].tolist()) == []
+
+
+def test_vectors_written_without_docstore_record_do_not_shift_rows(backend_class, tmp_path):
+    vectors = _vectors(4)
+    backend = backend_class(str(tmp_path), DIMENSION)
+    backend.add_embeddings(["a", "b"], vectors[:2].tolist(), ids=["a", "b"])
+    # A crash between writing the vectors of a batch and recording it in the docstore.
+    backend._write_vectors(2, _vectors(3, seed=1))
+
+    reopened = backend_class(str(tmp_path), DIMENSION)
+    reopened.add_embeddings(["c", "d"], vectors[2:].tolist(), ids=["c", "d"])
+    reopened.delete(["b"])
+
+    for search in (reopened, backend_class(str(tmp_path), DIMENSION)):
+        for id_, vector in zip("acd", vectors[[0, 2, 3]]):
+            doc, score = search.search(vector.tolist(), k=1)[0]
+            assert doc.id == id_
+            assert score == pytest.approx(1.0, abs=1e-5)
+        assert "b" not in {doc.id for doc, _ in search.search(vectors[1].tolist(), k=4)}
+
+
+def test_delete_where_filename(backend_class, tmp_path):
+    vectors = _vectors(3)
+    backend = backend_class(str(tmp_path), DIMENSION)
+    backend.add_embeddings(["a", "b", "c"], vectors.tolist(),
+                           [{"filename": "x.txt"}, {"filename": "y.txt"}, {"filename": "x.txt"}])
+
+    assert backend.delete_where({"filename": "x.txt"}) == 2
+    assert backend.delete_where({"filename": "x.txt"}) == 0
+    for search in (backend, backend_class(str(tmp_path), DIMENSION)):
+        assert [doc.page_content for doc, _ in search.search(vectors[0].tolist(), k=3)] == ["b"]
+
+
+def test_truncated_docstore_record_is_ignored_and_overwritten(backend_class, tmp_path):
+    vectors = _vectors(3)
+    backend = backend_class(str(tmp_path), DIMENSION)
+    backend.add_embeddings(["a"], vectors[:1].tolist(), ids=["a"])
+    # A crash in the middle of appending a docstore record.
+    with open(tmp_path / "docstore.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"op": "add", "row": 1, "id": "b", "te')
+
+    reopened = backend_class(str(tmp_path), DIMENSION)
+    assert [doc.id for doc, _ in reopened.search(vectors[0].tolist(), k=3)] == ["a"]
+    reopened.add_embeddings(["c"], vectors[2:].tolist(), ids=["c"])
+
+    for search in (reopened, backend_class(str(tmp_path), DIMENSION)):
+        assert sorted(doc.id for doc, _ in search.search(vectors[2].tolist(), k=3)) == ["a", "c"]
+        assert search.search(vectors[2].tolist(), k=1)[0][0].id == "c"
+
+
+def _writer(backend_class, directory: str, worker: int, count: int) -> None:
+    backend = backend_class(directory, DIMENSION)
+    for i in range(count):
+        backend.add_embeddings([f"w{worker}-{i}"], _vectors(1, seed=worker * 100 + i).tolist(),
+                               ids=[f"w{worker}-{i}"])
+
+
+def test_processes_sharing_a_directory_do_not_overwrite_rows(backend_class, tmp_path):
+    backend = backend_class(str(tmp_path), DIMENSION)
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_writer, args=(backend_class, str(tmp_path), worker, 20))
+               for worker in range(3)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+    assert all(process.exitcode == 0 for process in workers)
+
+    # The open backend picks up the other processes' rows, and so does a fresh one.
+    for search in (backend, backend_class(str(tmp_path), DIMENSION)):
+        for worker in range(3):
+            for i in range(20):
+                doc, score = search.search(_vectors(1, seed=worker * 100 + i)[0].tolist(), k=1)[0]
+                assert doc.id == f"w{worker}-{i}"
+                assert score == pytest.approx(1.0, abs=1e-5)